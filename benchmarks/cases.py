@@ -0,0 +1,282 @@
+import random
+from typing import Any, Callable, Dict, List, Optional
+
+from attr import define, field
+
+from src.cryptography.envelope import Envelope
+from src.cryptography.key import RSAKey
+from src.cryptography.parallel import ParallelCipher
+from src.cryptography.prepared import PREPARED_KEYS
+from src.cryptography.rsa import RSA
+from src.cryptography.table import TRANSLATION_TABLES
+from src.util.gcd import ExtendedEuclideanAlgorithm
+
+KiB = 1 << 10
+MiB = 1 << 20
+SHARD_SIZE = 1 * MiB
+# Alfabeto dos textos do modo por caractere: letras acentuadas e pontuação, todas abaixo dos módulos de brinquedo.
+ALPHABET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZáéíóúãõç0123456789 ,.;:!?\n"
+
+
+@define
+class Case:
+    """
+    Representa um caso do conjunto de benchmarks.
+
+    Atributos:
+        name (str): o nome único do caso, usado para comparar resultados de execuções diferentes.
+        function (str): o nome da função de preparação deste módulo. Ela recebe a semente e os parâmetros e retorna a
+            função medida, que executa uma iteração e retorna o número de bytes processados.
+        params (Dict[str, Any]): os parâmetros repassados à função de preparação.
+        repeat (int): o número de iterações medidas.
+    """
+    name: str
+    function: str
+    params: Dict[str, Any] = field(factory=dict)
+    repeat: int = 5
+
+
+def _key(seed: int, bits: Optional[int], start: int = 0, stop: int = 100) -> RSA:
+    """
+    Gera uma chave de forma reprodutível a partir da semente.
+
+    :param seed: a semente do gerador de números aleatórios.
+    :param bits: o tamanho do módulo em bits, ou None para gerar a partir do intervalo.
+    :param start: início do intervalo, se bits for None.
+    :param stop: fim do intervalo, se bits for None.
+    :return: um objeto RSA.
+    """
+    return RSA.generate(start, stop, bits=bits, rng=random.Random(seed))
+
+
+def keygen(seed: int, bits: Optional[int] = None, start: int = 0, stop: int = 100) -> Callable[[], int]:
+    """
+    Mede RSA.generate, a geração não interativa de uma chave.
+
+    :param seed: a semente do gerador de números aleatórios.
+    :param bits: o tamanho do módulo em bits, ou None para gerar a partir do intervalo.
+    :param start: início do intervalo, se bits for None.
+    :param stop: fim do intervalo, se bits for None.
+    :return: a função medida.
+    """
+    rng = random.Random(seed)
+
+    def run() -> int:
+        RSA.generate(start, stop, bits=bits, rng=rng)
+        return 0
+
+    return run
+
+
+def keygen_batch(seed: int, bits: int, count: int, jobs: int) -> Callable[[], int]:
+    """
+    Mede RSA.generate_many, a geração em lote com um pool de processos.
+
+    :param seed: não usada: os primos são buscados nos processos do pool, com a entropia do sistema, e o tempo não
+        depende dos primos encontrados a ponto de exigir uma semente.
+    :param bits: o tamanho do módulo em bits.
+    :param count: o número de pares de chaves gerados por iteração.
+    :param jobs: o número de processos.
+    :return: a função medida.
+    """
+    def run() -> int:
+        RSA.generate_many(count, 0, 0, bits=bits, jobs=jobs)
+        return 0
+
+    return run
+
+
+def gcd(seed: int, bits: int, trace: bool, count: int = 200) -> Callable[[], int]:
+    """
+    Mede ExtendedEuclideanAlgorithm.execute sobre 'count' pares de números de 'bits' bits.
+
+    :param seed: a semente do gerador de números aleatórios.
+    :param bits: o tamanho dos números em bits.
+    :param trace: se True, mede o modo com registro de todas as etapas.
+    :param count: o número de pares por iteração.
+    :return: a função medida.
+    """
+    rng = random.Random(seed)
+    pairs = [(rng.getrandbits(bits), rng.getrandbits(bits)) for _ in range(count)]
+
+    def run() -> int:
+        for a, b in pairs:
+            ExtendedEuclideanAlgorithm.execute(a, b, trace)
+        return 0
+
+    return run
+
+
+def char(seed: int, size: int, decrypt: bool, start: int = 300, stop: int = 1000) -> Callable[[], int]:
+    """
+    Mede o modo por caractere (RSA.encrypt_with/decrypt_with) sobre um texto de 'size' caracteres. As tabelas de tradução
+    são descartadas a cada iteração, de modo que o custo de preenchê-las também é medido.
+
+    :param seed: a semente do gerador de números aleatórios.
+    :param size: o número de caracteres do texto.
+    :param decrypt: se True, mede a descriptografia; caso contrário, a criptografia.
+    :param start: início do intervalo dos primos da chave.
+    :param stop: fim do intervalo dos primos da chave.
+    :return: a função medida.
+    """
+    rsa = _key(seed, None, start, stop)
+    rng = random.Random(seed)
+    message = ''.join(rng.choices(ALPHABET, k=size))
+    if decrypt:
+        message = RSA.encrypt_with(rsa.n, rsa.public_key, message)
+
+    def run() -> int:
+        TRANSLATION_TABLES.clear()
+        if decrypt:
+            RSA.decrypt_with(rsa.n, rsa.private_key, message)
+        else:
+            RSA.encrypt_with(rsa.n, rsa.public_key, message)
+        return len(message.encode('utf-8', 'surrogatepass'))
+
+    return run
+
+
+def block(seed: int, bits: Optional[int], size: int, decrypt: bool, jobs: int = 1, start: int = 0,
+          stop: int = 100) -> Callable[[], int]:
+    """
+    Mede o modo em blocos sobre uma mensagem de 'size' bytes, em um único processo (jobs = 1, com BlockCipher) ou em
+    vários (jobs > 1, com ParallelCipher). A descriptografia usa a chave privada com os parâmetros do Teorema Chinês do
+    Resto, como a carregada de um arquivo de chave.
+
+    :param seed: a semente do gerador de números aleatórios.
+    :param bits: o tamanho do módulo em bits, ou None para gerar a chave a partir do intervalo.
+    :param size: o número de bytes da mensagem.
+    :param decrypt: se True, mede a descriptografia; caso contrário, a criptografia.
+    :param jobs: o número de processos.
+    :param start: início do intervalo, se bits for None.
+    :param stop: fim do intervalo, se bits for None.
+    :return: a função medida.
+    """
+    rsa = _key(seed, bits, start, stop)
+    key = RSAKey.private_from(rsa) if decrypt else RSAKey.public_from(rsa)
+    message = random.Random(seed).randbytes(size)
+    if decrypt:
+        message = RSAKey.public_from(rsa).block_cipher().encrypt(message)
+    shards = [message[i:i + SHARD_SIZE] for i in range(0, len(message), SHARD_SIZE)]
+
+    if jobs > 1:
+        cipher = ParallelCipher(key, True, jobs)
+    else:
+        cipher = key.block_cipher()
+    transform = cipher.decrypt_stream if decrypt else cipher.encrypt_stream
+
+    def run() -> int:
+        for _ in transform(shards):
+            pass
+        return len(message)
+
+    return run
+
+
+def prepared(seed: int, bits: Optional[int], count: int, size: int, decrypt: bool, start: int = 0,
+             stop: int = 100) -> Callable[[], int]:
+    """
+    Mede muitas mensagens curtas sob uma mesma chave (PreparedKey.encrypt_many/decrypt_many), como no comando batch e no
+    servidor local. A chave preparada é descartada a cada iteração, de modo que o custo de montar as tabelas de
+    exponenciação também é medido.
+
+    :param seed: a semente do gerador de números aleatórios.
+    :param bits: o tamanho do módulo em bits, ou None para gerar a chave a partir do intervalo.
+    :param count: o número de mensagens.
+    :param size: o número de bytes de cada mensagem.
+    :param decrypt: se True, mede a descriptografia; caso contrário, a criptografia.
+    :param start: início do intervalo, se bits for None.
+    :param stop: fim do intervalo, se bits for None.
+    :return: a função medida.
+    """
+    rsa = _key(seed, bits, start, stop)
+    key = RSAKey.private_from(rsa) if decrypt else RSAKey.public_from(rsa)
+    rng = random.Random(seed)
+    messages = [rng.randbytes(size) for _ in range(count)]
+    if decrypt:
+        messages = RSAKey.public_from(rsa).prepared().encrypt_many(messages)
+
+    def run() -> int:
+        PREPARED_KEYS.clear()
+        transform = key.prepared().decrypt_many if decrypt else key.prepared().encrypt_many
+        transform(messages)
+        return sum(map(len, messages))
+
+    return run
+
+
+def envelope(seed: int, bits: int, size: int, decrypt: bool) -> Callable[[], int]:
+    """
+    Mede o modo envelope (Envelope) sobre uma mensagem de 'size' bytes, dividida em pedaços de SHARD_SIZE bytes.
+
+    :param seed: a semente do gerador de números aleatórios.
+    :param bits: o tamanho do módulo em bits.
+    :param size: o número de bytes da mensagem.
+    :param decrypt: se True, mede a descriptografia; caso contrário, a criptografia.
+    :return: a função medida.
+    """
+    rsa = _key(seed, bits)
+    message = random.Random(seed).randbytes(size)
+    shards = [message[i:i + SHARD_SIZE] for i in range(0, len(message), SHARD_SIZE)]
+    if decrypt:
+        shards = list(Envelope(RSAKey.public_from(rsa)).encrypt_stream(shards))
+        transform = Envelope(RSAKey.private_from(rsa)).decrypt_stream
+    else:
+        transform = Envelope(RSAKey.public_from(rsa)).encrypt_stream
+
+    def run() -> int:
+        for _ in transform(shards):
+            pass
+        return len(message)
+
+    return run
+
+
+def cases(profile: str) -> List[Case]:
+    """
+    Retorna os casos de um perfil.
+
+    O perfil 'quick' cobre todos os caminhos com tamanhos pequenos e roda em menos de um minuto. O perfil 'full' vai das
+    chaves de brinquedo até 4096 bits e de mensagens de bytes até centenas de MiB.
+
+    :param profile: 'quick' ou 'full'.
+    :return: a lista de casos.
+    """
+    full = profile == 'full'
+    key_sizes = [512, 1024, 2048, 4096] if full else [512, 1024]
+    message_sizes = [16, 4 * KiB, 1 * MiB, 64 * MiB, 256 * MiB] if full else [16, 4 * KiB, 64 * KiB]
+    char_sizes = [16, 4 * KiB, 1 * MiB, 64 * MiB] if full else [16, 4 * KiB, 256 * KiB]
+    jobs = [1, 2, 4] if full else [1, 2]
+
+    result = [Case('keygen/range-0-100', 'keygen', {'start': 0, 'stop': 100}, 20)]
+    result += [Case(f'keygen/{bits}', 'keygen', {'bits': bits}, 3 if bits > 1024 else 5) for bits in key_sizes]
+    result += [Case(f'keygen-batch/{bits}/count-4/jobs-{j}', 'keygen_batch', {'bits': bits, 'count': 4, 'jobs': j}, 3)
+               for bits in key_sizes[:2] for j in jobs]
+    result += [Case(f'gcd/{bits}/{"trace" if trace else "fast"}', 'gcd', {'bits': bits, 'trace': trace}, 5)
+               for bits in (64, 1024, 2048) for trace in (False, True)]
+    result += [Case(f'char/{"decrypt" if d else "encrypt"}/{size}', 'char', {'size': size, 'decrypt': d}, 5)
+               for size in char_sizes for d in (False, True)]
+    for bits in key_sizes:
+        for size in message_sizes:
+            # Mensagens grandes sob chaves grandes levam minutos por iteração; elas são medidas apenas até 2048 bits.
+            if size > 1 * MiB and bits > 2048:
+                continue
+            for d in (False, True):
+                for j in jobs:
+                    if j > 1 and size < 64 * KiB:
+                        continue
+                    result.append(Case(f'block/{bits}/{"decrypt" if d else "encrypt"}/{size}/jobs-{j}', 'block',
+                                       {'bits': bits, 'size': size, 'decrypt': d, 'jobs': j},
+                                       1 if size >= 64 * MiB else 3))
+    # Módulos pequenos (n < 2^32): com o NumPy instalado, é o caminho vetorizado.
+    result += [Case(f'block/range-300-1000/{"decrypt" if d else "encrypt"}/{size}', 'block',
+                    {'bits': None, 'size': size, 'decrypt': d, 'start': 300, 'stop': 1000}, 3)
+               for size in message_sizes[:3] for d in (False, True)]
+    # Muitas mensagens curtas sob uma mesma chave: com módulos pequenos, é o caminho das tabelas de exponenciação.
+    result += [Case(f'prepared/{bits or "range-0-100"}/{"decrypt" if d else "encrypt"}/{count}x32', 'prepared',
+                    {'bits': bits, 'count': count, 'size': 32, 'decrypt': d}, 3)
+               for bits, count in ((None, 100000 if full else 10000), (key_sizes[0], 1000)) for d in (False, True)]
+    result += [Case(f'envelope/{bits}/{"decrypt" if d else "encrypt"}/{size}', 'envelope',
+                    {'bits': bits, 'size': size, 'decrypt': d}, 1 if size >= 64 * MiB else 3)
+               for bits in key_sizes[:2] for size in message_sizes for d in (False, True)]
+    return result
@@ -0,0 +1,221 @@
+import json
+import math
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import click
+
+from benchmarks import cases as suite
+
+PROFILES = ('quick', 'full')
+METRICS = ('mean', 'p50', 'p90', 'p99', 'min', 'max')
+DEFAULT_SEED = 1234
+DEFAULT_THRESHOLD = 0.10
+DEFAULT_STARTUP_MODULE = 'src.cli.main'
+DEFAULT_STARTUP_BUDGET_MS = 120.0
+# Módulos pesados que só devem ser importados pelos comandos que os usam.
+LAZY_MODULES = ('rich', 'asyncio', 'concurrent.futures.process', 'numpy', 'src.cryptography.rsa',
+                'src.server.daemon')
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """
+    Calcula um percentil pelo método do posto mais próximo.
+
+    :param values: as amostras, em qualquer ordem.
+    :param percent: o percentil desejado, entre 0 e 100.
+    :return: o valor da amostra correspondente.
+    """
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _import_times(module: str) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """
+    Importa um módulo em um interpretador novo com -X importtime.
+
+    :param module: o nome do módulo.
+    :return: o tempo acumulado da importação do módulo, em ms, e, para cada módulo importado, a tupla (tempo próprio,
+        tempo acumulado), em µs.
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+    times: Dict[str, Tuple[int, int]] = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(own), int(cumulative))
+    return times[module][1] / 1000, times
+
+
+def _run_case(case: suite.Case, seed: int, repeat: Optional[int]) -> Dict[str, Any]:
+    """
+    Executa um caso e resume as medições. Esta função roda em um processo novo para cada caso, de modo que o pico de
+    memória residente medido pertence apenas ao caso.
+
+    :param case: o caso a ser executado.
+    :param seed: a semente repassada à função de preparação.
+    :param repeat: se informado, substitui o número de iterações do caso.
+    :return: o resultado do caso, pronto para ser serializado em JSON.
+    """
+    run = getattr(suite, case.function)(seed, **case.params)
+    latencies: List[float] = []
+    processed = 0
+    for _ in range(repeat or case.repeat):
+        started = time.perf_counter()
+        processed = run()
+        latencies.append(time.perf_counter() - started)
+
+    mean = sum(latencies) / len(latencies)
+    peak_rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak_rss_kib //= 1024
+
+    return {
+        'name': case.name,
+        'params': case.params,
+        'repeat': len(latencies),
+        'latency': {
+            'mean': mean,
+            'p50': _percentile(latencies, 50),
+            'p90': _percentile(latencies, 90),
+            'p99': _percentile(latencies, 99),
+            'min': min(latencies),
+            'max': max(latencies),
+        },
+        'ops_per_second': 1 / mean if mean else None,
+        'bytes_per_second': processed / mean if processed and mean else None,
+        'peak_rss_kib': peak_rss_kib,
+    }
+
+
+@click.group()
+def main():
+    """
+    Ponto de entrada do conjunto de benchmarks
+
+    :return: None
+    """
+    pass
+
+
+@main.command(help="Executa os benchmarks e grava os resultados em JSON")
+@click.option('--profile', type=click.Choice(PROFILES), default='quick',
+              help="'quick' roda em menos de um minuto; 'full' vai até chaves de 4096 bits e mensagens de 256 MiB")
+@click.option('--seed', type=click.INT, default=DEFAULT_SEED, help="Semente das chaves e mensagens geradas")
+@click.option('--repeat', type=click.IntRange(min=1), default=None,
+              help="Substitui o número de iterações de todos os casos")
+@click.option('--filter', 'name_filter', type=click.STRING, default=None,
+              help="Executa apenas os casos cujo nome contém este texto")
+@click.option('--output', type=click.Path(path_type=Path, dir_okay=False, allow_dash=True), default='-',
+              help="Arquivo de saída dos resultados. O padrão é a saída padrão")
+def run(profile: str, seed: int, repeat: Optional[int], name_filter: Optional[str], output: Path):
+    """
+    :param profile: o perfil de casos a ser executado.
+    :param seed: a semente das chaves e mensagens geradas.
+    :param repeat: se informado, substitui o número de iterações de todos os casos.
+    :param name_filter: se informado, executa apenas os casos cujo nome contém este texto.
+    :param output: o arquivo de saída dos resultados, ou '-' para a saída padrão.
+    :return: None
+    """
+    selected = [case for case in suite.cases(profile) if not name_filter or name_filter in case.name]
+    results = []
+    for case in selected:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(_run_case, case, seed, repeat).result()
+        results.append(result)
+        click.echo(f"{case.name}: p50 {result['latency']['p50'] * 1000:.3f} ms", err=True)
+
+    report = {
+        'meta': {
+            'profile': profile,
+            'seed': seed,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.time(),
+        },
+        'results': results,
+    }
+    with click.open_file(str(output), 'w') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+
+
+@main.command(help="Compara dois resultados e falha se algum caso regrediu além do limite")
+@click.argument('BASELINE', type=click.Path(exists=True, path_type=Path, dir_okay=False))
+@click.argument('CURRENT', type=click.Path(exists=True, path_type=Path, dir_okay=False))
+@click.option('--metric', type=click.Choice(METRICS), default='p50', help="Métrica de latência comparada")
+@click.option('--threshold', type=click.FloatRange(min=0), default=DEFAULT_THRESHOLD,
+              help="Regressão relativa máxima tolerada, por exemplo, 0.1 para 10%")
+def compare(baseline: Path, current: Path, metric: str, threshold: float):
+    """
+    :param baseline: o arquivo de resultados de referência.
+    :param current: o arquivo de resultados a ser avaliado.
+    :param metric: a métrica de latência comparada.
+    :param threshold: a regressão relativa máxima tolerada.
+    :return: None. O código de saída é 1 se algum caso regrediu além do limite.
+    """
+    before = {result['name']: result for result in json.loads(baseline.read_text())['results']}
+    after = {result['name']: result for result in json.loads(current.read_text())['results']}
+
+    regressions = 0
+    for name in sorted(before.keys() & after.keys()):
+        old, new = before[name]['latency'][metric], after[name]['latency'][metric]
+        change = (new - old) / old if old else 0.0
+        regressed = change > threshold
+        regressions += regressed
+        click.echo(f"{'REGRESSÃO' if regressed else 'ok':>9} {name}: {old * 1000:.3f} ms -> {new * 1000:.3f} ms "
+                   f"({change:+.1%})")
+
+    for name in sorted(before.keys() ^ after.keys()):
+        click.echo(f"{'ignorado':>9} {name}: presente em apenas um dos arquivos")
+
+    if regressions:
+        click.echo(f"{regressions} caso(s) regrediram mais que {threshold:.0%} em {metric}", err=True)
+        sys.exit(1)
+
+
+@main.command(help="Mede a importação da linha de comando com -X importtime e falha se ela passar do orçamento")
+@click.option('--module', type=click.STRING, default=DEFAULT_STARTUP_MODULE, help="Módulo importado")
+@click.option('--budget', type=click.FloatRange(min=0), default=DEFAULT_STARTUP_BUDGET_MS,
+              help="Tempo máximo de importação, em ms (mediana das execuções)")
+@click.option('--repeat', type=click.IntRange(min=1), default=5, help="Número de interpretadores iniciados")
+@click.option('--top', type=click.IntRange(min=0), default=10, help="Número de módulos mais caros exibidos")
+def startup(module: str, budget: float, repeat: int, top: int):
+    """
+    :param module: o módulo importado.
+    :param budget: o tempo máximo de importação, em ms.
+    :param repeat: o número de interpretadores iniciados.
+    :param top: o número de módulos mais caros exibidos.
+    :return: None. O código de saída é 1 se a mediana passar do orçamento ou se algum módulo de LAZY_MODULES for
+        importado.
+    """
+    samples = []
+    for _ in range(repeat):
+        total, times = _import_times(module)
+        samples.append(total)
+
+    for name, (own, cumulative) in sorted(times.items(), key=lambda item: item[1][0], reverse=True)[:top]:
+        click.echo(f"{own / 1000:8.3f} ms {cumulative / 1000:8.3f} ms  {name}")
+
+    median = statistics.median(samples)
+    eager = [name for name in LAZY_MODULES if name in times]
+    click.echo(f"{module}: mediana {median:.3f} ms (orçamento {budget:.3f} ms)")
+    if eager:
+        click.echo(f"Módulos que deveriam ser importados sob demanda: {', '.join(eager)}", err=True)
+    if median > budget or eager:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
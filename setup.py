@@ -3,11 +3,14 @@ from setuptools import setup, find_packages
 setup(
     name='cryptography',
     version='0.2.0',
-    packages=find_packages(),
+    packages=find_packages(exclude=('benchmarks', 'benchmarks.*', 'tests', 'tests.*')),
     include_package_data=True,
     install_requires=[
         'Click',
     ],
+    extras_require={
+        'numpy': ['numpy'],
+    },
     entry_points={
         'console_scripts': [
             'cryptography = src.cli.main:main',
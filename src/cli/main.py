@@ -1,22 +1,99 @@
+import os
+import sys
+from contextlib import contextmanager
 from pathlib import Path
+from typing import IO, Callable, Iterator, List, Optional, Tuple
 
 import click
 
-from src.cryptography.rsa import RSA
+# Os módulos de criptografia, do servidor e o rich são importados dentro dos comandos que os usam, de modo que cada
+# comando paga apenas pelo que precisa. Aqui ficam só as constantes usadas na montagem das opções.
+from src.cryptography.constants import DEFAULT_PUBLIC_EXPONENT, KEY_FORMATS, MAX_PRIMES, MIN_KEY_BITS
+from src.server.protocol import DEFAULT_HOST, DEFAULT_MAX_BATCH, DEFAULT_SOCKET, OPERATIONS
+from src.util.stats import STATS, STATS_FORMATS
+from src.util.stream import (DEFAULT_CHUNK_SIZE, ThroughputMeter, read_chunks, read_groups, read_length_prefixed,
+                              read_lines, write_length_prefixed)
 
 START = 0
 STOP = 100
 STEP = 1
+MODES = ('char', 'block')
+MODE_HELP = "Modo de criptografia: 'char' (um caractere por operação) ou 'block' (bytes empacotados em blocos)"
+FILE_MODES = MODES + ('envelope', 'container')
+FILE_MODE_HELP = ("Modo de criptografia: 'char' (um caractere por operação), 'block' (bytes empacotados em blocos), "
+                  "'envelope' (chave de sessão cifrada com RSA e dados cifrados com um fluxo de chave autenticado, "
+                  "muito mais rápido para arquivos grandes) ou 'container' (blocos de largura fixa, que permitem "
+                  "desencriptar só um intervalo com --range)")
+CHUNK_SIZE_HELP = "Tamanho dos pedaços lidos de cada vez (bytes no modo 'block', caracteres no modo 'char')"
+PROGRESS_HELP = "Exibe a quantidade processada e a vazão na saída de erro"
+JOBS_HELP = ("Número de processos usados. Com mais de um, os pedaços do arquivo são processados em paralelo. "
+             "Ignorado nos modos 'envelope' e 'container'")
+STATS_HELP = ("Exibe contadores e tempos das operações na saída de erro. Os contadores dos processos de um pool "
+              "(--jobs, --count) não são incluídos")
+STATS_FORMAT_HELP = "Formato do relatório de --stats: texto ou JSON"
+FRAMINGS = ('line', 'length')
+FRAMING_HELP = ("Enquadramento das mensagens: 'line' (uma por linha; no modo 'block', o texto cifrado fica em hexadecimal) "
+                "ou 'length' (cada mensagem precedida pelo seu tamanho em 4 bytes, big-endian, sem restrição de conteúdo)")
+SOCKET_HELP = ("Caminho do socket Unix do servidor local. O padrão fica em $XDG_RUNTIME_DIR ou, sem ele, em um "
+               "diretório do usuário dentro do diretório temporário")
+PORT_HELP = "Porta TCP do servidor local, em 127.0.0.1. Se informada, o socket Unix não é usado"
+TOKEN_ENV = 'CRYPTOGRAPHY_TOKEN'
+TOKEN_HELP = (f"Token de acesso do servidor local, obrigatório com --port. Prefira a variável de ambiente {TOKEN_ENV}, "
+              "que não aparece na lista de processos")
+RANGE_HELP = ("Intervalo de bytes do texto simples, no formato INÍCIO:FIM, com a semântica das fatias do Python "
+              "(por exemplo, 0:4096 ou -1024:). Apenas os blocos que cobrem o intervalo são desencriptados. Exige o "
+              "modo 'container' e um arquivo de entrada")
+AUDIT_JOBS_HELP = ("Número de processos usados nas árvores de produtos e de restos. Compensa a partir de milhares de "
+                   "chaves")
+PROFILE_HELP = "Grava o perfil do cProfile da execução neste arquivo, para ser lido com pstats ou snakeviz"
 
 
 @click.group()
-def main():
+@click.option('--stats', is_flag=True, default=False, help=STATS_HELP)
+@click.option('--stats-format', type=click.Choice(STATS_FORMATS), default='text', help=STATS_FORMAT_HELP)
+@click.option('--profile', 'profile_path', type=click.Path(path_type=Path, dir_okay=False), default=None,
+              help=PROFILE_HELP)
+@click.pass_context
+def main(ctx: click.Context, stats: bool, stats_format: str, profile_path: Optional[Path]):
     """
     Ponto de entrada da aplicação
 
+    :param ctx: o contexto do click, usado para emitir o relatório ao final do comando.
+    :param stats: se True, habilita a coleta de estatísticas e exibe o relatório ao final do comando.
+    :param stats_format: o formato do relatório, 'text' ou 'json'.
+    :param profile_path: se informado, o arquivo em que o perfil do cProfile será gravado.
     :return: None
     """
-    pass
+    if stats:
+        STATS.enabled = True
+        ctx.call_on_close(lambda: click.echo(STATS.report(stats_format), err=True))
+
+    if profile_path:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        def dump():
+            profiler.disable()
+            profiler.dump_stats(str(profile_path))
+
+        ctx.call_on_close(dump)
+
+
+def _check_public_exponent(ctx: click.Context, param: click.Parameter, value: Optional[int]) -> Optional[int]:
+    """
+    Valida a opção -e de create. Um 'e' par nunca é coprimo com φ(n), e a geração nunca terminaria.
+
+    :param ctx: o contexto do click.
+    :param param: a opção.
+    :param value: a chave pública informada, ou None.
+    :return: o valor, inalterado.
+    :raises click.BadParameter: se o valor for par.
+    """
+    if value is not None and value % 2 == 0:
+        raise click.BadParameter(f"a chave pública deve ser ímpar, recebido {value}.")
+    return value
 
 
 @main.command(help="Cria uma chave de criptografia")
@@ -25,35 +102,80 @@ def main():
 @click.option('--start', type=click.INT, default=START, help="Início do intervalo a partir do qual a chave vai ser gerada")
 @click.option('--stop', type=click.INT, default=STOP, help="Fim do intervalo a partir do qual a chave vai ser gerada")
 @click.option('--step', type=click.INT, default=STEP, help="Passo do intervalo")
+@click.option('--bits', type=click.IntRange(min=MIN_KEY_BITS), default=None,
+              help="Tamanho do módulo em bits. Se informado, o intervalo é ignorado")
+@click.option('--rounds', type=click.IntRange(min=1), default=None,
+              help="Rodadas do teste de Miller-Rabin. Por padrão, escolhidas pelo tamanho dos primos")
+@click.option('--primes', type=click.IntRange(2, MAX_PRIMES), default=2,
+              help="Número de primos da chave. Com mais de dois, a descriptografia fica mais rápida")
+@click.option('-e', '--public-exponent', type=click.IntRange(min=3), default=None, callback=_check_public_exponent,
+              help=f"Chave pública 'e', ímpar. Se informada, a chave é gerada sem interação (padrão: {DEFAULT_PUBLIC_EXPONENT})")
+@click.option('--count', type=click.IntRange(min=1), default=1,
+              help="Número de pares de chaves a serem gerados. Com mais de um, a geração é sempre não interativa")
+@click.option('--jobs', type=click.IntRange(min=1), default=None,
+              help="Número de processos usados na geração em lote. O padrão é o número de núcleos")
+@click.option('--key-format', type=click.Choice(KEY_FORMATS), default='text',
+              help="Formato dos arquivos de chave: texto ou binário")
 @click.option("--force", is_flag=True, default=False, )
-def create(private_key: Path, public_key: Path, start: int, stop: int, step: int, force: bool) -> int:
+def create(private_key: Path, public_key: Path, start: int, stop: int, step: int, bits: Optional[int],
+           rounds: Optional[int], primes: int, public_exponent: Optional[int], count: int, jobs: Optional[int], key_format: str,
+           force: bool) -> int:
     """
     :param private_key: O caminho do arquivo onde a chave privada será armazenada.
     :param public_key: o caminho do arquivo onde a chave pública será armazenada.
     :param start: o início do intervalo para gerar a chave.
     :param stop: o final do intervalo para gerar a chave.
     :param step: o valor da etapa para o intervalo.
+    :param bits: o tamanho do módulo em bits. Se informado, o intervalo é ignorado.
+    :param rounds: o número de rodadas do teste de Miller-Rabin. Se None, é escolhido pelo tamanho do primo.
+    :param primes: o número de primos de cada chave, de 2 a MAX_PRIMES.
+    :param public_exponent: a chave pública 'e'. Se None e count for 1, ela é perguntada ao usuário.
+    :param count: o número de pares de chaves. Com mais de um, o índice de cada par é acrescentado ao nome dos arquivos.
+    :param jobs: o número de processos usados na geração em lote.
+    :param key_format: o formato dos arquivos de chave, 'text' ou 'binary'.
     :param force: Se for True, substitua as chaves existentes.
     :return: 1 se uma chave já existir e force for False, caso contrário, 0.
     """
-    rsa = RSA.with_random_prime_numbers(start, stop, step)
-    if private_key.exists() and not force:
-        click.echo(f"Uma chave privada já existe em {private_key}")
-        return 1
+    if count == 1:
+        paths = [(private_key, public_key)]
+    else:
+        paths = [(private_key.with_name(f"{private_key.stem}_{i}{private_key.suffix}"),
+                  public_key.with_name(f"{public_key.stem}_{i}{public_key.suffix}")) for i in range(count)]
+
+    for private_path, public_path in paths:
+        if private_path.exists() and not force:
+            click.echo(f"Uma chave privada já existe em {private_path}")
+            return 1
+
+        if public_path.exists() and not force:
+            click.echo(f"Uma chave publica já existe em {public_path}")
+            return 1
 
-    if public_key.exists() and not force:
-        click.echo(f"Uma chave publica já existe em {public_key}")
-        return 1
+    from src.cryptography.key import RSAKey
+    from src.cryptography.rsa import RSA
 
-    with open(private_key, 'w') as private_key_file:
-        private_key_file.write(f"{rsa.n} {rsa.private_key}")
+    try:
+        if count == 1 and public_exponent is None:
+            keys = [RSA.with_random_prime_numbers(start, stop, step, bits, rounds, primes)]
+        elif count == 1:
+            keys = [RSA.generate(start, stop, step, bits, rounds, public_exponent, primes)]
+        else:
+            keys = RSA.generate_many(count, start, stop, step, bits, rounds,
+                                     public_exponent or DEFAULT_PUBLIC_EXPONENT, jobs, primes)
+    except ValueError as error:
+        click.echo(error, err=True)
+        sys.exit(1)
 
-    click.echo(f'Chave privada criada com sucesso e armazenada em: {private_key}. Não compartilhe com ninguém!')
+    for rsa, (private_path, public_path) in zip(keys, paths):
+        with open(private_path, 'wb') as private_key_file:
+            private_key_file.write(RSAKey.private_from(rsa).dumps(key_format))
 
-    with open(public_key, 'w') as public_key_file:
-        public_key_file.write(f"{rsa.n} {rsa.public_key}")
+        click.echo(f'Chave privada criada com sucesso e armazenada em: {private_path}. Não compartilhe com ninguém!')
 
-    click.echo(f'Chave publica criada com sucesso e armazenada em: {public_key}')
+        with open(public_path, 'wb') as public_key_file:
+            public_key_file.write(RSAKey.public_from(rsa).dumps(key_format))
+
+        click.echo(f'Chave publica criada com sucesso e armazenada em: {public_path}')
 
 
 @main.group(help="Criptografa o conteúdo usando a chave pública")
@@ -69,45 +191,82 @@ def encrypt():
 @encrypt.command(help="Criptografa um texto")
 @click.argument("CONTENT", type=click.STRING)
 @click.argument("PUBLIC_KEY", type=click.Path(exists=True, path_type=Path, file_okay=True, dir_okay=False))
-def text(content: str, public_key: Path):
+@click.option("--mode", type=click.Choice(MODES), default='char', help=MODE_HELP)
+def text(content: str, public_key: Path, mode: str):
     """
     Criptografa um texto usando criptografia RSA.
 
     :param content: o texto a ser criptografado.
     :param public_key: o caminho para o arquivo de chave pública.
+    :param mode: o modo de criptografia. No modo 'block', o texto cifrado é exibido em hexadecimal.
     :return: o texto criptografado.
     """
-    file_content = open(public_key, 'r').read()
-    n = int(file_content.split(" ")[0])
-    key = int(file_content.split(" ")[1])
-
-    ciphered = RSA.encrypt_with(n, key, content)
+    key = _load_key(public_key)
+    _check_char_mode(key, mode)
+
+    try:
+        with STATS.phase('encrypt.text'):
+            if mode == 'block':
+                ciphered = key.block_cipher().encrypt(content.encode()).hex()
+            else:
+                ciphered = key.translate(content)
+    except ValueError as error:
+        raise click.ClickException(str(error))
 
     click.echo(ciphered)
 
 
-@encrypt.command(help="Criptografa um arquivo")
-@click.argument('INPUT_FILE', type=click.Path(path_type=Path, exists=True, file_okay=True, dir_okay=False))
-@click.argument('OUTPUT', type=click.Path(path_type=Path, file_okay=True, dir_okay=False, exists=False))
+@encrypt.command(help="Criptografa um arquivo. Use '-' para ler da entrada padrão ou escrever na saída padrão")
+@click.argument('INPUT_FILE', type=click.Path(path_type=Path, exists=True, file_okay=True, dir_okay=False,
+                                              allow_dash=True))
+@click.argument('OUTPUT', type=click.Path(path_type=Path, file_okay=True, dir_okay=False, exists=False,
+                                          allow_dash=True))
 @click.argument("PUBLIC_KEY", type=click.Path(exists=True, path_type=Path, file_okay=True, dir_okay=False))
-def file(input_file: Path, output: Path, public_key: Path):
+@click.option("--mode", type=click.Choice(FILE_MODES), default='char', help=FILE_MODE_HELP)
+@click.option("--chunk-size", type=click.IntRange(min=1), default=DEFAULT_CHUNK_SIZE, help=CHUNK_SIZE_HELP)
+@click.option("--progress", is_flag=True, default=False, help=PROGRESS_HELP)
+@click.option("--jobs", type=click.IntRange(min=1), default=1, help=JOBS_HELP)
+def file(input_file: Path, output: Path, public_key: Path, mode: str, chunk_size: int, progress: bool, jobs: int):
     """
-    :param input_file: Caminho para o arquivo de entrada que precisa ser criptografado.
-    :param output: caminho para o arquivo de saída em que os dados criptografados serão armazenados.
+    :param input_file: Caminho para o arquivo de entrada que precisa ser criptografado, ou '-' para a entrada padrão.
+    :param output: caminho para o arquivo de saída em que os dados criptografados serão armazenados, ou '-' para a saída padrão.
     :param public_key: Caminho para o arquivo que contém a chave pública usada para criptografia.
+    :param mode: o modo de criptografia. Nos modos 'block', 'envelope' e 'container', o arquivo é lido e escrito como
+        binário.
+    :param chunk_size: o tamanho dos pedaços lidos de cada vez.
+    :param progress: se True, exibe a quantidade processada e a vazão na saída de erro.
+    :param jobs: o número de processos usados.
     :return: Nenhum
     """
-    source = open(input_file, 'r').read()
+    key = _load_key(public_key)
+    _check_char_mode(key, mode)
+
+    try:
+        if mode == 'envelope':
+            from src.cryptography.envelope import Envelope
 
-    file_content = open(public_key, 'r').read()
-    n = int(file_content.split(" ")[0])
-    key = int(file_content.split(" ")[1])
+            transform = Envelope(key).encrypt_stream
+        elif mode == 'container':
+            from src.cryptography.container import Container
 
-    cyphered = RSA.encrypt_with(n, key, source)
-    with open(output, 'w') as f:
-        f.write(cyphered)
+            transform = Container(key).encrypt_stream
+        elif jobs > 1:
+            from src.cryptography.parallel import ParallelCipher
 
-    click.echo(f"Arquivo encriptado com sucesso! O arquivo encriptado está em: {output}")
+            transform = ParallelCipher(key, mode == 'block', jobs).encrypt_stream
+        elif mode == 'block':
+            transform = key.block_cipher().encrypt_stream
+        else:
+            def transform(chunks):
+                return (key.translate(chunk) for chunk in chunks)
+
+        with STATS.phase('encrypt.file'):
+            _transform_file(input_file, output, mode != 'char', transform, chunk_size, progress)
+    except ValueError as error:
+        click.echo(error, err=True)
+        sys.exit(1)
+
+    click.echo(f"Arquivo encriptado com sucesso! O arquivo encriptado está em: {output}", err=_is_dash(output))
 
 
 @main.group(help="Desencripta usando a chave de criptografia privada")
@@ -123,50 +282,452 @@ def decrypt():
 @decrypt.command(help="Desencipta um texto")
 @click.argument("CONTENT", type=click.STRING)
 @click.argument("PRIVATE_KEY", type=click.Path(exists=True, path_type=Path, file_okay=True, dir_okay=False))
-def text(content: str, private_key: Path):
+@click.option("--mode", type=click.Choice(MODES), default='char', help=MODE_HELP)
+def text(content: str, private_key: Path, mode: str):
     """
     Desencripta um texto.
 
-    :param content: O texto a ser desencriptado.
+    :param content: O texto a ser desencriptado. No modo 'block', ele deve estar em hexadecimal.
     :param private_key: O caminho para o arquivo da chave privada.
+    :param mode: o modo de criptografia usado para gerar o texto.
     :type content: str
     :type private_key: Path
     :return: None
     """
-    file_content = open(private_key, 'r').read()
-    n = int(file_content.split(" ")[0])
-    key = int(file_content.split(" ")[1])
-
-    decrypted = RSA.decrypt_with(n, key, content)
+    key = _load_key(private_key)
+    _check_char_mode(key, mode)
+
+    if mode == 'block':
+        try:
+            ciphered = bytes.fromhex(content)
+        except ValueError:
+            raise click.BadParameter("no modo 'block', o texto cifrado deve estar em hexadecimal.",
+                                     param_hint="'CONTENT'")
+
+    try:
+        with STATS.phase('decrypt.text'):
+            if mode == 'block':
+                decrypted = key.block_cipher().decrypt(ciphered).decode()
+            else:
+                decrypted = key.translate(content)
+    except ValueError as error:
+        raise click.ClickException(str(error))
 
     click.echo(decrypted)
 
 
-@decrypt.command(help="Desencripta um arquivo")
-@click.argument('INPUT_FILE', type=click.Path(path_type=Path, exists=True, file_okay=True, dir_okay=False))
-@click.argument('OUTPUT', type=click.Path(path_type=Path, file_okay=True, dir_okay=False, exists=False))
+@decrypt.command(help="Desencripta um arquivo. Use '-' para ler da entrada padrão ou escrever na saída padrão")
+@click.argument('INPUT_FILE', type=click.Path(path_type=Path, exists=True, file_okay=True, dir_okay=False,
+                                              allow_dash=True))
+@click.argument('OUTPUT', type=click.Path(path_type=Path, file_okay=True, dir_okay=False, exists=False,
+                                          allow_dash=True))
 @click.argument("PRIVATE_KEY", type=click.Path(exists=True, path_type=Path, file_okay=True, dir_okay=False))
 @click.option("--force", is_flag=True, default=False, help="Forca a sobrescrita das chaves")
-def file(input_file: Path, output: Path, private_key: Path, force: bool):
+@click.option("--mode", type=click.Choice(FILE_MODES), default='char', help=FILE_MODE_HELP)
+@click.option("--chunk-size", type=click.IntRange(min=1), default=DEFAULT_CHUNK_SIZE, help=CHUNK_SIZE_HELP)
+@click.option("--progress", is_flag=True, default=False, help=PROGRESS_HELP)
+@click.option("--jobs", type=click.IntRange(min=1), default=1, help=JOBS_HELP)
+@click.option("--range", "byte_range", type=click.STRING, default=None, help=RANGE_HELP)
+def file(input_file: Path, output: Path, private_key: Path, force: bool, mode: str, chunk_size: int, progress: bool,
+         jobs: int, byte_range: Optional[str]):
     """
-    :param input_file: caminho para o arquivo de entrada que precisa ser descriptografado.
-    :param output: Caminho para o arquivo de saída em que o conteúdo descriptografado será salvo.
+    :param input_file: caminho para o arquivo de entrada que precisa ser descriptografado, ou '-' para a entrada padrão.
+    :param output: Caminho para o arquivo de saída em que o conteúdo descriptografado será salvo, ou '-' para a saída padrão.
     :param private_key: Caminho para o arquivo que contém a chave privada usada para descriptografia.
     :param force: um sinalizador booleano que indica se o arquivo de saída deve ser substituído por força, caso ele já exista.
+    :param mode: o modo de criptografia usado para gerar o arquivo.
+    :param chunk_size: o tamanho dos pedaços lidos de cada vez.
+    :param progress: se True, exibe a quantidade processada e a vazão na saída de erro.
+    :param jobs: o número de processos usados.
+    :param byte_range: o intervalo do texto simples a ser desencriptado, no formato INÍCIO:FIM (apenas no modo
+        'container').
     :return: Nenhum
     """
-    source = open(input_file, 'r').read()
+    key = _load_key(private_key)
+    _check_char_mode(key, mode)
+
+    if mode == 'container':
+        _decrypt_container(key, input_file, output, force, progress, byte_range)
+        return
+    if byte_range is not None:
+        click.echo("A opção --range exige o modo 'container'.", err=True)
+        sys.exit(1)
+
+    if _is_dash(output) or not output.exists() or force:
+        try:
+            if mode == 'envelope':
+                from src.cryptography.envelope import Envelope
+
+                transform = Envelope(key).decrypt_stream
+            elif jobs > 1:
+                from src.cryptography.parallel import ParallelCipher
+
+                transform = ParallelCipher(key, mode == 'block', jobs).decrypt_stream
+            elif mode == 'block':
+                transform = key.block_cipher().decrypt_stream
+            else:
+                def transform(chunks):
+                    return (key.translate(chunk) for chunk in chunks)
+
+            with STATS.phase('decrypt.file'):
+                _transform_file(input_file, output, mode != 'char', transform, chunk_size, progress)
+        except ValueError as error:
+            click.echo(error, err=True)
+            sys.exit(1)
+
+    click.echo(f"Arquivo desencriptado com sucesso! O arquivo encriptado está em: {output}", err=_is_dash(output))
+
+
+def _decrypt_container(key, input_file: Path, output: Path, force: bool, progress: bool, byte_range: Optional[str]):
+    """
+    Desencripta um contêiner (modo 'container'), inteiro ou apenas um intervalo do texto simples. Ao contrário dos
+    demais modos, a entrada é mapeada em memória em vez de lida em pedaços, e apenas os blocos do intervalo são lidos.
+
+    :param key: a chave privada carregada (RSAKey).
+    :param input_file: o contêiner. Ele precisa ser um arquivo comum.
+    :param output: o arquivo de saída, ou '-' para a saída padrão.
+    :param force: se True, sobrescreve o arquivo de saída, caso ele já exista.
+    :param progress: se True, exibe a quantidade processada e a vazão na saída de erro.
+    :param byte_range: o intervalo no formato INÍCIO:FIM, ou None para o texto inteiro.
+    :return: None. O código de saída é 1 se a entrada, o intervalo ou o contêiner forem inválidos; nesse caso, o arquivo
+        de saída não é criado nem alterado.
+    """
+    from src.cryptography.container import Container, parse_range
+
+    if _is_dash(input_file):
+        click.echo("O modo 'container' exige um arquivo de entrada, pois ele é lido por acesso aleatório.", err=True)
+        sys.exit(1)
+    try:
+        start, end = parse_range(byte_range) if byte_range is not None else (None, None)
+    except ValueError as error:
+        click.echo(error, err=True)
+        sys.exit(1)
+
+    if _is_dash(output) or not output.exists() or force:
+        try:
+            with STATS.phase('decrypt.file'), _open_output(output, 'wb') as sink:
+                pieces = Container(key).decrypt_range(input_file, start, end)
+                if progress:
+                    pieces = ThroughputMeter(lambda line: click.echo(line, err=True)).track(pieces)
+                for piece in pieces:
+                    sink.write(piece)
+        except ValueError as error:
+            click.echo(error, err=True)
+            sys.exit(1)
+
+    click.echo(f"Arquivo desencriptado com sucesso! O arquivo encriptado está em: {output}", err=_is_dash(output))
+
+
+@main.command(help="Criptografa ou desencripta várias mensagens em uma única execução, lendo a chave uma única vez")
+@click.argument('OPERATION', type=click.Choice(OPERATIONS))
+@click.argument("KEY", type=click.Path(exists=True, path_type=Path, file_okay=True, dir_okay=False))
+@click.argument('INPUT_FILE', type=click.Path(path_type=Path, exists=True, file_okay=True, dir_okay=False,
+                                              allow_dash=True), default='-')
+@click.argument('OUTPUT', type=click.Path(path_type=Path, file_okay=True, dir_okay=False, exists=False,
+                                          allow_dash=True), default='-')
+@click.option("--mode", type=click.Choice(MODES), default='char', help=MODE_HELP)
+@click.option("--framing", type=click.Choice(FRAMINGS), default='line', help=FRAMING_HELP)
+def batch(operation: str, key: Path, input_file: Path, output: Path, mode: str, framing: str):
+    """
+    :param operation: 'encrypt' ou 'decrypt'.
+    :param key: o caminho do arquivo de chave, pública para criptografar e privada para descriptografar.
+    :param input_file: o arquivo com as mensagens, ou '-' para a entrada padrão.
+    :param output: o arquivo em que os resultados serão escritos, na ordem das mensagens, ou '-' para a saída padrão.
+    :param mode: o modo de criptografia.
+    :param framing: o enquadramento das mensagens, na entrada e na saída: 'line' ou 'length'.
+    :return: None. O código de saída é 1 se alguma mensagem for inválida ou não corresponder à chave, ou se algum
+        resultado não puder ser escrito com o enquadramento por linha. Nesses casos, 'output' não é criado nem alterado.
+    """
+    loaded = _load_key(key)
+    _check_char_mode(loaded, mode)
+    try:
+        transform = _message_transform(loaded, operation, mode, framing == 'line')
+        with click.open_file(str(input_file), 'rb') as source, _open_output(output, 'wb') as sink:
+            messages = read_lines(source) if framing == 'line' else read_length_prefixed(source)
+            with STATS.phase(f'{operation}.batch'):
+                # As mensagens são transformadas em grupos: no modo 'block', os blocos de todo o grupo passam por uma
+                # única chamada da PreparedKey da chave.
+                results = (result for group in read_groups(messages) for result in transform(group))
+                for index, result in enumerate(results):
+                    STATS.count('batch.messages')
+                    if framing == 'length':
+                        write_length_prefixed(sink, result)
+                    elif b'\n' in result:
+                        click.echo(f"O resultado da mensagem {index} contém uma quebra de linha; use --framing length.",
+                                   err=True)
+                        sys.exit(1)
+                    else:
+                        sink.write(result + b'\n')
+    except ValueError as error:
+        click.echo(error, err=True)
+        sys.exit(1)
+
+
+def _message_transform(key, operation: str, mode: str, hexadecimal: bool) -> Callable[[List[bytes]], List[bytes]]:
+    """
+    Monta a função que transforma um grupo de mensagens do comando batch.
+
+    :param key: a chave carregada (RSAKey).
+    :param operation: 'encrypt' ou 'decrypt'.
+    :param mode: 'char' ou 'block'.
+    :param hexadecimal: se True, no modo 'block' o texto cifrado é lido e escrito em hexadecimal.
+    :return: uma função que recebe as mensagens e retorna os resultados, na mesma ordem, todos em bytes. No modo
+        'char', o texto é codificado em UTF-8 (os substitutos, que aparecem no texto cifrado, são preservados).
+    """
+    if mode == 'char':
+        return lambda messages: [key.translate(message.decode('utf-8', 'surrogatepass')).encode('utf-8', 'surrogatepass')
+                                 for message in messages]
+
+    prepared = key.prepared()
+    if operation == 'encrypt':
+        if hexadecimal:
+            return lambda messages: [ciphertext.hex().encode() for ciphertext in prepared.encrypt_many(messages)]
+        return prepared.encrypt_many
+    if hexadecimal:
+        return lambda messages: prepared.decrypt_many(_from_hex(message) for message in messages)
+    return prepared.decrypt_many
+
+
+def _from_hex(message: bytes) -> bytes:
+    """
+    Converte uma mensagem do comando batch, em hexadecimal, para bytes.
+
+    :param message: a mensagem, em hexadecimal.
+    :return: os bytes da mensagem.
+    :raises ValueError: se a mensagem não estiver em hexadecimal.
+    """
+    try:
+        return bytes.fromhex(message.decode('ascii'))
+    except ValueError:
+        raise ValueError(f"A mensagem {message[:40]!r} não está em hexadecimal, como exige o modo 'block'.") from None
+
+
+@main.command(help="Procura fatores primos compartilhados entre chaves (mdc em lote). Aceita arquivos e diretórios")
+@click.argument('KEYS', nargs=-1, required=True, type=click.Path(exists=True, path_type=Path))
+@click.option("--jobs", type=click.IntRange(min=1), default=1, help=AUDIT_JOBS_HELP)
+@click.option("--format", "report_format", type=click.Choice(STATS_FORMATS), default='text',
+              help="Formato do relatório: texto ou JSON")
+def audit(keys: Tuple[Path, ...], jobs: int, report_format: str):
+    """
+    :param keys: os arquivos de chave e os diretórios com arquivos de chave.
+    :param jobs: o número de processos usados nas árvores do mdc em lote.
+    :param report_format: o formato do relatório, 'text' ou 'json'.
+    :return: None. O código de saída é 1 se algum módulo se repetir em mais de um par ou compartilhar fatores com
+        outro.
+    """
+    import json
+
+    from src.cryptography.audit import KeyAudit, read_moduli
+
+    def warn(path: Path, error: Exception):
+        click.echo(f"Ignorando {path}: {error}", err=True)
+
+    auditor = KeyAudit(jobs)
+    findings = auditor.audit(read_moduli(keys, warn))
+
+    if report_format == 'json':
+        click.echo(json.dumps({
+            'keys': auditor.keys,
+            'moduli': auditor.moduli,
+            'findings': [{'paths': [str(path) for path in finding.paths], 'factor': finding.factor,
+                          'factored': finding.factored, 'reused': finding.reused,
+                          'partners': [str(path) for path in finding.partners]}
+                         for finding in findings],
+        }))
+    else:
+        for finding in findings:
+            names = ', '.join(map(str, finding.paths))
+            partners = ', '.join(map(str, finding.partners))
+            if finding.reused:
+                shared = f"; também compartilha fatores com {partners}" if partners else ""
+                click.echo(f"{names}: o mesmo módulo aparece em mais de um par de chaves{shared}")
+            elif finding.factored:
+                click.echo(f"{names}: compartilha o fator {finding.factor} com {partners}")
+            else:
+                click.echo(f"{names}: todos os fatores aparecem em outras chaves ({partners})")
+        reused = sum(finding.reused for finding in findings)
+        click.echo(f"{auditor.keys} chaves lidas, {auditor.moduli} módulos distintos, {reused} repetidos em mais de um "
+                   f"par, {len(findings) - reused} com fatores compartilhados.")
+
+    if findings:
+        sys.exit(1)
+
+
+@main.command(help="Inicia o servidor local de criptografia, que mantém as chaves em memória e agrupa as requisições")
+@click.option('--socket', 'socket_path', type=click.Path(path_type=Path, dir_okay=False), default=DEFAULT_SOCKET,
+              help=SOCKET_HELP)
+@click.option('--port', type=click.IntRange(min=1, max=65535), default=None, help=PORT_HELP)
+@click.option('--jobs', type=click.IntRange(min=0), default=None,
+              help="Número de processos que executam os lotes. O padrão é o número de núcleos; 0 executa os lotes no "
+                   "próprio servidor, com a menor latência para textos curtos")
+@click.option('--max-batch', type=click.IntRange(min=1), default=DEFAULT_MAX_BATCH,
+              help="Número máximo de requisições por lote")
+@click.option('--key', 'keys', type=click.Path(exists=True, path_type=Path, file_okay=True, dir_okay=False),
+              multiple=True, required=True,
+              help="Arquivo de chave que o servidor aceita. Pode ser repetida; qualquer outra chave é recusada")
+@click.option('--token', default=None, envvar=TOKEN_ENV, help=TOKEN_HELP)
+def serve(socket_path: Path, port: Optional[int], jobs: Optional[int], max_batch: int, keys: Tuple[Path, ...],
+          token: Optional[str]):
+    """
+    :param socket_path: o caminho do socket Unix. Ignorado se 'port' for informado.
+    :param port: a porta TCP do localhost.
+    :param jobs: o número de processos que executam os lotes, ou 0 para executá-los no próprio servidor.
+    :param max_batch: o número máximo de requisições por lote.
+    :param keys: os arquivos de chave que o servidor aceita. Eles são lidos na inicialização.
+    :param token: o token de acesso que as requisições devem trazer. Obrigatório com 'port'.
+    :return: None. O código de saída é 1 se alguma chave for inválida, se 'port' for informado sem 'token' ou se o
+        socket não puder ser criado.
+    """
+    from src.server.daemon import Daemon
+
+    if port is not None and not token:
+        click.echo(f"O servidor TCP exige um token de acesso (--token ou {TOKEN_ENV}).", err=True)
+        sys.exit(1)
+    for key in keys:
+        _load_key(key)
+
+    address = f"{DEFAULT_HOST}:{port}" if port is not None else str(socket_path)
+    click.echo(f"Servidor escutando em {address}. Pressione Ctrl+C para encerrar.", err=True)
+    try:
+        Daemon(socket_path, port, jobs, max_batch, keys, token).run()
+    except KeyboardInterrupt:
+        click.echo("Servidor encerrado.", err=True)
+    except (ValueError, OSError) as error:
+        click.echo(f"Não foi possível iniciar o servidor: {error}", err=True)
+        sys.exit(1)
+
+
+@main.command(help="Criptografa ou desencripta um texto pelo servidor local (ver 'serve')")
+@click.argument('OPERATION', type=click.Choice(OPERATIONS))
+@click.argument("CONTENT", type=click.STRING)
+@click.argument("KEY", type=click.Path(exists=True, path_type=Path, file_okay=True, dir_okay=False))
+@click.option("--mode", type=click.Choice(MODES), default='char', help=MODE_HELP)
+@click.option('--socket', 'socket_path', type=click.Path(path_type=Path, dir_okay=False), default=DEFAULT_SOCKET,
+              help=SOCKET_HELP)
+@click.option('--port', type=click.IntRange(min=1, max=65535), default=None, help=PORT_HELP)
+@click.option('--token', default=None, envvar=TOKEN_ENV, help=TOKEN_HELP)
+def client(operation: str, content: str, key: Path, mode: str, socket_path: Path, port: Optional[int],
+           token: Optional[str]):
+    """
+    :param operation: 'encrypt' ou 'decrypt'.
+    :param content: o texto a ser transformado. No modo 'block', a descriptografia espera o texto em hexadecimal.
+    :param key: o caminho do arquivo de chave, pública para criptografar e privada para descriptografar.
+    :param mode: o modo de criptografia.
+    :param socket_path: o caminho do socket Unix. Ignorado se 'port' for informado.
+    :param port: a porta TCP do localhost.
+    :param token: o token de acesso do servidor.
+    :return: None. O código de saída é 1 se o servidor não estiver acessível ou responder com um erro.
+    """
+    from src.server.client import DaemonClient
+
+    daemon = DaemonClient(socket_path, port, token)
+    try:
+        click.echo(daemon.request(operation, key, content, mode))
+    except OSError as error:
+        click.echo(f"Não foi possível falar com o servidor: {error}", err=True)
+        sys.exit(1)
+    except ValueError as error:
+        click.echo(f"O servidor respondeu com um erro: {error}", err=True)
+        sys.exit(1)
+    finally:
+        daemon.close()
+
+
+def _load_key(path: Path):
+    """
+    Carrega um arquivo de chave pelo KEY_LOADER. Um arquivo inválido termina o comando com código 1 e uma mensagem, sem
+    reproduzir o conteúdo do arquivo.
+
+    :param path: o caminho do arquivo de chave.
+    :return: a chave carregada (RSAKey).
+    """
+    from src.cryptography.key import KEY_LOADER
 
-    file_content = open(private_key, 'r').read()
-    n = int(file_content.split(" ")[0])
-    key = int(file_content.split(" ")[1])
+    try:
+        return KEY_LOADER.load(path)
+    except ValueError as error:
+        click.echo(f"{path}: {error}", err=True)
+        sys.exit(1)
 
-    cyphered = RSA.decrypt_with(n, key, source)
-    if not output.exists() or force:
-        with open(output, 'w') as f:
-            f.write(cyphered)
 
-    click.echo(f"Arquivo desencriptado com sucesso! O arquivo encriptado está em: {output}")
+def _check_char_mode(key, mode: str):
+    """
+    Verifica se a chave pode ser usada no modo por caractere, em que cada resultado, menor que n, precisa ser um código
+    Unicode. Chaves geradas com --bits não cabem nesse limite.
+
+    :param key: a chave carregada (RSAKey).
+    :param mode: o modo escolhido.
+    :return: None
+    :raises click.BadParameter: se o modo for 'char' e n for maior que MAX_CHAR_MODULUS.
+    """
+    from src.cryptography.table import MAX_CHAR_MODULUS
+
+    if mode == 'char' and key.n > MAX_CHAR_MODULUS:
+        raise click.BadParameter(f"o modo 'char' exige um módulo de até {MAX_CHAR_MODULUS}, e esta chave tem "
+                                 f"{key.n.bit_length()} bits. Use --mode block (ou, para arquivos, --mode envelope).",
+                                 param_hint="'--mode'")
+
+
+def _is_dash(path: Path) -> bool:
+    """
+    Verifica se o caminho informado representa a entrada ou saída padrão.
+
+    :param path: o caminho recebido pela linha de comando.
+    :return: True se o caminho for '-'.
+    """
+    return str(path) == '-'
+
+
+@contextmanager
+def _open_output(output: Path, mode: str) -> Iterator[IO]:
+    """
+    Abre o arquivo de saída por meio de um arquivo temporário no mesmo diretório, renomeado para 'output' apenas se o
+    bloco terminar sem erro. Em caso de erro, o temporário é removido, e 'output' não é criado nem alterado.
+
+    :param output: o arquivo de saída, ou '-' para a saída padrão, que é escrita diretamente.
+    :param mode: o modo de abertura, 'w' ou 'wb'.
+    :return: um gerador que produz o arquivo aberto (para uso com 'with').
+    """
+    if _is_dash(output):
+        with click.open_file('-', mode) as sink:
+            yield sink
+        return
+
+    temporary = output.with_name(f'.{output.name}.{os.getpid()}.tmp')
+    try:
+        with open(temporary, mode.replace('w', 'x')) as sink:
+            yield sink
+        os.replace(temporary, output)
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+
+
+def _transform_file(input_file: Path, output: Path, binary: bool, transform: Callable[[Iterator], Iterator],
+                    chunk_size: int, progress: bool):
+    """
+    Lê o arquivo de entrada em pedaços, aplica a transformação e escreve cada pedaço assim que ele é produzido, de modo
+    que a memória usada não depende do tamanho do arquivo.
+
+    A saída é escrita em um arquivo temporário, renomeado para 'output' apenas ao final. Se a transformação falhar (por
+    exemplo, na autenticação do envelope), o temporário é removido, e nenhum texto simples parcial fica em 'output'.
+
+    :param input_file: o arquivo de entrada, ou '-' para a entrada padrão.
+    :param output: o arquivo de saída, ou '-' para a saída padrão.
+    :param binary: se True, os arquivos são abertos em modo binário.
+    :param transform: função que recebe o gerador de pedaços lidos e retorna o gerador de pedaços transformados.
+    :param chunk_size: o tamanho dos pedaços lidos de cada vez.
+    :param progress: se True, exibe a quantidade processada e a vazão na saída de erro.
+    :return: None
+    :raises ValueError: se a transformação falhar. O arquivo de saída não é criado nem alterado.
+    """
+    suffix = 'b' if binary else ''
+    with click.open_file(str(input_file), 'r' + suffix) as source, _open_output(output, 'w' + suffix) as sink:
+        chunks = read_chunks(source, chunk_size)
+        if progress:
+            chunks = ThroughputMeter(lambda line: click.echo(line, err=True)).track(chunks)
+        for piece in transform(chunks):
+            sink.write(piece)
 
 
 if __name__ == '__main__':
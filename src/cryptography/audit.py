@@ -0,0 +1,154 @@
+from collections import Counter
+from math import gcd
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from attr import define, field
+
+from src.cryptography.key import RSAKey
+from src.util.batch_gcd import DEFAULT_CHUNK_SIZE, BatchGCD
+from src.util.stats import STATS
+
+# Papel dos arquivos no formato legado, que não registra o tipo da chave. Um par tem no máximo um arquivo de cada papel
+# versionado e no máximo dois arquivos legados (as chaves pública e privada, que podem ter o mesmo expoente).
+LEGACY_ROLE = 'legacy'
+ROLE_LIMITS = {'public': 1, 'private': 1, LEGACY_ROLE: 2}
+
+
+def key_role(key: RSAKey) -> str:
+    """
+    Identifica o papel de um arquivo de chave dentro do seu par (ver ROLE_LIMITS).
+
+    :param key: a chave.
+    :return: 'public' ou 'private' para os formatos versionados, ou LEGACY_ROLE para o formato legado.
+    """
+    if key.private is None:
+        return LEGACY_ROLE
+    return 'private' if key.private else 'public'
+
+
+def read_moduli(paths: Iterable[Path],
+                on_error: Optional[Callable[[Path, Exception], None]] = None) -> Iterator[Tuple[Path, int, str]]:
+    """
+    Lê os módulos de arquivos de chave, um arquivo de cada vez, sem manter o conteúdo dos arquivos em memória.
+
+    :param paths: arquivos de chave ou diretórios. De cada diretório são lidos os arquivos imediatamente dentro dele, em
+        ordem alfabética.
+    :param on_error: função chamada com o caminho e o erro de cada arquivo que não puder ser lido. Se None, o arquivo é
+        ignorado silenciosamente.
+    :return: um gerador das tuplas (caminho, módulo, papel), com o papel dado por key_role.
+    """
+    for path in paths:
+        files = sorted(child for child in path.iterdir() if child.is_file()) if path.is_dir() else [path]
+        for file in files:
+            try:
+                key = RSAKey.loads(file.read_bytes())
+                if key.n < 2:
+                    raise ValueError(f"Módulo inválido: {key.n}.")
+            except (ValueError, OSError) as error:
+                if on_error is not None:
+                    on_error(file, error)
+                continue
+            STATS.count('audit.keys')
+            yield file, key.n, key_role(key)
+
+
+@define(frozen=True)
+class AuditFinding:
+    """
+    Classe que representa um módulo que compartilha fatores primos com outros módulos ou que se repete em mais de um
+    par de chaves.
+
+    Atributos:
+        paths (Tuple[Path, ...]): os arquivos com este módulo (por exemplo, as chaves pública e privada de um par).
+        n (int): o módulo.
+        factor (int): mdc(n, produto dos demais módulos). Para um módulo repetido, o próprio n.
+        partners (Tuple[Path, ...]): um arquivo de cada módulo com que este compartilha fatores.
+        reused (bool): se o módulo aparece em mais de um par de chaves. Quem tem a chave privada de um dos pares pode
+            desencriptar as mensagens de todos eles.
+
+    Propriedades:
+        factored (bool): se o fator compartilhado é um primo próprio de n, o que fatora n de imediato.
+    """
+    paths: Tuple[Path, ...]
+    n: int
+    factor: int
+    partners: Tuple[Path, ...]
+    reused: bool = False
+
+    @property
+    def factored(self) -> bool:
+        """
+        Verifica se o fator compartilhado é um divisor próprio de n. Quando todos os fatores de n aparecem em outros
+        módulos, o fator é o próprio n, e os primos saem dos mdc com cada parceiro.
+
+        :return: True se 1 < factor < n.
+        """
+        return 1 < self.factor < self.n
+
+
+@define
+class KeyAudit:
+    """
+    Classe que procura fatores primos compartilhados entre os módulos de muitas chaves.
+
+    Dois módulos que compartilham um primo são fatorados por um único mdc, o que revela as duas chaves privadas. Os
+    módulos são lidos em fluxo e auditados pelo mdc em lote de Bernstein (ver BatchGCD), em tempo quase linear. Apenas
+    os módulos sinalizados são comparados dois a dois, para descobrir os parceiros de cada um.
+
+    Arquivos com o mesmo módulo (como as chaves pública e privada de um mesmo par) são tratados como uma única chave no
+    mdc em lote. Antes dele, os arquivos são agrupados por módulo e por papel (ver key_role): se um módulo tiver mais
+    arquivos de um papel do que cabem em um par (ver ROLE_LIMITS), ele vem de pares diferentes e é relatado como
+    repetido. Um mesmo arquivo informado duas vezes é contado uma única vez.
+
+    Atributos:
+        jobs (int): o número de processos usados nas árvores.
+        chunk_size (int): o número máximo de módulos por árvore.
+        keys (int): o número de arquivos lidos na última auditoria.
+        moduli (int): o número de módulos distintos na última auditoria.
+
+    Métodos:
+        audit(keys: Iterable[Tuple[Path, int, str]]) -> List[AuditFinding]: Audita os módulos informados.
+    """
+    jobs: int = 1
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    keys: int = field(init=False, default=0)
+    moduli: int = field(init=False, default=0)
+
+    def audit(self, keys: Iterable[Tuple[Path, int, str]]) -> List[AuditFinding]:
+        """
+        Audita os módulos informados.
+
+        :param keys: as tuplas (caminho, módulo, papel), por exemplo, de read_moduli.
+        :return: os módulos repetidos em mais de um par ou que compartilham fatores com outros, na ordem em que foram
+            lidos.
+        """
+        paths: Dict[int, List[Path]] = {}
+        roles: Dict[int, Counter] = {}
+        reused: Set[int] = set()
+        seen: Set[Path] = set()
+        self.keys = 0
+        for path, n, role in keys:
+            resolved = path.resolve()
+            if resolved in seen:
+                continue
+            seen.add(resolved)
+            paths.setdefault(n, []).append(path)
+            counts = roles.setdefault(n, Counter())
+            counts[role] += 1
+            if counts[role] > ROLE_LIMITS[role]:
+                reused.add(n)
+            self.keys += 1
+        moduli = list(paths)
+        self.moduli = len(moduli)
+
+        factors = BatchGCD(self.jobs, self.chunk_size).run(moduli)
+        flagged = [(n, factor) for n, factor in zip(moduli, factors) if factor != 1]
+
+        findings = []
+        for n, factor in zip(moduli, factors):
+            if factor == 1 and n not in reused:
+                continue
+            partners = tuple(paths[other][0] for other, _ in flagged if other != n and gcd(n, other) != 1)
+            findings.append(AuditFinding(tuple(paths[n]), n, n if n in reused else factor, partners, n in reused))
+        return findings
@@ -0,0 +1,231 @@
+from typing import Callable, Iterable, Iterator, Optional
+
+from attr import define
+
+from src.util.stats import STATS
+from src.util.vectorized import power_blocks, vectorizable
+
+PADDING_MARKER = 0x80
+
+
+@define
+class BlockCipher:
+    """
+    Classe que aplica o RSA a blocos de bytes.
+
+    A mensagem recebe o preenchimento ISO/IEC 7816-4 (um byte 0x80 seguido de zeros até completar um bloco) e é dividida
+    em blocos de 'plaintext_block_size' bytes, o maior tamanho cujo valor é sempre menor que n. Cada bloco é convertido
+    em um inteiro big-endian, exponenciado uma única vez e escrito com largura fixa de 'ciphertext_block_size' bytes.
+    Com módulos menores que 2^32 e o NumPy instalado, os blocos de cada pedaço são exponenciados de uma vez (ver
+    src.util.vectorized).
+
+    Atributos:
+        n (int): O módulo da chave.
+        exponent (int): o expoente da chave (a chave pública para criptografar, a privada para descriptografar).
+        power (Optional[Callable[[int], int]]): função que aplica a chave a um bloco, por exemplo, pelo Teorema Chinês
+            do Resto. O padrão é pow(bloco, exponent, n).
+
+    Propriedades:
+        plaintext_block_size (int): o número de bytes de texto simples empacotados em cada bloco.
+        ciphertext_block_size (int): o número de bytes de cada bloco cifrado.
+
+    Métodos:
+        encrypt(plaintext: bytes) -> bytes: Criptografa uma sequência de bytes.
+        decrypt(ciphertext: bytes) -> bytes: Descriptografa uma sequência de bytes.
+        encrypt_stream(chunks: Iterable[bytes]) -> Iterator[bytes]: Criptografa uma sequência de pedaços de tamanho arbitrário.
+        decrypt_stream(chunks: Iterable[bytes]) -> Iterator[bytes]: Descriptografa uma sequência de pedaços de tamanho arbitrário.
+        encrypt_blocks(data: bytes) -> bytes: Criptografa bytes já alinhados ao tamanho do bloco, sem preenchimento.
+        decrypt_blocks(data: bytes) -> bytes: Descriptografa blocos cifrados completos, sem remover o preenchimento.
+        pad(chunks: Iterable[bytes]) -> Iterator[bytes]: Realinha o texto simples em blocos inteiros e aplica o preenchimento.
+        align(chunks: Iterable[bytes]) -> Iterator[bytes]: Realinha o texto cifrado em blocos inteiros.
+        unpad(shards: Iterable[bytes]) -> Iterator[bytes]: Remove o preenchimento do texto simples.
+    """
+    n: int
+    exponent: int
+    power: Optional[Callable[[int], int]] = None
+
+    def __attrs_post_init__(self):
+        """
+        Valida que o módulo comporta pelo menos um byte por bloco.
+
+        :return: None
+        :raises ValueError: se n for menor que 256.
+        """
+        if self.plaintext_block_size < 1:
+            raise ValueError(f"O módulo {self.n} é pequeno demais para o modo em blocos, ele deve ser no mínimo 256.")
+
+    @property
+    def plaintext_block_size(self) -> int:
+        """
+        Retorna o número de bytes de texto simples empacotados em cada bloco.
+
+        :return: o maior k tal que 256^k <= n.
+        :rtype: int
+        """
+        return (self.n.bit_length() - 1) // 8
+
+    @property
+    def ciphertext_block_size(self) -> int:
+        """
+        Retorna o número de bytes de cada bloco cifrado.
+
+        :return: o número de bytes necessário para representar n - 1.
+        :rtype: int
+        """
+        return (self.n.bit_length() + 7) // 8
+
+    def encrypt(self, plaintext: bytes) -> bytes:
+        """
+        Criptografa uma sequência de bytes.
+
+        :param plaintext: os bytes a serem criptografados.
+        :return: a concatenação dos blocos cifrados, cada um com 'ciphertext_block_size' bytes.
+        """
+        return b''.join(self.encrypt_stream((plaintext,)))
+
+    def decrypt(self, ciphertext: bytes) -> bytes:
+        """
+        Descriptografa uma sequência de bytes.
+
+        :param ciphertext: a concatenação dos blocos cifrados.
+        :return: os bytes originais, sem o preenchimento.
+        :raises ValueError: se o texto cifrado estiver truncado ou não corresponder à chave informada.
+        """
+        return b''.join(self.decrypt_stream((ciphertext,)))
+
+    def encrypt_blocks(self, data: bytes) -> bytes:
+        """
+        Criptografa bytes cujo tamanho é múltiplo de 'plaintext_block_size', sem aplicar preenchimento.
+
+        :param data: os bytes a serem criptografados.
+        :return: a concatenação dos blocos cifrados.
+        """
+        return self.__apply(data, self.plaintext_block_size, self.ciphertext_block_size)
+
+    def decrypt_blocks(self, data: bytes) -> bytes:
+        """
+        Descriptografa blocos cifrados completos, sem remover o preenchimento.
+
+        :param data: a concatenação de blocos cifrados.
+        :return: a concatenação dos blocos de texto simples.
+        :raises ValueError: se algum bloco não corresponder à chave informada.
+        """
+        try:
+            return self.__apply(data, self.ciphertext_block_size, self.plaintext_block_size)
+        except OverflowError:
+            raise ValueError("O texto cifrado não corresponde a esta chave.") from None
+
+    def __apply(self, data: bytes, input_size: int, output_size: int) -> bytes:
+        """
+        Aplica a chave a cada bloco de 'input_size' bytes, escrevendo o resultado com 'output_size' bytes.
+
+        :param data: os blocos de entrada, concatenados.
+        :param input_size: o tamanho de cada bloco de entrada.
+        :param output_size: o tamanho de cada bloco de saída.
+        :return: os blocos de saída, concatenados.
+        :raises OverflowError: se algum resultado não couber em 'output_size' bytes.
+        """
+        n, exponent, power = self.n, self.exponent, self.power
+        STATS.count('modexp.calls', len(data) // input_size)
+        STATS.count('bytes.processed', len(data))
+        if vectorizable(n, len(data) // input_size):
+            # Com módulos pequenos, os blocos têm poucos bytes, e o custo está nas chamadas a pow, não na aritmética.
+            # O Teorema Chinês do Resto é dispensado: com o mesmo expoente, o resultado é o mesmo.
+            return power_blocks(data, input_size, output_size, exponent, n)
+        if power is None:
+            return b''.join(
+                pow(int.from_bytes(data[i:i + input_size], 'big'), exponent, n).to_bytes(output_size, 'big')
+                for i in range(0, len(data), input_size)
+            )
+        return b''.join(
+            power(int.from_bytes(data[i:i + input_size], 'big')).to_bytes(output_size, 'big')
+            for i in range(0, len(data), input_size)
+        )
+
+    def encrypt_stream(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Criptografa uma sequência de pedaços de tamanho arbitrário, produzindo os blocos cifrados à medida que ficam
+        completos. Apenas um bloco incompleto é mantido entre um pedaço e outro.
+
+        :param chunks: os pedaços de texto simples, por exemplo, lidos de um arquivo.
+        :return: um gerador dos pedaços cifrados.
+        """
+        return (self.encrypt_blocks(shard) for shard in self.pad(chunks))
+
+    def decrypt_stream(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Descriptografa uma sequência de pedaços de tamanho arbitrário. O último bloco é retido até o fim da sequência,
+        pois é ele que contém o preenchimento.
+
+        :param chunks: os pedaços de texto cifrado.
+        :return: um gerador dos pedaços de texto simples.
+        :raises ValueError: se o texto cifrado estiver truncado ou não corresponder à chave informada.
+        """
+        return self.unpad(self.decrypt_blocks(shard) for shard in self.align(chunks))
+
+    def pad(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Realinha pedaços de texto simples de tamanho arbitrário em pedaços com um número inteiro de blocos, aplicando o
+        preenchimento ao final da sequência. Cada pedaço produzido pode ser criptografado de forma independente.
+
+        :param chunks: os pedaços de texto simples.
+        :return: um gerador de pedaços com tamanho múltiplo de 'plaintext_block_size'.
+        """
+        size = self.plaintext_block_size
+        pending = b''
+        for chunk in chunks:
+            pending += chunk
+            aligned = len(pending) - len(pending) % size
+            if aligned:
+                yield pending[:aligned]
+                pending = pending[aligned:]
+
+        yield pending + bytes([PADDING_MARKER]) + bytes(-(len(pending) + 1) % size)
+
+    def align(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Realinha pedaços de texto cifrado de tamanho arbitrário em pedaços com um número inteiro de blocos. Cada pedaço
+        produzido pode ser descriptografado de forma independente.
+
+        :param chunks: os pedaços de texto cifrado.
+        :return: um gerador de pedaços com tamanho múltiplo de 'ciphertext_block_size'.
+        :raises ValueError: se o texto cifrado não tiver um número inteiro de blocos.
+        """
+        cipher_size = self.ciphertext_block_size
+        pending = b''
+        for chunk in chunks:
+            pending += chunk
+            aligned = len(pending) - len(pending) % cipher_size
+            if aligned:
+                yield pending[:aligned]
+                pending = pending[aligned:]
+
+        if pending:
+            raise ValueError(f"O texto cifrado deve ter um múltiplo de {cipher_size} bytes.")
+
+    def unpad(self, shards: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Remove o preenchimento de uma sequência de pedaços de texto simples. Como o preenchimento ocupa apenas o último
+        bloco, somente esse bloco é retido até o fim da sequência.
+
+        :param shards: os pedaços de texto simples, ainda com o preenchimento.
+        :return: um gerador dos pedaços sem o preenchimento.
+        :raises ValueError: se o preenchimento for inválido, o que indica uma chave incorreta.
+        """
+        size = self.plaintext_block_size
+        last = b''
+        for shard in shards:
+            if not shard:
+                continue
+            if last:
+                yield last
+            last = shard
+
+        if len(last) > size:
+            yield last[:-size]
+            last = last[-size:]
+
+        unpadded = last.rstrip(b'\x00')
+        if not unpadded or unpadded[-1] != PADDING_MARKER:
+            raise ValueError("Preenchimento inválido: o texto cifrado não corresponde a esta chave.")
+        yield unpadded[:-1]
@@ -0,0 +1,7 @@
+# Constantes usadas pela linha de comando. Elas ficam em um módulo sem dependências para que a interface possa montar
+# as opções sem importar os módulos de criptografia.
+MIN_KEY_BITS = 16
+DEFAULT_PUBLIC_EXPONENT = 65537
+# Número máximo de primos de uma chave (RSA com múltiplos primos, PKCS #1 v2.2).
+MAX_PRIMES = 4
+KEY_FORMATS = ('text', 'binary')
@@ -0,0 +1,147 @@
+import mmap
+import struct
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+from attr import define
+
+from src.cryptography.key import RSAKey
+
+CONTAINER_MAGIC = b'RSAC'
+CONTAINER_VERSION = 1
+# Cabeçalho: prefixo, versão, impressão digital da chave (SHA-256 do módulo), tamanho do bloco de texto simples e
+# tamanho do bloco cifrado (4 bytes cada, big-endian).
+HEADER = struct.Struct('>4sB32sII')
+# Rodapé: tamanho do texto simples (8 bytes, big-endian) e o prefixo repetido, que marca um arquivo completo.
+TRAILER = struct.Struct('>Q4s')
+# Número de blocos descriptografados de cada vez ao ler um intervalo.
+BLOCKS_PER_READ = 4096
+
+
+@define
+class Container:
+    """
+    Classe que implementa o contêiner de acesso aleatório do modo em blocos.
+
+    O contêiner tem um cabeçalho (ver HEADER), os blocos cifrados com largura fixa de 'ciphertext_block_size' bytes e
+    um rodapé com o tamanho do texto simples (ver TRAILER). O último bloco é completado com zeros, e o rodapé diz onde o
+    texto termina. Como os blocos têm largura fixa, o índice de deslocamentos é implícito: o bloco i começa no byte
+    HEADER.size + i · ciphertext_block_size e contém os bytes [i · k, (i + 1) · k) do texto simples, com k igual a
+    'plaintext_block_size'. Assim, ler um intervalo exige descriptografar apenas os blocos que ele cobre.
+
+    O rodapé, em vez de um campo do cabeçalho, permite gravar o contêiner em fluxo, por exemplo, na saída padrão. A
+    leitura usa mmap e memoryview, de modo que os blocos são convertidos em inteiros sem cópias intermediárias.
+
+    Atributos:
+        key (RSAKey): a chave pública, para criptografar, ou a chave privada, para descriptografar.
+
+    Métodos:
+        encrypt_stream(chunks: Iterable[bytes]) -> Iterator[bytes]: Criptografa uma sequência de pedaços de bytes.
+        decrypt_range(path: Path, start: Optional[int] = None, end: Optional[int] = None) -> Iterator[bytes]: Descriptografa um intervalo do texto simples.
+    """
+    key: RSAKey
+
+    def encrypt_stream(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Criptografa uma sequência de pedaços de bytes de tamanho arbitrário, produzindo o contêiner em fluxo.
+
+        :param chunks: os pedaços de texto simples, por exemplo, lidos de um arquivo.
+        :return: um gerador com o cabeçalho, os blocos cifrados e o rodapé.
+        """
+        cipher = self.key.block_cipher()
+        size = cipher.plaintext_block_size
+        yield HEADER.pack(CONTAINER_MAGIC, CONTAINER_VERSION, self.key.fingerprint, size, cipher.ciphertext_block_size)
+
+        length = 0
+        pending = b''
+        for chunk in chunks:
+            length += len(chunk)
+            pending += chunk
+            aligned = len(pending) - len(pending) % size
+            if aligned:
+                yield cipher.encrypt_blocks(pending[:aligned])
+                pending = pending[aligned:]
+
+        if pending:
+            yield cipher.encrypt_blocks(pending + bytes(-len(pending) % size))
+        yield TRAILER.pack(length, CONTAINER_MAGIC)
+
+    def decrypt_range(self, path: Path, start: Optional[int] = None, end: Optional[int] = None) -> Iterator[bytes]:
+        """
+        Descriptografa o intervalo [start, end) do texto simples, com a mesma semântica das fatias do Python: os limites
+        podem ser omitidos ou negativos (contados a partir do fim). Apenas os blocos que cobrem o intervalo são lidos e
+        descriptografados.
+
+        :param path: o caminho do contêiner. Ele precisa ser um arquivo comum, pois é mapeado em memória.
+        :param start: o início do intervalo, ou None para o início do texto.
+        :param end: o fim do intervalo (exclusivo), ou None para o fim do texto.
+        :return: um gerador dos pedaços do intervalo, na ordem.
+        :raises ValueError: se o contêiner for inválido ou não corresponder à chave.
+        """
+        cipher = self.key.block_cipher()
+        size, width = cipher.plaintext_block_size, cipher.ciphertext_block_size
+
+        with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                length = self.__validate(view, size, width)
+                start, end, _ = slice(start, end).indices(length)
+                if start >= end:
+                    return
+
+                first, last = start // size, (end - 1) // size + 1
+                for block in range(first, last, BLOCKS_PER_READ):
+                    stop = min(block + BLOCKS_PER_READ, last)
+                    offset = HEADER.size + block * width
+                    # A fatia é liberada explicitamente: se a descriptografia falhar, o traceback ainda a referencia, e
+                    # o mmap não poderia ser fechado.
+                    with view[offset:offset + (stop - block) * width] as blocks:
+                        plaintext = cipher.decrypt_blocks(blocks)
+                    base = block * size
+                    yield plaintext[max(start - base, 0):end - base]
+            finally:
+                view.release()
+
+    def __validate(self, view: memoryview, size: int, width: int) -> int:
+        """
+        Valida o cabeçalho e o rodapé do contêiner.
+
+        :param view: o conteúdo do contêiner.
+        :param size: o tamanho do bloco de texto simples da chave.
+        :param width: o tamanho do bloco cifrado da chave.
+        :return: o tamanho do texto simples.
+        :raises ValueError: se o contêiner estiver truncado, tiver outra versão ou não corresponder à chave.
+        """
+        if len(view) < HEADER.size + TRAILER.size:
+            raise ValueError("Contêiner truncado.")
+        magic, version, fingerprint, header_size, header_width = HEADER.unpack_from(view)
+        if magic != CONTAINER_MAGIC or version != CONTAINER_VERSION:
+            raise ValueError(f"Contêiner não suportado: prefixo {magic!r}, versão {version}.")
+        if fingerprint != self.key.fingerprint or (header_size, header_width) != (size, width):
+            raise ValueError("O contêiner foi criptografado com outra chave.")
+
+        length, trailer_magic = TRAILER.unpack_from(view, len(view) - TRAILER.size)
+        body = len(view) - HEADER.size - TRAILER.size
+        blocks, remainder = divmod(body, width)
+        consistent = (blocks - 1) * size < length <= blocks * size or length == blocks == 0
+        if trailer_magic != CONTAINER_MAGIC or remainder or not consistent:
+            raise ValueError("Contêiner truncado ou corrompido.")
+        return length
+
+
+def parse_range(text: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Interpreta um intervalo no formato 'INÍCIO:FIM', com a semântica das fatias do Python: qualquer um dos limites pode
+    ser omitido ou negativo. Por exemplo, ':4096' são os primeiros 4096 bytes e '-1024:' os últimos 1024.
+
+    :param text: o intervalo.
+    :return: a tupla (início, fim), com None para os limites omitidos.
+    :raises ValueError: se o texto não estiver no formato esperado.
+    """
+    start, separator, end = text.partition(':')
+    try:
+        if not separator:
+            raise ValueError
+        return int(start) if start.strip() else None, int(end) if end.strip() else None
+    except ValueError:
+        raise ValueError(f"Intervalo inválido: {text}. Use INÍCIO:FIM, por exemplo, 0:4096 ou -1024:.") from None
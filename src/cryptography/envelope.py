@@ -0,0 +1,257 @@
+import hashlib
+import hmac
+import secrets
+import struct
+from typing import Iterable, Iterator, Tuple
+
+from attr import define, field
+
+from src.cryptography.block import BlockCipher
+from src.cryptography.key import RSAKey
+from src.util.stats import STATS
+
+ENVELOPE_MAGIC = b'RSAE'
+ENVELOPE_VERSION = 1
+SESSION_KEY_SIZE = 32
+NONCE_SIZE = 16
+TAG_SIZE = 32
+# Maior pedaço do envelope. Pedaços de entrada maiores são divididos, e um cabeçalho que anuncie um pedaço maior é
+# recusado antes da leitura.
+MAX_FRAME_SIZE = 1 << 26
+# Cabeçalho do envelope: prefixo, versão e tamanho da chave de sessão cifrada (4 bytes, big-endian).
+HEADER_FORMAT = '>4sBI'
+# Cabeçalho de cada pedaço: tamanho do texto cifrado (4 bytes, big-endian) e se é o último pedaço (1 byte).
+FRAME_FORMAT = '>IB'
+
+
+@define
+class Envelope:
+    """
+    Classe que implementa a criptografia híbrida (envelope) de um fluxo de bytes.
+
+    Uma chave de sessão aleatória é cifrada uma única vez com o RSA (modo em blocos) e os dados são cifrados com um
+    fluxo de chave SHAKE-128 em modo contador, autenticado por HMAC-SHA256. Assim, o custo do RSA não depende do tamanho
+    da mensagem, e o restante roda nas primitivas em C do hashlib.
+
+    O formato do envelope é:
+        - o cabeçalho: b'RSAE', um byte de versão, o tamanho da chave de sessão cifrada (4 bytes, big-endian), a chave
+          de sessão cifrada e o nonce (16 bytes);
+        - uma sequência de pedaços, cada um com o tamanho do texto cifrado (4 bytes, big-endian), um byte que indica se
+          é o último pedaço, o texto cifrado e a etiqueta HMAC (32 bytes).
+
+    A etiqueta de cada pedaço cobre o cabeçalho do envelope, o índice do pedaço, o seu cabeçalho e o texto cifrado, de
+    modo que pedaços alterados, reordenados ou removidos (inclusive do final) são detectados. Um pedaço só é liberado
+    depois que a sua etiqueta é verificada, o que permite descriptografar em fluxo.
+
+    A chave de sessão, com o preenchimento, precisa caber em um único bloco do RSA, pois blocos menores seriam cifrados
+    um a um e, com poucos bytes por bloco, não a protegeriam. Por isso, o módulo deve ter mais de 264 bits.
+
+    Atributos:
+        key (RSAKey): a chave pública, para criptografar, ou a chave privada, para descriptografar.
+        cipher (BlockCipher): a cifra em blocos da chave, que cifra a chave de sessão.
+
+    Métodos:
+        encrypt_stream(chunks: Iterable[bytes]) -> Iterator[bytes]: Criptografa uma sequência de pedaços de bytes.
+        decrypt_stream(chunks: Iterable[bytes]) -> Iterator[bytes]: Descriptografa uma sequência de pedaços de um envelope.
+    """
+    key: RSAKey
+    cipher: BlockCipher = field(init=False)
+
+    def __attrs_post_init__(self):
+        """
+        Monta a cifra em blocos e valida que a chave de sessão cabe em um único bloco.
+
+        :return: None
+        :raises ValueError: se o módulo for pequeno demais para o envelope.
+        """
+        self.cipher = self.key.block_cipher()
+        if self.cipher.plaintext_block_size <= SESSION_KEY_SIZE:
+            raise ValueError(f"O módulo de {self.key.n.bit_length()} bits é pequeno demais para o modo envelope, que "
+                             f"cifra a chave de sessão em um único bloco: ele deve ter mais de "
+                             f"{8 * (SESSION_KEY_SIZE + 1)} bits. Use uma chave maior (create --bits).")
+
+    def encrypt_stream(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Criptografa uma sequência de pedaços de bytes. Cada pedaço de entrada não vazio vira um pedaço do envelope (ou
+        mais, se tiver mais de MAX_FRAME_SIZE bytes), e o último pedaço é marcado como tal (um envelope de uma mensagem
+        vazia tem um único pedaço vazio).
+
+        :param chunks: os pedaços de texto simples, por exemplo, lidos de um arquivo.
+        :return: um gerador com o cabeçalho seguido dos pedaços do envelope.
+        """
+        session_key = secrets.token_bytes(SESSION_KEY_SIZE)
+        nonce = secrets.token_bytes(NONCE_SIZE)
+        wrapped = self.cipher.encrypt(session_key)
+        header = struct.pack(HEADER_FORMAT, ENVELOPE_MAGIC, ENVELOPE_VERSION, len(wrapped)) + wrapped + nonce
+        yield header
+
+        stream_key, mac_key = Envelope.__derive_keys(session_key, header)
+        index = 0
+        pending = b''
+        for chunk in chunks:
+            for start in range(0, len(chunk), MAX_FRAME_SIZE):
+                if pending:
+                    yield Envelope.__seal(stream_key, mac_key, nonce, index, pending, False)
+                    index += 1
+                pending = chunk[start:start + MAX_FRAME_SIZE]
+        yield Envelope.__seal(stream_key, mac_key, nonce, index, pending, True)
+
+    def decrypt_stream(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Descriptografa uma sequência de pedaços de tamanho arbitrário de um envelope.
+
+        :param chunks: os pedaços do envelope, por exemplo, lidos de um arquivo.
+        :return: um gerador dos pedaços de texto simples, cada um liberado somente após a verificação da sua etiqueta.
+        :raises ValueError: se o envelope for inválido, estiver truncado ou tiver sido alterado, ou se a chave não
+            corresponder à usada na criptografia.
+        """
+        reader = _Reader(iter(chunks))
+        prefix = reader.read(struct.calcsize(HEADER_FORMAT))
+        magic, version, wrapped_size = struct.unpack(HEADER_FORMAT, prefix)
+        if magic != ENVELOPE_MAGIC or version != ENVELOPE_VERSION:
+            raise ValueError(f"Envelope não suportado: prefixo {magic!r}, versão {version}.")
+        if wrapped_size != self.cipher.ciphertext_block_size:
+            raise ValueError(f"A chave de sessão cifrada tem {wrapped_size} bytes, mas esta chave cifra blocos de "
+                             f"{self.cipher.ciphertext_block_size} bytes.")
+        wrapped = reader.read(wrapped_size)
+        nonce = reader.read(NONCE_SIZE)
+        header = prefix + wrapped + nonce
+
+        session_key = self.cipher.decrypt(wrapped)
+        if len(session_key) != SESSION_KEY_SIZE:
+            raise ValueError("A chave de sessão não corresponde a esta chave privada.")
+        stream_key, mac_key = Envelope.__derive_keys(session_key, header)
+
+        frame_size = struct.calcsize(FRAME_FORMAT)
+        index = 0
+        while True:
+            frame = reader.read(frame_size)
+            size, last = struct.unpack(FRAME_FORMAT, frame)
+            if size > MAX_FRAME_SIZE:
+                raise ValueError(f"O pedaço {index} anuncia {size} bytes, mais que o máximo de {MAX_FRAME_SIZE}.")
+            ciphertext = reader.read(size)
+            tag = reader.read(TAG_SIZE)
+            expected = Envelope.__tag(mac_key, index, frame, ciphertext)
+            if not hmac.compare_digest(tag, expected):
+                raise ValueError(f"Etiqueta inválida no pedaço {index}: o envelope foi alterado ou a chave está errada.")
+            yield Envelope.__xor(ciphertext, Envelope.__keystream(stream_key, nonce, index, size))
+            if last:
+                break
+            index += 1
+
+        if not reader.at_end():
+            raise ValueError("Há dados após o último pedaço do envelope.")
+
+    @staticmethod
+    def __derive_keys(session_key: bytes, header: bytes) -> Tuple[bytes, bytes]:
+        """
+        Deriva da chave de sessão as chaves do fluxo e da autenticação, vinculadas ao cabeçalho do envelope.
+
+        :param session_key: a chave de sessão.
+        :param header: o cabeçalho do envelope, com a chave de sessão cifrada e o nonce.
+        :return: a tupla (chave do fluxo, chave do HMAC).
+        """
+        context = hashlib.sha256(header).digest()
+        stream_key = hmac.new(session_key, b'stream' + context, 'sha256').digest()
+        mac_key = hmac.new(session_key, b'mac' + context, 'sha256').digest()
+        return stream_key, mac_key
+
+    @staticmethod
+    def __keystream(stream_key: bytes, nonce: bytes, index: int, size: int) -> bytes:
+        """
+        Gera o fluxo de chave de um pedaço: a saída do SHAKE-128 sobre a chave, o nonce e o índice do pedaço.
+
+        :param stream_key: a chave do fluxo.
+        :param nonce: o nonce do envelope.
+        :param index: o índice do pedaço.
+        :param size: o tamanho do pedaço, em bytes.
+        :return: 'size' bytes de fluxo de chave.
+        """
+        return hashlib.shake_128(stream_key + nonce + index.to_bytes(8, 'big')).digest(size)
+
+    @staticmethod
+    def __xor(data: bytes, keystream: bytes) -> bytes:
+        """
+        Combina os dados com o fluxo de chave. A operação é feita sobre inteiros, de modo que o laço roda em C.
+
+        :param data: os dados.
+        :param keystream: o fluxo de chave, do mesmo tamanho dos dados.
+        :return: data XOR keystream.
+        """
+        STATS.count('bytes.processed', len(data))
+        return (int.from_bytes(data, 'little') ^ int.from_bytes(keystream, 'little')).to_bytes(len(data), 'little')
+
+    @staticmethod
+    def __tag(mac_key: bytes, index: int, frame: bytes, ciphertext: bytes) -> bytes:
+        """
+        Calcula a etiqueta HMAC-SHA256 de um pedaço.
+
+        :param mac_key: a chave do HMAC.
+        :param index: o índice do pedaço.
+        :param frame: o cabeçalho do pedaço (tamanho e indicador de último pedaço).
+        :param ciphertext: o texto cifrado do pedaço.
+        :return: a etiqueta, com TAG_SIZE bytes.
+        """
+        mac = hmac.new(mac_key, index.to_bytes(8, 'big') + frame, 'sha256')
+        mac.update(ciphertext)
+        return mac.digest()
+
+    @staticmethod
+    def __seal(stream_key: bytes, mac_key: bytes, nonce: bytes, index: int, plaintext: bytes, last: bool) -> bytes:
+        """
+        Cifra e autentica um pedaço.
+
+        :param stream_key: a chave do fluxo.
+        :param mac_key: a chave do HMAC.
+        :param nonce: o nonce do envelope.
+        :param index: o índice do pedaço.
+        :param plaintext: o texto simples do pedaço.
+        :param last: se este é o último pedaço do envelope.
+        :return: o pedaço do envelope: cabeçalho, texto cifrado e etiqueta.
+        """
+        frame = struct.pack(FRAME_FORMAT, len(plaintext), last)
+        ciphertext = Envelope.__xor(plaintext, Envelope.__keystream(stream_key, nonce, index, len(plaintext)))
+        return frame + ciphertext + Envelope.__tag(mac_key, index, frame, ciphertext)
+
+
+@define
+class _Reader:
+    """
+    Lê quantidades exatas de bytes de uma sequência de pedaços de tamanho arbitrário.
+
+    Atributos:
+        chunks (Iterator[bytes]): os pedaços de entrada.
+        buffer (bytearray): os bytes lidos e ainda não consumidos.
+    """
+    chunks: Iterator[bytes]
+    buffer: bytearray = field(init=False, factory=bytearray)
+
+    def read(self, size: int) -> bytes:
+        """
+        Lê exatamente 'size' bytes.
+
+        :param size: o número de bytes.
+        :return: os bytes lidos.
+        :raises ValueError: se a sequência terminar antes.
+        """
+        while len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                raise ValueError("Envelope truncado.")
+            self.buffer += chunk
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def at_end(self) -> bool:
+        """
+        Verifica se todos os bytes foram consumidos.
+
+        :return: True se o buffer estiver vazio e a sequência tiver terminado.
+        """
+        while not self.buffer:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return True
+            self.buffer += chunk
+        return False
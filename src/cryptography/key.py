@@ -0,0 +1,338 @@
+import hashlib
+import struct
+from collections import OrderedDict
+from pathlib import Path
+from math import prod
+from typing import Dict, Optional, Tuple
+
+from attr import define, field
+
+from src.cryptography.block import BlockCipher
+from src.cryptography.prepared import PREPARED_KEYS, PreparedKey
+from src.cryptography.rsa import RSA
+from src.cryptography.table import TRANSLATION_TABLES
+from src.util.stats import STATS
+
+KEY_VERSION = 1
+# Versão das chaves privadas com mais de dois primos, que têm os campos adicionais r3, d3, t3, r4...
+MULTI_PRIME_KEY_VERSION = 2
+KEY_VERSIONS = (KEY_VERSION, MULTI_PRIME_KEY_VERSION)
+TEXT_MAGIC = 'RSA-KEY'
+BINARY_MAGIC = b'RSAK'
+PUBLIC_FIELDS = ('n', 'e')
+PRIVATE_FIELDS = ('n', 'e', 'd', 'p', 'q', 'dp', 'dq', 'qinv')
+DEFAULT_MAX_KEYS = 128
+# Mensagem de todos os erros de leitura de um arquivo de chave, que não reproduz o conteúdo do arquivo.
+INVALID_KEY_MESSAGE = "Arquivo de chave inválido."
+
+
+@define(frozen=True)
+class RSAKey:
+    """
+    Classe que representa o conteúdo de um arquivo de chave.
+
+    São suportados três formatos. O formato legado, "n expoente", é o que as versões anteriores gravavam e não guarda
+    os primos. O formato texto versionado tem um cabeçalho "RSA-KEY <versão> <public|private>" seguido de uma linha
+    "nome valor" por campo. O formato binário versionado tem o mesmo conteúdo: o prefixo b'RSAK', um byte de versão, um
+    byte de tipo (0 pública, 1 privada) e, para cada campo, o tamanho do nome (1 byte), o nome, o tamanho do valor
+    (4 bytes, big-endian) e o valor (big-endian). As chaves privadas versionadas guardam n, e, d, p, q e os parâmetros
+    do Teorema Chinês do Resto, de modo que nada precisa ser recalculado ao carregá-las.
+
+    As chaves privadas com mais de dois primos são gravadas na versão 2, que acrescenta, para cada primo adicional r_i
+    (i a partir de 3), os campos r<i>, d<i> (d mod (r_i - 1)) e t<i> (coeficiente de Garner), como o OtherPrimeInfo do
+    PKCS #1. As demais chaves continuam na versão 1.
+
+    Atributos:
+        n (int): O módulo da chave.
+        exponent (int): o expoente usado pela chave: e para chaves públicas, d para chaves privadas.
+        private (Optional[bool]): se a chave é privada, ou None para o formato legado, que não registra o tipo.
+        e (Optional[int]): a chave pública, se conhecida.
+        p (Optional[int]): o primeiro número primo, se conhecido.
+        q (Optional[int]): o segundo número primo, se conhecido.
+        dp (Optional[int]): d mod (p - 1), se conhecido.
+        dq (Optional[int]): d mod (q - 1), se conhecido.
+        q_inv (Optional[int]): q^-1 mod p, se conhecido.
+        others (Tuple[Tuple[int, int, int], ...]): para cada primo adicional, a tupla (r_i, d_i, t_i).
+
+    Propriedades:
+        has_crt (bool): se os parâmetros do Teorema Chinês do Resto estão disponíveis.
+        fingerprint (bytes): o SHA-256 do módulo, igual para as chaves pública e privada de um mesmo par.
+
+    Métodos:
+        public_from(rsa: RSA) -> 'RSAKey': Método estático que extrai a chave pública de um objeto RSA.
+        private_from(rsa: RSA) -> 'RSAKey': Método estático que extrai a chave privada de um objeto RSA.
+        loads(data: bytes) -> 'RSAKey': Método estático que interpreta o conteúdo de um arquivo de chave.
+        dumps(key_format: str = 'text') -> bytes: Serializa a chave no formato versionado.
+        power(value: int) -> int: Aplica a chave a um valor.
+        translate(text: str) -> str: Aplica a chave a cada caractere de um texto.
+        block_cipher() -> BlockCipher: Retorna o BlockCipher desta chave.
+        prepared() -> PreparedKey: Retorna a PreparedKey desta chave, para muitas mensagens no modo em blocos.
+    """
+    n: int
+    exponent: int
+    private: Optional[bool] = None
+    e: Optional[int] = None
+    p: Optional[int] = None
+    q: Optional[int] = None
+    dp: Optional[int] = None
+    dq: Optional[int] = None
+    q_inv: Optional[int] = None
+    others: Tuple[Tuple[int, int, int], ...] = ()
+
+    @property
+    def has_crt(self) -> bool:
+        """
+        Verifica se os parâmetros do Teorema Chinês do Resto estão disponíveis.
+
+        :return: True se p, q, dP, dQ e qInv forem conhecidos.
+        :rtype: bool
+        """
+        return None not in (self.p, self.q, self.dp, self.dq, self.q_inv)
+
+    @property
+    def fingerprint(self) -> bytes:
+        """
+        Retorna a impressão digital da chave, que identifica o par de chaves.
+
+        :return: o SHA-256 do módulo n em big-endian, com 32 bytes.
+        :rtype: bytes
+        """
+        return hashlib.sha256(self.n.to_bytes((self.n.bit_length() + 7) // 8, 'big')).digest()
+
+    @staticmethod
+    def public_from(rsa: RSA) -> 'RSAKey':
+        """
+        Extrai a chave pública de um objeto RSA.
+
+        :param rsa: o objeto RSA.
+        :return: a chave pública (n, e).
+        """
+        return RSAKey(rsa.n, rsa.public_key, False, rsa.public_key)
+
+    @staticmethod
+    def private_from(rsa: RSA) -> 'RSAKey':
+        """
+        Extrai a chave privada de um objeto RSA, com os primos e os parâmetros do Teorema Chinês do Resto.
+
+        :param rsa: o objeto RSA.
+        :return: a chave privada.
+        """
+        p, q = rsa.primes[:2]
+        dp, dq, q_inv = rsa.crt_parameters
+        return RSAKey(rsa.n, rsa.private_key, True, rsa.public_key, p, q, dp, dq, q_inv, rsa.other_prime_infos)
+
+    @staticmethod
+    def loads(data: bytes) -> 'RSAKey':
+        """
+        Interpreta o conteúdo de um arquivo de chave em qualquer um dos formatos suportados.
+
+        :param data: o conteúdo do arquivo.
+        :return: a chave lida.
+        :raises ValueError: se o conteúdo não estiver em nenhum dos formatos ou estiver inconsistente. A mensagem nunca
+            reproduz o conteúdo do arquivo.
+        """
+        try:
+            if data.startswith(BINARY_MAGIC):
+                private, fields = RSAKey.__parse_binary(data)
+            elif data.startswith(TEXT_MAGIC.encode()):
+                private, fields = RSAKey.__parse_text(data.decode('ascii'))
+            else:
+                n, exponent = (int(value) for value in data.decode('ascii').split()[:2])
+                return RSAKey(n, exponent)
+        except ValueError:
+            raise ValueError(INVALID_KEY_MESSAGE) from None
+
+        try:
+            if not private:
+                return RSAKey(fields['n'], fields['e'], False, fields['e'])
+            others = []
+            while f'r{len(others) + 3}' in fields:
+                i = len(others) + 3
+                others.append((fields[f'r{i}'], fields[f'd{i}'], fields[f't{i}']))
+            key = RSAKey(fields['n'], fields['d'], True, fields.get('e'), fields.get('p'), fields.get('q'),
+                         fields.get('dp'), fields.get('dq'), fields.get('qinv'), tuple(others))
+        except KeyError as error:
+            raise ValueError(f"Campo obrigatório ausente no arquivo de chave: {error.args[0]}") from None
+
+        if key.others and not key.has_crt:
+            raise ValueError("Arquivo de chave inconsistente: primos adicionais sem p, q e os parâmetros do Teorema "
+                             "Chinês do Resto.")
+        if key.p is not None and key.q is not None and key.p * key.q * prod(r for r, _, _ in key.others) != key.n:
+            raise ValueError("Arquivo de chave inconsistente: o produto dos primos é diferente de n.")
+        return key
+
+    @staticmethod
+    def __parse_text(content: str) -> Tuple[bool, Dict[str, int]]:
+        """
+        Interpreta o formato texto versionado.
+
+        :param content: o conteúdo do arquivo.
+        :return: o tipo da chave (True se privada) e os campos lidos.
+        :raises ValueError: se o cabeçalho ou alguma linha forem inválidos.
+        """
+        header, *lines = content.strip().splitlines()
+        magic, version, kind = header.split()
+        if magic != TEXT_MAGIC or int(version) not in KEY_VERSIONS or kind not in ('public', 'private'):
+            raise ValueError(f"Cabeçalho de chave não suportado: {header}")
+
+        fields: Dict[str, int] = {}
+        for line in lines:
+            name, value = line.split()
+            fields[name] = int(value)
+        return kind == 'private', fields
+
+    @staticmethod
+    def __parse_binary(data: bytes) -> Tuple[bool, Dict[str, int]]:
+        """
+        Interpreta o formato binário versionado.
+
+        :param data: o conteúdo do arquivo.
+        :return: o tipo da chave (True se privada) e os campos lidos.
+        :raises ValueError: se o cabeçalho for inválido ou o arquivo estiver truncado.
+        """
+        offset = len(BINARY_MAGIC)
+        if len(data) < offset + 2:
+            raise ValueError("Cabeçalho de chave binária truncado.")
+        version, kind = data[offset], data[offset + 1]
+        if version not in KEY_VERSIONS or kind not in (0, 1):
+            raise ValueError(f"Versão ou tipo de chave binária não suportado: {version}, {kind}")
+        offset += 2
+
+        fields: Dict[str, int] = {}
+        try:
+            while offset < len(data):
+                name_size = data[offset]
+                name = data[offset + 1:offset + 1 + name_size].decode('ascii')
+                offset += 1 + name_size
+                (value_size,) = struct.unpack_from('>I', data, offset)
+                offset += 4
+                if offset + value_size > len(data):
+                    raise ValueError("Arquivo de chave binária truncado.")
+                fields[name] = int.from_bytes(data[offset:offset + value_size], 'big')
+                offset += value_size
+        except (IndexError, struct.error):
+            raise ValueError("Arquivo de chave binária truncado.") from None
+        return kind == 1, fields
+
+    def dumps(self, key_format: str = 'text') -> bytes:
+        """
+        Serializa a chave em um dos formatos versionados.
+
+        :param key_format: 'text' ou 'binary'.
+        :return: o conteúdo do arquivo de chave.
+        :raises ValueError: se o formato for desconhecido ou a chave vier do formato legado.
+        """
+        if self.private is None:
+            raise ValueError("Chaves no formato legado não registram o tipo e não podem ser convertidas.")
+
+        values = {'n': self.n, 'e': self.e, 'd': self.exponent if self.private else None, 'p': self.p, 'q': self.q,
+                  'dp': self.dp, 'dq': self.dq, 'qinv': self.q_inv}
+        names = PRIVATE_FIELDS if self.private else PUBLIC_FIELDS
+        fields = [(name, values[name]) for name in names if values[name] is not None]
+        for i, info in enumerate(self.others if self.private else (), 3):
+            fields += zip((f'r{i}', f'd{i}', f't{i}'), info)
+        version = MULTI_PRIME_KEY_VERSION if self.private and self.others else KEY_VERSION
+
+        if key_format == 'text':
+            kind = 'private' if self.private else 'public'
+            lines = [f"{TEXT_MAGIC} {version} {kind}"] + [f"{name} {value}" for name, value in fields]
+            return ('\n'.join(lines) + '\n').encode('ascii')
+        if key_format == 'binary':
+            parts = [BINARY_MAGIC, bytes([version, 1 if self.private else 0])]
+            for name, value in fields:
+                encoded = value.to_bytes((value.bit_length() + 7) // 8, 'big')
+                parts += [bytes([len(name)]), name.encode('ascii'), struct.pack('>I', len(encoded)), encoded]
+            return b''.join(parts)
+        raise ValueError(f"Formato de chave desconhecido: {key_format}")
+
+    def power(self, value: int) -> int:
+        """
+        Aplica a chave a um valor, usando o Teorema Chinês do Resto quando os parâmetros estão disponíveis.
+
+        :param value: o valor a ser transformado.
+        :return: value^exponent mod n.
+        """
+        if self.has_crt:
+            return RSA.crt_power(value, self.p, self.q, self.dp, self.dq, self.q_inv, self.others)
+        return pow(value, self.exponent, self.n)
+
+    def translate(self, text: str) -> str:
+        """
+        Aplica a chave a cada caractere de um texto (modo por caractere).
+
+        :param text: o texto a ser transformado.
+        :return: o texto transformado.
+        """
+        return TRANSLATION_TABLES.translate(self.n, self.exponent, text, self.power if self.has_crt else None)
+
+    def block_cipher(self) -> BlockCipher:
+        """
+        Retorna o BlockCipher desta chave (modo em blocos).
+
+        :return: um BlockCipher que usa o Teorema Chinês do Resto quando os parâmetros estão disponíveis.
+        """
+        return BlockCipher(self.n, self.exponent, self.power if self.has_crt else None)
+
+    def prepared(self) -> PreparedKey:
+        """
+        Retorna a PreparedKey desta chave (modo em blocos, muitas mensagens), mantida na LRU PREPARED_KEYS.
+
+        :return: a PreparedKey, que usa o Teorema Chinês do Resto quando os parâmetros estão disponíveis.
+        """
+        return PREPARED_KEYS.get(self.n, self.exponent, self.power if self.has_crt else None)
+
+
+@define
+class KeyLoader:
+    """
+    Classe que carrega arquivos de chave e memoiza o resultado.
+
+    Cada chave lida fica em uma LRU indexada pelo caminho absoluto do arquivo. Uma entrada só é reaproveitada se o
+    instante de modificação e o tamanho do arquivo não tiverem mudado desde a leitura.
+
+    Atributos:
+        max_keys (int): o número máximo de chaves memorizadas.
+        __keys (OrderedDict[Path, Tuple[Tuple[int, int], RSAKey]]): as chaves lidas, com a assinatura do arquivo.
+
+    Métodos:
+        load(path: Path) -> RSAKey: Carrega uma chave, reaproveitando a leitura anterior se o arquivo não mudou.
+        clear() -> None: Descarta todas as chaves memorizadas.
+    """
+    max_keys: int = DEFAULT_MAX_KEYS
+    __keys: 'OrderedDict[Path, Tuple[Tuple[int, int], RSAKey]]' = field(init=False, factory=OrderedDict)
+
+    def load(self, path: Path) -> RSAKey:
+        """
+        Carrega uma chave, reaproveitando a leitura anterior se o arquivo não mudou.
+
+        :param path: o caminho do arquivo de chave.
+        :return: a chave lida.
+        """
+        resolved = Path(path).resolve()
+        stat = resolved.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        cached = self.__keys.get(resolved)
+        if cached is not None and cached[0] == signature:
+            STATS.count('keys.cache_hits')
+            self.__keys.move_to_end(resolved)
+            return cached[1]
+
+        with STATS.phase('keys.load'):
+            key = RSAKey.loads(resolved.read_bytes())
+        self.__keys[resolved] = (signature, key)
+        self.__keys.move_to_end(resolved)
+        while len(self.__keys) > self.max_keys:
+            self.__keys.popitem(last=False)
+        return key
+
+    def clear(self):
+        """
+        Descarta todas as chaves memorizadas.
+
+        :return: None
+        """
+        self.__keys.clear()
+
+
+KEY_LOADER = KeyLoader()
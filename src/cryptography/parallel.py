@@ -0,0 +1,141 @@
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Deque, Iterable, Iterator, Optional, TypeVar
+
+from attr import define
+
+from src.cryptography.block import BlockCipher
+from src.cryptography.key import RSAKey
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# Estado de cada processo do pool, preenchido uma única vez por _initialize_worker.
+_worker_key: Optional[RSAKey] = None
+_worker_cipher: Optional[BlockCipher] = None
+
+
+def _initialize_worker(key: RSAKey, block: bool):
+    """
+    Recebe a chave uma única vez por processo, em vez de uma vez por tarefa.
+
+    :param key: a chave usada pelo processo.
+    :param block: se True, prepara um BlockCipher para o modo em blocos.
+    :return: None
+    """
+    global _worker_key, _worker_cipher
+    _worker_key = key
+    _worker_cipher = key.block_cipher() if block else None
+
+
+def _transform_chars(shard: str) -> str:
+    """
+    Aplica a chave do processo a cada caractere de um pedaço de texto.
+
+    :param shard: o pedaço de texto.
+    :return: o pedaço transformado.
+    """
+    return _worker_key.translate(shard)
+
+
+def _encrypt_blocks(shard: bytes) -> bytes:
+    """
+    Criptografa um pedaço alinhado em blocos com a chave do processo.
+
+    :param shard: o pedaço de texto simples, já com o preenchimento se for o último.
+    :return: o pedaço cifrado.
+    """
+    return _worker_cipher.encrypt_blocks(shard)
+
+
+def _decrypt_blocks(shard: bytes) -> bytes:
+    """
+    Descriptografa um pedaço alinhado em blocos com a chave do processo.
+
+    :param shard: o pedaço de texto cifrado.
+    :return: o pedaço de texto simples, ainda com o preenchimento se for o último.
+    """
+    return _worker_cipher.decrypt_blocks(shard)
+
+
+def ordered_map(executor: Executor, function: Callable[[T], R], items: Iterable[T], window: int) -> Iterator[R]:
+    """
+    Versão de Executor.map que consome a entrada sob demanda: no máximo 'window' tarefas ficam pendentes ao mesmo
+    tempo, de modo que a memória usada não depende do tamanho da entrada. Os resultados são produzidos na ordem da
+    entrada.
+
+    :param executor: o executor que processa as tarefas.
+    :param function: a função aplicada a cada item.
+    :param items: os itens de entrada.
+    :param window: o número máximo de tarefas pendentes.
+    :return: um gerador dos resultados, na ordem da entrada.
+    """
+    pending: Deque = deque()
+    for item in items:
+        pending.append(executor.submit(function, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+@define
+class ParallelCipher:
+    """
+    Classe que distribui a criptografia de um fluxo entre vários processos.
+
+    O fluxo é dividido em pedaços contíguos, cada pedaço é uma tarefa de um ProcessPoolExecutor e os resultados são
+    reagrupados na ordem original. A chave é enviada a cada processo uma única vez, pelo inicializador do pool. No modo
+    em blocos, o alinhamento e o preenchimento são feitos no processo principal pelo BlockCipher, de modo que cada
+    pedaço enviado aos processos contém apenas blocos inteiros.
+
+    Atributos:
+        key (RSAKey): a chave usada na transformação.
+        block (bool): se True, usa o modo em blocos; caso contrário, o modo por caractere.
+        jobs (Optional[int]): o número de processos. O padrão é o número de núcleos da máquina.
+
+    Métodos:
+        encrypt_stream(chunks: Iterable) -> Iterator: Criptografa uma sequência de pedaços em paralelo.
+        decrypt_stream(chunks: Iterable) -> Iterator: Descriptografa uma sequência de pedaços em paralelo.
+    """
+    key: RSAKey
+    block: bool = True
+    jobs: Optional[int] = None
+
+    def encrypt_stream(self, chunks: Iterable) -> Iterator:
+        """
+        Criptografa uma sequência de pedaços em paralelo.
+
+        :param chunks: os pedaços de texto simples (bytes no modo em blocos, str no modo por caractere).
+        :return: um gerador dos pedaços cifrados, na ordem original.
+        """
+        if not self.block:
+            return self.__map(_transform_chars, chunks)
+        return self.__map(_encrypt_blocks, self.key.block_cipher().pad(chunks))
+
+    def decrypt_stream(self, chunks: Iterable) -> Iterator:
+        """
+        Descriptografa uma sequência de pedaços em paralelo.
+
+        :param chunks: os pedaços de texto cifrado (bytes no modo em blocos, str no modo por caractere).
+        :return: um gerador dos pedaços de texto simples, na ordem original.
+        :raises ValueError: se o texto cifrado estiver truncado ou não corresponder à chave informada.
+        """
+        if not self.block:
+            return self.__map(_transform_chars, chunks)
+        cipher = self.key.block_cipher()
+        return cipher.unpad(self.__map(_decrypt_blocks, cipher.align(chunks)))
+
+    def __map(self, function: Callable[[T], R], shards: Iterable[T]) -> Iterator[R]:
+        """
+        Aplica a função a cada pedaço em um pool de processos, preservando a ordem.
+
+        :param function: a função de módulo executada em cada processo.
+        :param shards: os pedaços a serem processados.
+        :return: um gerador dos resultados, na ordem original.
+        """
+        jobs = self.jobs or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_initialize_worker,
+                                 initargs=(self.key, self.block)) as executor:
+            yield from ordered_map(executor, function, shards, 2 * jobs)
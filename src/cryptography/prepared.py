@@ -0,0 +1,269 @@
+import sys
+from array import array
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+from attr import define, field
+
+from src.cryptography.block import PADDING_MARKER, BlockCipher
+from src.util.stats import STATS
+from src.util.vectorized import power_many, vectorizable
+
+# Tamanho máximo de uma tabela de exponenciação: blocos de entrada de até 2 bytes.
+TABLE_LIMIT = 1 << 16
+DEFAULT_MAX_ENTRIES = 1 << 18
+DEFAULT_MAX_KEYS = 128
+
+
+def _block_values(data: bytes, size: int) -> Sequence[int]:
+    """
+    Interpreta blocos de 1 ou 2 bytes como inteiros big-endian, sem uma chamada de int.from_bytes por bloco.
+
+    :param data: os blocos, concatenados.
+    :param size: o tamanho de cada bloco, 1 ou 2.
+    :return: os valores dos blocos, na ordem.
+    """
+    if size == 1:
+        return data
+    values = array('H')
+    values.frombytes(data)
+    if sys.byteorder == 'little':
+        values.byteswap()
+    return values
+
+
+@define
+class PreparedKey:
+    """
+    Classe que aplica uma chave (n, expoente) a muitas mensagens no modo em blocos, reaproveitando o que é calculado
+    uma única vez por chave.
+
+    O BlockCipher da chave (tamanhos de bloco e função de exponenciação) é montado na construção. As mensagens de cada
+    chamada de encrypt_many e decrypt_many são preenchidas e concatenadas, de modo que todos os seus blocos passam por
+    uma única chamada (com módulos menores que 2^32 e o NumPy instalado, uma única exponenciação vetorizada).
+
+    Quando os blocos de entrada têm até 2 bytes (módulos de brinquedo, como os gerados pelo intervalo padrão de
+    'create'), todos os resultados cabem em uma tabela de exponenciação, indexada pelo valor do bloco: cada bloco passa
+    a custar uma consulta em vez de uma exponenciação. A tabela de cada sentido só é montada depois que a chave já
+    processou, nesse sentido, tantos blocos quanto a tabela tem entradas, o que limita o custo de montá-la ao das
+    exponenciações que ela evita.
+
+    A exponenciação de Montgomery com janela fixa, escrita em Python, foi descartada: ela é várias vezes mais lenta que
+    o pow nativo, mesmo com as constantes pré-calculadas.
+
+    Atributos:
+        n (int): O módulo da chave.
+        exponent (int): o expoente da chave.
+        power (Optional[Callable[[int], int]]): função que aplica a chave a um bloco, por exemplo, pelo Teorema Chinês
+            do Resto. O padrão é pow(bloco, exponent, n).
+        cipher (BlockCipher): o BlockCipher da chave.
+        __encrypt_table (Optional[List[bytes]]): para cada bloco de texto simples, o bloco cifrado.
+        __decrypt_table (Optional[List[int]]): para cada valor cifrado menor que n, o byte de texto simples, ou -1 se o
+            resultado não couber em um byte.
+        __encrypted (int): o número de blocos criptografados antes da montagem da tabela.
+        __decrypted (int): o número de blocos descriptografados antes da montagem da tabela.
+
+    Propriedades:
+        entries (int): o número de entradas das tabelas já montadas.
+
+    Métodos:
+        encrypt_many(messages: Iterable[bytes]) -> List[bytes]: Criptografa várias mensagens.
+        decrypt_many(ciphertexts: Iterable[bytes]) -> List[bytes]: Descriptografa várias mensagens.
+    """
+    n: int
+    exponent: int
+    power: Optional[Callable[[int], int]] = None
+    cipher: BlockCipher = field(init=False)
+    __encrypt_table: Optional[List[bytes]] = field(init=False, default=None)
+    __decrypt_table: Optional[List[int]] = field(init=False, default=None)
+    __encrypted: int = field(init=False, default=0)
+    __decrypted: int = field(init=False, default=0)
+
+    def __attrs_post_init__(self):
+        """
+        Monta o BlockCipher da chave.
+
+        :return: None
+        :raises ValueError: se n for menor que 256.
+        """
+        self.cipher = BlockCipher(self.n, self.exponent, self.power)
+
+    @property
+    def entries(self) -> int:
+        """
+        Retorna o número de entradas das tabelas de exponenciação já montadas.
+
+        :return: a soma dos tamanhos das tabelas dos dois sentidos.
+        :rtype: int
+        """
+        return len(self.__encrypt_table or ()) + len(self.__decrypt_table or ())
+
+    def encrypt_many(self, messages: Iterable[bytes]) -> List[bytes]:
+        """
+        Criptografa várias mensagens, cada uma com o seu preenchimento, como BlockCipher.encrypt.
+
+        :param messages: as mensagens.
+        :return: os textos cifrados, na ordem das mensagens.
+        """
+        size, cipher_size = self.cipher.plaintext_block_size, self.cipher.ciphertext_block_size
+        padded = [message + bytes([PADDING_MARKER]) + bytes(-(len(message) + 1) % size) for message in messages]
+        data = b''.join(padded)
+        blocks = len(data) // size
+        STATS.count('prepared.blocks', blocks)
+
+        table = self.__encrypt_table
+        if table is None and 1 << (8 * size) <= TABLE_LIMIT:
+            self.__encrypted += blocks
+            if self.__encrypted >= 1 << (8 * size):
+                table = self.__encrypt_table = self.__build_encrypt_table()
+        if table is not None:
+            encrypted = b''.join(map(table.__getitem__, _block_values(data, size)))
+        else:
+            encrypted = self.cipher.encrypt_blocks(data)
+
+        results = []
+        offset = 0
+        for shard in padded:
+            length = len(shard) // size * cipher_size
+            results.append(encrypted[offset:offset + length])
+            offset += length
+        return results
+
+    def decrypt_many(self, ciphertexts: Iterable[bytes]) -> List[bytes]:
+        """
+        Descriptografa várias mensagens, como BlockCipher.decrypt.
+
+        :param ciphertexts: os textos cifrados.
+        :return: as mensagens, na ordem dos textos cifrados.
+        :raises ValueError: se algum texto cifrado estiver truncado ou não corresponder à chave.
+        """
+        size, cipher_size = self.cipher.plaintext_block_size, self.cipher.ciphertext_block_size
+        ciphertexts = list(ciphertexts)
+        for ciphertext in ciphertexts:
+            if len(ciphertext) % cipher_size:
+                raise ValueError(f"O texto cifrado deve ter um múltiplo de {cipher_size} bytes.")
+        data = b''.join(ciphertexts)
+        blocks = len(data) // cipher_size
+        STATS.count('prepared.blocks', blocks)
+
+        table = self.__decrypt_table
+        if table is None and self.n <= TABLE_LIMIT:
+            self.__decrypted += blocks
+            if self.__decrypted >= self.n:
+                table = self.__decrypt_table = self.__build_decrypt_table()
+        if table is not None:
+            try:
+                decrypted = bytes(map(table.__getitem__, _block_values(data, cipher_size)))
+            except (IndexError, ValueError):
+                raise ValueError("O texto cifrado não corresponde a esta chave.") from None
+        else:
+            decrypted = self.cipher.decrypt_blocks(data)
+
+        results = []
+        offset = 0
+        for ciphertext in ciphertexts:
+            length = len(ciphertext) // cipher_size * size
+            results.append(b''.join(self.cipher.unpad((decrypted[offset:offset + length],))))
+            offset += length
+        return results
+
+    def __powers(self, values: Sequence[int]) -> List[int]:
+        """
+        Aplica a chave a todos os valores de uma tabela.
+
+        :param values: os valores.
+        :return: os resultados, na ordem dos valores.
+        """
+        STATS.count('modexp.calls', len(values))
+        if vectorizable(self.n, len(values)):
+            return power_many(values, self.exponent, self.n)
+        if self.power is not None:
+            return list(map(self.power, values))
+        return [pow(value, self.exponent, self.n) for value in values]
+
+    def __build_encrypt_table(self) -> List[bytes]:
+        """
+        Monta a tabela de criptografia, com o bloco cifrado de cada bloco de texto simples possível.
+
+        :return: a tabela, indexada pelo valor do bloco de texto simples.
+        """
+        with STATS.phase('prepared.table'):
+            cipher_size = self.cipher.ciphertext_block_size
+            values = range(1 << (8 * self.cipher.plaintext_block_size))
+            return [result.to_bytes(cipher_size, 'big') for result in self.__powers(values)]
+
+    def __build_decrypt_table(self) -> List[int]:
+        """
+        Monta a tabela de descriptografia, com o byte de texto simples de cada valor cifrado menor que n.
+
+        :return: a tabela, indexada pelo valor do bloco cifrado. Os resultados que não cabem em um byte, que só aparecem
+            em textos cifrados que não correspondem à chave, são marcados com -1.
+        """
+        with STATS.phase('prepared.table'):
+            return [result if result < 256 else -1 for result in self.__powers(range(self.n))]
+
+
+@define
+class PreparedKeyCache:
+    """
+    Classe que mantém as PreparedKey das chaves usadas recentemente.
+
+    As chaves ficam em uma LRU indexada por (n, expoente), limitada a 'max_keys' chaves e a 'max_entries' entradas das
+    tabelas de exponenciação: ao obter uma chave, as usadas há mais tempo são descartadas até que os dois limites sejam
+    respeitados. A chave mais recente nunca é descartada.
+
+    Atributos:
+        max_keys (int): o número máximo de chaves.
+        max_entries (int): o número máximo de entradas de tabela, somando todas as chaves.
+        __keys (OrderedDict[Tuple[int, int], PreparedKey]): as chaves, da menos para a mais recente.
+
+    Métodos:
+        get(n: int, exponent: int, power: Optional[Callable[[int], int]] = None) -> PreparedKey: Obtém a PreparedKey de uma chave.
+        clear() -> None: Descarta todas as chaves.
+    """
+    max_keys: int = DEFAULT_MAX_KEYS
+    max_entries: int = DEFAULT_MAX_ENTRIES
+    __keys: 'OrderedDict[Tuple[int, int], PreparedKey]' = field(init=False, factory=OrderedDict)
+
+    def get(self, n: int, exponent: int, power: Optional[Callable[[int], int]] = None) -> PreparedKey:
+        """
+        Obtém a PreparedKey da chave (n, exponent), criando-a se ela ainda não estiver na LRU.
+
+        :param n: O módulo da chave.
+        :param exponent: o expoente da chave.
+        :param power: função que aplica a chave a um bloco, usada apenas se a chave for criada.
+        :return: a PreparedKey.
+        :raises ValueError: se n for menor que 256.
+        """
+        key = (n, exponent)
+        prepared = self.__keys.get(key)
+        if prepared is None:
+            prepared = self.__keys[key] = PreparedKey(n, exponent, power)
+        else:
+            STATS.count('prepared.cache_hits')
+            self.__keys.move_to_end(key)
+        self.__evict()
+        return prepared
+
+    def clear(self):
+        """
+        Descarta todas as chaves.
+
+        :return: None
+        """
+        self.__keys.clear()
+
+    def __evict(self):
+        """
+        Descarta as chaves usadas há mais tempo até que o número de chaves caiba em 'max_keys' e o total de entradas de
+        tabela, em 'max_entries'.
+
+        :return: None
+        """
+        entries = sum(prepared.entries for prepared in self.__keys.values())
+        while len(self.__keys) > 1 and (len(self.__keys) > self.max_keys or entries > self.max_entries):
+            _, prepared = self.__keys.popitem(last=False)
+            entries -= prepared.entries
+
+
+PREPARED_KEYS = PreparedKeyCache()
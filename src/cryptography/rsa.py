@@ -1,10 +1,21 @@
+import os
 import random
-from math import floor, sqrt
+from math import gcd, lcm, prod
+from typing import List, Optional, Sequence, Set, Tuple
 
-from attr import define
-from rich.console import Console
+from attr import define, field
 
+from src.cryptography.constants import DEFAULT_PUBLIC_EXPONENT, MAX_PRIMES, MIN_KEY_BITS
+from src.cryptography.prepared import PREPARED_KEYS
+from src.cryptography.table import TRANSLATION_TABLES
 from src.util.gcd import ExtendedEuclideanAlgorithm
+from src.util.prime import PRIME_TABLES, PrimeGenerator, PrimeTable
+from src.util.stats import STATS
+
+ORDINALS = ('primeiro', 'segundo', 'terceiro', 'quarto')
+# Número máximo de conjuntos de primos sorteados por chave antes de desistir (intervalos pequenos demais ou 'e' que não
+# é coprimo com φ(n) de nenhum conjunto).
+MAX_KEYGEN_ATTEMPTS = 1000
 
 
 @define
@@ -13,50 +24,140 @@ class RSA:
 
     Essa classe implementa o algoritmo de criptografia RSA. Ele fornece métodos para gerar pares de chaves, criptografar e descriptografar mensagens.
 
+    Além de p e q, a chave pode ter até MAX_PRIMES - 2 primos adicionais (RSA com múltiplos primos, PKCS #1 v2.2). Com k
+    primos do mesmo tamanho, cada exponenciação da descriptografia opera sobre números k vezes menores que n, o que a
+    torna cerca de k²/4 vezes mais rápida que a de duas metades.
+
     Atributos:
         __p (int): O primeiro número primo.
         __q (int): O segundo número primo.
         __e (int): a chave pública.
         __d (int): a chave privada.
+        __others (Tuple[int, ...]): os primos adicionais, além de p e q.
+        __dp (int): expoente CRT d mod (p - 1), pré-calculado na construção.
+        __dq (int): expoente CRT d mod (q - 1), pré-calculado na construção.
+        __q_inv (int): coeficiente CRT q^-1 mod p, pré-calculado na construção.
+        __other_infos (Tuple[Tuple[int, int, int], ...]): para cada primo adicional r_i, a tupla (r_i, d mod (r_i - 1),
+            (r_1 · ... · r_(i-1))^-1 mod r_i), pré-calculada na construção.
 
     Propriedades:
-        n (int): O produto das variáveis privadas __p e __q, representando o valor de n.
+        n (int): O produto dos primos, representando o valor de n.
         phi (int): O valor de phi (função totiente de Euler) para os parâmetros fornecidos.
+        carmichael (int): o valor de λ(n) (função de Carmichael), o mmc de r_i - 1.
+        primes (Tuple[int, ...]): os números primos p, q e os adicionais.
+        crt_parameters (Tuple[int, int, int]): os parâmetros dP, dQ e qInv do Teorema Chinês do Resto.
+        other_prime_infos (Tuple[Tuple[int, int, int], ...]): os parâmetros do Teorema Chinês do Resto dos primos adicionais.
         public_key (int): a chave pública.
         private_key (int): a chave privada.
 
     Métodos:
-        __is_prime(n: int) -> bool: Método estático para verificar se um número é primo.
-        __random_prime_number(start: int, stop: int, step: int = 1) -> int: Método estático para gerar um número primo aleatório dentro de um determinado intervalo.
-        with_random_prime_numbers(start: int, stop: int, step: int = 1) -> 'RSA': Método estático para criar um objeto RSA com números primos aleatórios.
+        __random_prime_number(start: int, stop: int, step: int = 1, bits: Optional[int] = None, rounds: Optional[int] = None, primes: int = 2, rng: Optional[random.Random] = None) -> int: Método estático para gerar um número primo aleatório dentro de um determinado intervalo ou com um tamanho em bits.
+        __prime_table(start: int, stop: int, step: int, generator: PrimeGenerator, minimum: int = 2) -> Optional[PrimeTable]: Método estático que obtém a tabela de primos de um intervalo.
+        __prime_bits(bits: Optional[int], primes: int = 2) -> List[Optional[int]]: Método estático que divide o tamanho do módulo entre os primos.
+        check_public_exponent(e: int) -> None: Método estático que valida a chave pública.
+        __accept(factors: Sequence[int], bits: Optional[int], e: int) -> Optional['RSA']: Método estático que cria a chave a partir dos primos gerados, se eles forem aceitáveis.
+        from_primes(p: int, q: int, e: int = 65537, others: Sequence[int] = ()) -> 'RSA': Método estático para criar um objeto RSA a partir dos primos.
+        generate(start: int, stop: int, step: int = 1, bits: Optional[int] = None, rounds: Optional[int] = None, e: int = 65537, primes: int = 2, rng: Optional[random.Random] = None) -> 'RSA': Método estático para gerar um objeto RSA sem interação com o usuário.
+        generate_many(count: int, start: int, stop: int, step: int = 1, bits: Optional[int] = None, rounds: Optional[int] = None, e: int = 65537, jobs: Optional[int] = None, primes: int = 2) -> List['RSA']: Método estático para gerar vários objetos RSA em paralelo.
+        with_random_prime_numbers(start: int, stop: int, step: int = 1, bits: Optional[int] = None, rounds: Optional[int] = None, primes: int = 2) -> 'RSA': Método estático para criar um objeto RSA com números primos aleatórios.
         encrypt(plaintext: str) -> str: Criptografa uma determinada mensagem de texto simples.
         decrypt(ciphertext: str) -> str: Descriptografa uma determinada mensagem de texto cifrado.
+        __decrypt_value(c: int) -> int: Aplica a chave privada a um valor usando o Teorema Chinês do Resto.
+        crt_power(c: int, p: int, q: int, dp: int, dq: int, q_inv: int, others: Sequence[Tuple[int, int, int]] = ()) -> int: Método estático que calcula c^d mod n pelo Teorema Chinês do Resto.
         encrypt_with(n: int, public_key: int, plaintext: str) -> str: Método estático para criptografar uma mensagem usando um determinado n e chave pública.
         decrypt_with(n: int, public_key: int, ciphertext: str) -> str: Método estático para descriptografar uma mensagem usando um determinado n e chave pública.
+        encrypt_bytes_with(n: int, public_key: int, plaintext: bytes) -> bytes: Método estático para criptografar bytes em blocos.
+        decrypt_bytes_with(n: int, private_key: int, ciphertext: bytes) -> bytes: Método estático para descriptografar bytes em blocos.
     """
     __p: int
     __q: int
     __e: int
     __d: int
+    __others: Tuple[int, ...] = field(default=(), converter=tuple)
+    __dp: int = field(init=False)
+    __dq: int = field(init=False)
+    __q_inv: int = field(init=False)
+    __other_infos: Tuple[Tuple[int, int, int], ...] = field(init=False)
+
+    def __attrs_post_init__(self):
+        """
+        Pré-calcula os parâmetros do Teorema Chinês do Resto (dP, dQ, qInv e os dos primos adicionais) usados na
+        descriptografia.
+
+        :return: None
+        """
+        self.__dp = self.__d % (self.__p - 1)
+        self.__dq = self.__d % (self.__q - 1)
+        self.__q_inv = ExtendedEuclideanAlgorithm.execute(self.__q, self.__p).modular_inverse(self.__q, self.__p)
+
+        infos = []
+        product = self.__p * self.__q
+        for r in self.__others:
+            t = ExtendedEuclideanAlgorithm.execute(product % r, r).modular_inverse(product % r, r)
+            infos.append((r, self.__d % (r - 1), t))
+            product *= r
+        self.__other_infos = tuple(infos)
 
     @property
     def n(self) -> int:
         """
-        Método para calcular o produto dos atributos privados p e q.
+        Método para calcular o produto dos primos da chave.
 
-        :return: Valor inteiro que representa o produto de p e q.
+        :return: Valor inteiro que representa o produto de p, q e dos primos adicionais.
         """
-        return self.__p * self.__q
+        return prod(self.primes)
 
     @property
     def phi(self) -> int:
         """
         Retorne o valor de phi (função totiente de Euler) para os parâmetros fornecidos.
 
-        :return: O valor de phi (função totiente de Euler).
+        :return: O valor de phi (função totiente de Euler), o produto de r_i - 1.
         :rtype: int
         """
-        return (self.__p - 1) * (self.__q - 1)
+        return prod(r - 1 for r in self.primes)
+
+    @property
+    def carmichael(self) -> int:
+        """
+        Retorna o valor de λ(n) (função de Carmichael), o menor expoente que leva todo valor coprimo com n a 1. Qualquer
+        d com e · d ≡ 1 (mod λ(n)) é uma chave privada válida.
+
+        :return: o mmc de r_i - 1.
+        :rtype: int
+        """
+        return lcm(*(r - 1 for r in self.primes))
+
+    @property
+    def primes(self) -> Tuple[int, ...]:
+        """
+        Retorna os números primos da chave.
+
+        :return: a tupla (p, q, primos adicionais...).
+        :rtype: Tuple[int, ...]
+        """
+        return (self.__p, self.__q) + self.__others
+
+    @property
+    def crt_parameters(self) -> Tuple[int, int, int]:
+        """
+        Retorna os parâmetros do Teorema Chinês do Resto pré-calculados na construção.
+
+        :return: a tupla (dP, dQ, qInv).
+        :rtype: Tuple[int, int, int]
+        """
+        return self.__dp, self.__dq, self.__q_inv
+
+    @property
+    def other_prime_infos(self) -> Tuple[Tuple[int, int, int], ...]:
+        """
+        Retorna os parâmetros do Teorema Chinês do Resto dos primos adicionais, como o OtherPrimeInfo do PKCS #1.
+
+        :return: para cada primo adicional r_i, a tupla (r_i, d mod (r_i - 1), (r_1 · ... · r_(i-1))^-1 mod r_i). Vazia
+            para chaves de dois primos.
+        :rtype: Tuple[Tuple[int, int, int], ...]
+        """
+        return self.__other_infos
 
     @property
     def public_key(self) -> int:
@@ -78,45 +179,267 @@ class RSA:
         return self.__d
 
     @staticmethod
-    def __is_prime(n: int) -> bool:
+    def __random_prime_number(start: int, stop: int, step: int = 1, bits: Optional[int] = None,
+                              rounds: Optional[int] = None, primes: int = 2, rng: Optional[random.Random] = None) -> int:
         """
-        Verifique se um número é primo.
+        Gera um número primo aleatório, seja dentro do intervalo informado, seja com um tamanho exato em bits.
 
-        :param n: O número a ser verificado.
-        :return: True se o número for primo, False caso contrário.
+        :param start: início do intervalo
+        :param stop: fim do intervalo
+        :param step: passo do intervalo
+        :param bits: se informado, o intervalo é ignorado e o primo gerado terá exatamente esse número de bits.
+        :param rounds: o número de rodadas do teste de Miller-Rabin. Se None, é escolhido pelo tamanho do primo.
+        :param primes: o número de primos da chave, que o intervalo precisa conter.
+        :param rng: o gerador de números aleatórios (ver PrimeGenerator). O padrão é a entropia do sistema.
+        :return: um número primo aleatório.
+        :raises ValueError: se o intervalo tiver menos números primos que a chave.
         """
-        if n <= 1:
-            return False
-        for i in range(2, floor(sqrt(n)) + 1):
-            if n % i == 0:
-                return False
-        return True
+        generator = PrimeGenerator(rounds, rng)
+        if bits is not None:
+            return generator.random_prime(bits)
+        table = RSA.__prime_table(start, stop, step, generator, primes)
+        if table is not None:
+            return table.choice(generator.source)
+        return generator.random_prime_in_range(start, stop, step)
 
     @staticmethod
-    def __random_prime_number(start: int, stop: int, step: int = 1) -> int:
+    def __prime_table(start: int, stop: int, step: int, generator: PrimeGenerator,
+                      minimum: int = 2) -> Optional[PrimeTable]:
         """
-        Gera um número aleatório com base no intervalo informado e retorna-o caso ele seja primo
+        Obtém a tabela de primos do intervalo (ver PrimeTableCache) e verifica se ela permite gerar uma chave.
+
         :param start: início do intervalo
-        :param stop:
-        :param step:
-        :return:
+        :param stop: fim do intervalo
+        :param step: passo do intervalo
+        :param generator: o gerador usado na montagem da tabela.
+        :param minimum: o número de primos da chave, que devem ser distintos.
+        :return: a tabela, ou None se o intervalo for grande demais para ter uma tabela.
+        :raises ValueError: se o intervalo tiver menos de 'minimum' números primos. Sem tabela, isso só é detectado
+            quando mdc(start, step) > 1: todos os termos são múltiplos do mdc, e o intervalo tem no máximo um primo.
         """
-        while True:
-            n = random.randrange(start, stop, step)
-            if RSA.__is_prime(n):
-                return n
+        table = PRIME_TABLES.get(start, stop, step, generator)
+        if table is None:
+            divisor = gcd(start, step)
+            if divisor > 1:
+                raise ValueError(f"O intervalo range({start}, {stop}, {step}) contém no máximo 1 número primo, pois "
+                                 f"todos os termos são múltiplos de {divisor}; são necessários pelo menos {minimum}.")
+        elif len(table) < minimum:
+            raise ValueError(f"O intervalo range({start}, {stop}, {step}) contém {len(table)} número(s) primo(s); "
+                             f"são necessários pelo menos {minimum}.")
+        return table
+
+    @staticmethod
+    def __prime_bits(bits: Optional[int], primes: int = 2) -> List[Optional[int]]:
+        """
+        Divide o tamanho do módulo entre os primos, em partes iguais (os primos do final recebem os bits que sobram).
+
+        Como cada primo tem os dois bits mais significativos ligados, o produto de dois primos tem exatamente 'bits'
+        bits. Com mais primos, o produto pode ficar um bit abaixo, e a geração descarta esses conjuntos.
+
+        :param bits: o tamanho, em bits, do módulo n, ou None para gerar os primos a partir de um intervalo.
+        :param primes: o número de primos, de 2 a MAX_PRIMES.
+        :return: os tamanhos em bits de cada primo, ou uma lista de None.
+        :raises ValueError: se o número de primos for inválido ou se o módulo for pequeno demais para eles.
+        """
+        if not 2 <= primes <= MAX_PRIMES:
+            raise ValueError(f"O número de primos deve estar entre 2 e {MAX_PRIMES}, recebido {primes}.")
+        if bits is None:
+            return [None] * primes
+        if bits < MIN_KEY_BITS:
+            raise ValueError(f"O módulo deve ter pelo menos {MIN_KEY_BITS} bits, recebido {bits}.")
+        size, extra = divmod(bits, primes)
+        # Primos menores que os de uma chave de dois primos do tamanho mínimo podem não ter valores distintos suficientes.
+        if size < MIN_KEY_BITS // 2:
+            raise ValueError(f"O módulo de uma chave de {primes} primos deve ter pelo menos "
+                             f"{primes * MIN_KEY_BITS // 2} bits, recebido {bits}.")
+        return [size] * (primes - extra) + [size + 1] * extra
+
+    @staticmethod
+    def check_public_exponent(e: int):
+        """
+        Valida a chave pública antes da geração. Um 'e' par nunca é coprimo com φ(n), que é par para primos ímpares, e
+        a geração nunca terminaria.
+
+        :param e: a chave pública.
+        :return: None
+        :raises ValueError: se 'e' for par ou menor que 3.
+        """
+        if e < 3 or e % 2 == 0:
+            raise ValueError(f"A chave pública 'e' deve ser ímpar e maior ou igual a 3, recebido {e}.")
+
+    @staticmethod
+    def __exhausted(attempts: int) -> ValueError:
+        """
+        Monta o erro da geração que esgotou as tentativas.
+
+        :param attempts: o número de conjuntos de primos sorteados.
+        :return: o erro, para ser lançado.
+        """
+        return ValueError(f"Nenhum conjunto de primos aceitável em {attempts} tentativas: o intervalo é pequeno demais "
+                          f"ou 'e' não é coprimo com φ(n) de nenhum conjunto de primos dele.")
+
+    @staticmethod
+    def __accept(factors: Sequence[int], bits: Optional[int], e: int) -> Optional['RSA']:
+        """
+        Cria a chave a partir dos primos gerados, se eles forem aceitáveis.
+
+        :param factors: os primos gerados.
+        :param bits: o tamanho pedido para o módulo, ou None.
+        :param e: a chave pública.
+        :return: a chave, ou None se os primos se repetirem, se 'e' não for coprimo com φ(n) ou se o módulo não tiver
+            o tamanho pedido.
+        """
+        if bits is not None and prod(factors).bit_length() != bits:
+            return None
+        try:
+            return RSA.from_primes(factors[0], factors[1], e, factors[2:])
+        except ValueError:
+            return None
+
+    @staticmethod
+    def from_primes(p: int, q: int, e: int = DEFAULT_PUBLIC_EXPONENT, others: Sequence[int] = ()) -> 'RSA':
+        """
+        Cria um objeto RSA a partir dos primos e da chave pública, calculando a chave privada.
+
+        :param p: o primeiro número primo.
+        :param q: o segundo número primo, diferente de p.
+        :param e: a chave pública. O padrão é 65537.
+        :param others: os primos adicionais, para uma chave de mais de dois primos.
+        :return: Uma instância da classe 'RSA'.
+        :raises ValueError: se algum primo se repetir ou se 'e' não for coprimo com φ(n).
+        """
+        primes = (p, q, *others)
+        for prime in primes:
+            if primes.count(prime) > 1:
+                raise ValueError(f"Os primos devem ser distintos, recebido {prime} duas vezes.")
+        phi = prod(r - 1 for r in primes)
+        d = ExtendedEuclideanAlgorithm.execute(e, phi).modular_inverse(e, phi)
+        return RSA(p, q, e, d, others)
+
+    @staticmethod
+    def generate(start: int, stop: int, step: int = 1, bits: Optional[int] = None, rounds: Optional[int] = None,
+                 e: int = DEFAULT_PUBLIC_EXPONENT, primes: int = 2, rng: Optional[random.Random] = None) -> 'RSA':
+        """
+        Versão não interativa de with_random_prime_numbers.
+
+        A chave pública 'e' é fixa e, se ela não for coprima com φ(n), um novo conjunto de primos é gerado, até
+        MAX_KEYGEN_ATTEMPTS vezes.
+
+        :param start: o número inicial para gerar números primos aleatórios.
+        :param stop: o número de parada para gerar números primos aleatórios.
+        :param step: o tamanho da passo para gerar números primos aleatórios. O padrão é 1.
+        :param bits: se informado, o tamanho em bits do módulo n. O intervalo é ignorado.
+        :param rounds: o número de rodadas do teste de Miller-Rabin. Se None, é escolhido pelo tamanho dos primos.
+        :param e: a chave pública. O padrão é 65537.
+        :param primes: o número de primos da chave, de 2 a MAX_PRIMES. O padrão é 2.
+        :param rng: o gerador de números aleatórios dos primos. O padrão é a entropia do sistema; um gerador com semente
+            só serve para resultados reprodutíveis, como nos benchmarks, pois torna as chaves previsíveis.
+        :return: Uma instância da classe 'RSA' com números primos gerados aleatoriamente.
+        :raises ValueError: se 'e' ou o número de primos forem inválidos, se o intervalo tiver menos números primos que a
+            chave ou se as tentativas se esgotarem.
+
+        Exemplo de uso:
+        rsa_instance = RSA.generate(0, 0, bits=2048)
+        rsa_instance = RSA.generate(0, 0, bits=3072, primes=3)
+        """
+        RSA.check_public_exponent(e)
+        sizes = RSA.__prime_bits(bits, primes)
+        for _ in range(MAX_KEYGEN_ATTEMPTS):
+            with STATS.phase('keygen.primes'):
+                factors = [RSA.__random_prime_number(start, stop, step, size, rounds, primes, rng) for size in sizes]
+            with STATS.phase('keygen.derive'):
+                rsa = RSA.__accept(factors, bits, e)
+            if rsa is not None:
+                return rsa
+        raise RSA.__exhausted(MAX_KEYGEN_ATTEMPTS)
 
     @staticmethod
-    def with_random_prime_numbers(start: int, stop: int, step: int = 1) -> 'RSA':
+    def generate_many(count: int, start: int, stop: int, step: int = 1, bits: Optional[int] = None,
+                      rounds: Optional[int] = None, e: int = DEFAULT_PUBLIC_EXPONENT,
+                      jobs: Optional[int] = None, primes: int = 2) -> List['RSA']:
         """
+        Gera 'count' pares de chaves em paralelo, sem interação com o usuário.
+
+        A busca de cada primo é uma tarefa independente de um pool de processos, de modo que mesmo a geração de uma
+        única chave divide a busca dos primos entre vários processos. Conjuntos de primos repetidos ou não coprimos com
+        'e' são descartados e substituídos por novas buscas, até MAX_KEYGEN_ATTEMPTS conjuntos por chave.
+
+        Nenhum primo é usado em mais de uma chave do lote: um conjunto com um primo já usado também é descartado. Assim,
+        os módulos são distintos e não compartilham fatores (ver 'audit').
+
+        :param count: o número de pares de chaves a serem gerados.
         :param start: o número inicial para gerar números primos aleatórios.
         :param stop: o número de parada para gerar números primos aleatórios.
         :param step: o tamanho da passo para gerar números primos aleatórios. O padrão é 1.
+        :param bits: se informado, o tamanho em bits do módulo n. O intervalo é ignorado.
+        :param rounds: o número de rodadas do teste de Miller-Rabin. Se None, é escolhido pelo tamanho dos primos.
+        :param e: a chave pública. O padrão é 65537.
+        :param jobs: o número de processos. O padrão é o número de núcleos da máquina.
+        :param primes: o número de primos de cada chave, de 2 a MAX_PRIMES. O padrão é 2.
+        :return: Uma lista com 'count' instâncias da classe 'RSA'.
+        :raises ValueError: se 'e' ou o número de primos forem inválidos, se o intervalo tiver menos números primos que as
+            'count' chaves distintas exigem ou se as tentativas se esgotarem.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        RSA.check_public_exponent(e)
+        sizes = RSA.__prime_bits(bits, primes)
+        generator = PrimeGenerator(rounds)
+        # Com a tabela de primos do intervalo, cada primo é escolhido em O(1), e o pool só é usado na busca por tamanho.
+        table = RSA.__prime_table(start, stop, step, generator, primes) if bits is None else None
+        if table is not None and len(table) < count * primes:
+            raise ValueError(f"O intervalo range({start}, {stop}, {step}) contém {len(table)} número(s) primo(s); "
+                             f"{count} chaves distintas exigem pelo menos {count * primes}.")
+        jobs = jobs or os.cpu_count() or 1
+        keys: List[RSA] = []
+        used: Set[int] = set()
+        attempts = 0
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            while len(keys) < count:
+                if attempts >= MAX_KEYGEN_ATTEMPTS * count:
+                    raise ValueError(f"Apenas {len(keys)} de {count} chaves distintas em {attempts} tentativas: o "
+                                     f"intervalo não tem primos suficientes ou 'e' não é coprimo com φ(n) dos "
+                                     f"conjuntos restantes.")
+                searches = (count - len(keys)) * primes
+                chunksize = max(1, searches // (4 * jobs))
+                with STATS.phase('keygen.primes'):
+                    if table is not None:
+                        found = [table.choice(generator.source) for _ in range(searches)]
+                    elif bits is not None:
+                        found = list(executor.map(generator.random_prime, sizes * (searches // primes),
+                                                  chunksize=chunksize))
+                    else:
+                        found = list(executor.map(generator.random_prime_in_range, [start] * searches,
+                                                  [stop] * searches, [step] * searches, chunksize=chunksize))
+                with STATS.phase('keygen.derive'):
+                    attempts += searches // primes
+                    for i in range(0, searches, primes):
+                        factors = found[i:i + primes]
+                        if used.intersection(factors):
+                            continue
+                        rsa = RSA.__accept(factors, bits, e)
+                        if rsa is not None:
+                            used.update(factors)
+                            keys.append(rsa)
+
+        return keys
+
+    @staticmethod
+    def with_random_prime_numbers(start: int, stop: int, step: int = 1, bits: Optional[int] = None,
+                                  rounds: Optional[int] = None, primes: int = 2) -> 'RSA':
+        """
+        :param start: o número inicial para gerar números primos aleatórios.
+        :param stop: o número de parada para gerar números primos aleatórios.
+        :param step: o tamanho da passo para gerar números primos aleatórios. O padrão é 1.
+        :param bits: se informado, o tamanho em bits do módulo n. O intervalo é ignorado e cada primo terá uma parte igual desse tamanho.
+        :param rounds: o número de rodadas do teste de Miller-Rabin. Se None, é escolhido pelo tamanho dos primos.
+        :param primes: o número de primos da chave, de 2 a MAX_PRIMES. O padrão é 2.
         :return: Uma instância da classe 'RSA' com números primos gerados aleatoriamente.
 
-        Este método gera dois números primos aleatórios dentro do intervalo especificado (início e parada),
-        com o tamanho de passo fornecido (se fornecido). Ele verifica se os números gerados são iguais e, em caso afirmativo,
-        gera um novo número até que sejam diferentes.
+        Este método gera 'primes' números primos aleatórios dentro do intervalo especificado (início e parada),
+        com o tamanho de passo fornecido (se fornecido), ou com o tamanho em bits informado. Ele verifica se os números
+        gerados são iguais e, em caso afirmativo, gera um novo número até que sejam diferentes.
 
         Em seguida, ele calcula o valor de phi (a função totiente de Euler) com base nos números primos gerados.
         Em seguida, ele solicita que o usuário escolha um valor para a chave pública 'e', que deve ser coprimo com phi.
@@ -130,18 +453,28 @@ class RSA:
 
         Exemplo de uso:
         rsa_instance = RSA.with_random_prime_numbers(2, 1000, 2)
+        rsa_instance = RSA.with_random_prime_numbers(0, 0, bits=2048)
         """
-        console = Console()
+        # O rich só é usado aqui, na geração interativa; importá-lo no topo do módulo atrasaria todos os comandos.
+        from rich.console import Console
 
-        p = RSA.__random_prime_number(start, stop, step)
-        console.print(f"O primeiro número aleatório gerado foi: {p}")
-
-        q = RSA.__random_prime_number(start, stop, step)
-        console.print(f"O segundo número aleatório gerado foi: {q}")
-        while p == q:
-            q = RSA.__random_prime_number(start, stop, step)
-
-        phi = (p - 1) * (q - 1)
+        console = Console()
+        sizes = RSA.__prime_bits(bits, primes)
+
+        factors: List[int] = []
+        while not factors or bits is not None and prod(factors).bit_length() != bits:
+            factors = []
+            for size in sizes:
+                with STATS.phase('keygen.primes'):
+                    prime = RSA.__random_prime_number(start, stop, step, size, rounds, primes)
+                    while prime in factors:
+                        prime = RSA.__random_prime_number(start, stop, step, size, rounds, primes)
+                factors.append(prime)
+
+        for ordinal, prime in zip(ORDINALS, factors):
+            console.print(f"O {ordinal} número aleatório gerado foi: {prime}")
+
+        phi = prod(r - 1 for r in factors)
         console.print(f"O valor de phi é: {phi}")
 
         while True:
@@ -151,9 +484,9 @@ class RSA:
                 break
             console.print(f"Valor de 'e' inválido. {e} não é coprimo com φ(n) = {phi}. Tente novamente.")
 
-        d = gcd_e_phi.modular_inverse(e, phi)
-
-        return RSA(p, q, e, d)
+        with STATS.phase('keygen.derive'):
+            d = gcd_e_phi.modular_inverse(e, phi)
+            return RSA(factors[0], factors[1], e, d, factors[2:])
 
     def encrypt(self, plaintext: str) -> str:
         """
@@ -162,16 +495,55 @@ class RSA:
         :param: texto simples: o texto simples a ser criptografado.
         :return: O texto cifrado criptografado.
         """
-        return ''.join(chr(pow(ord(letter), self.__e) % self.n) for letter in plaintext)
+        return TRANSLATION_TABLES.translate(self.n, self.__e, plaintext)
 
     def decrypt(self, ciphertext: str) -> str:
         """
         Descriptografa um determinado texto cifrado usando a chave privada.
 
+        A exponenciação é feita pelo Teorema Chinês do Resto, com os parâmetros pré-calculados na construção, e apenas
+        uma vez por símbolo distinto, graças à tabela de tradução da chave.
+
         :param ciphertext: o texto criptografado a ser descriptografado.
         :return: O texto simples descriptografado.
         """
-        return ''.join(chr(pow(ord(letter), self.__d) % self.n) for letter in ciphertext)
+        return TRANSLATION_TABLES.translate(self.n, self.__d, ciphertext, self.__decrypt_value)
+
+    def __decrypt_value(self, c: int) -> int:
+        """
+        Aplica a chave privada a um único valor usando o Teorema Chinês do Resto (recombinação de Garner).
+
+        :param c: o valor cifrado.
+        :return: c^d mod n.
+        """
+        return RSA.crt_power(c, self.__p, self.__q, self.__dp, self.__dq, self.__q_inv, self.__other_infos)
+
+    @staticmethod
+    def crt_power(c: int, p: int, q: int, dp: int, dq: int, q_inv: int,
+                  others: Sequence[Tuple[int, int, int]] = ()) -> int:
+        """
+        Calcula c^d mod n pelo Teorema Chinês do Resto, com uma exponenciação por primo, e recombina os resultados pelo
+        algoritmo de Garner (PKCS #1 v2.2, RSADP).
+
+        :param c: o valor cifrado.
+        :param p: o primeiro número primo.
+        :param q: o segundo número primo.
+        :param dp: d mod (p - 1).
+        :param dq: d mod (q - 1).
+        :param q_inv: q^-1 mod p.
+        :param others: para cada primo adicional r_i, a tupla (r_i, d mod (r_i - 1), (r_1 · ... · r_(i-1))^-1 mod r_i).
+        :return: c^d mod n.
+        """
+        m1 = pow(c, dp, p)
+        m2 = pow(c, dq, q)
+        h = (q_inv * (m1 - m2)) % p
+        m = m2 + h * q
+        product = p * q
+        for r, d_r, t_r in others:
+            h = (t_r * (pow(c, d_r, r) - m)) % r
+            m += h * product
+            product *= r
+        return m
 
     @staticmethod
     def encrypt_with(n: int, public_key: int, plaintext: str) -> str:
@@ -183,7 +555,7 @@ class RSA:
         :param plaintext: o texto simples a ser criptografado.
         :return: O texto cifrado criptografado como uma cadeia de caracteres.
         """
-        return ''.join(chr(pow(ord(letter), public_key) % n) for letter in plaintext)
+        return TRANSLATION_TABLES.translate(n, public_key, plaintext)
 
     @staticmethod
     def decrypt_with(n: int, public_key: int, ciphertext: str) -> str:
@@ -194,4 +566,29 @@ class RSA:
         :return: o texto descriptografado.
 
         """
-        return ''.join(chr(pow(ord(letter), public_key) % n) for letter in ciphertext)
+        return TRANSLATION_TABLES.translate(n, public_key, ciphertext)
+
+    @staticmethod
+    def encrypt_bytes_with(n: int, public_key: int, plaintext: bytes) -> bytes:
+        """
+        Criptografa os bytes fornecidos em blocos, empacotando em cada exponenciação tantos bytes quanto cabem abaixo de n.
+        A chave é preparada uma única vez e reaproveitada nas chamadas seguintes (ver PreparedKeyCache).
+
+        :param n: O valor do módulo usado na criptografia.
+        :param public_key: a chave pública usada na criptografia.
+        :param plaintext: os bytes a serem criptografados.
+        :return: os blocos cifrados, com largura fixa e big-endian.
+        """
+        return PREPARED_KEYS.get(n, public_key).encrypt_many((plaintext,))[0]
+
+    @staticmethod
+    def decrypt_bytes_with(n: int, private_key: int, ciphertext: bytes) -> bytes:
+        """
+        Descriptografa bytes produzidos por encrypt_bytes_with, reaproveitando a chave preparada nas chamadas anteriores.
+
+        :param n: O módulo usado no processo de descriptografia.
+        :param private_key: a chave privada usada no processo de descriptografia.
+        :param ciphertext: os blocos cifrados.
+        :return: os bytes originais.
+        """
+        return PREPARED_KEYS.get(n, private_key).decrypt_many((ciphertext,))[0]
@@ -0,0 +1,97 @@
+import sys
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from attr import define, field
+
+from src.util.stats import STATS
+from src.util.vectorized import power_many, vectorizable
+
+DEFAULT_MAX_ENTRIES = 1 << 17
+# Maior módulo do modo por caractere: cada resultado, menor que n, precisa ser um código Unicode válido.
+MAX_CHAR_MODULUS = sys.maxunicode + 1
+CHAR_MODULUS_MESSAGE = (f"O modo 'char' exige um módulo de até {MAX_CHAR_MODULUS}, pois cada caractere cifrado é um "
+                        "código Unicode. Use o modo 'block' ou 'envelope'.")
+
+
+@define
+class TranslationTableCache:
+    """
+    Classe que memoiza o RSA por caractere.
+
+    No modo por caractere, o texto cifrado de cada símbolo é determinístico para uma chave (n, expoente). Esta classe
+    mantém, para cada chave, uma tabela de tradução indexada pelo código do símbolo, preenchida sob demanda apenas com
+    os símbolos já vistos e aplicada com str.translate. As tabelas de várias chaves ficam em uma LRU cujo tamanho total
+    é limitado por 'max_entries'. Com módulos menores que 2^32 e o NumPy instalado, os símbolos que faltam são
+    exponenciados de uma vez (ver src.util.vectorized).
+
+    Atributos:
+        max_entries (int): o número máximo de símbolos memorizados, somando todas as tabelas.
+        __tables (OrderedDict[Tuple[int, int], Dict[int, str]]): as tabelas de tradução, da menos para a mais recente.
+        __entries (int): o número de símbolos memorizados, somando todas as tabelas.
+
+    Métodos:
+        translate(n: int, exponent: int, text: str, power: Optional[Callable[[int], int]] = None) -> str: Aplica a chave a cada caractere do texto.
+        clear() -> None: Descarta todas as tabelas.
+    """
+    max_entries: int = DEFAULT_MAX_ENTRIES
+    __tables: 'OrderedDict[Tuple[int, int], Dict[int, str]]' = field(init=False, factory=OrderedDict)
+    __entries: int = field(init=False, default=0)
+
+    def translate(self, n: int, exponent: int, text: str, power: Optional[Callable[[int], int]] = None) -> str:
+        """
+        Aplica a chave (n, exponent) a cada caractere do texto, calculando a exponenciação apenas para os símbolos que
+        ainda não estão na tabela da chave.
+
+        :param n: O módulo da chave.
+        :param exponent: o expoente da chave.
+        :param text: o texto a ser transformado.
+        :param power: função que calcula a exponenciação de um valor, por exemplo, pelo Teorema Chinês do Resto. O padrão
+            é pow(valor, exponent, n).
+        :return: o texto transformado.
+        :raises ValueError: se n for maior que MAX_CHAR_MODULUS.
+        """
+        if n > MAX_CHAR_MODULUS:
+            raise ValueError(CHAR_MODULUS_MESSAGE)
+        key = (n, exponent)
+        table = self.__tables.get(key)
+        if table is None:
+            table = self.__tables[key] = {}
+        else:
+            self.__tables.move_to_end(key)
+
+        missing = [code for code in map(ord, set(text)) if code not in table]
+        STATS.count('chars.processed', len(text))
+        if missing:
+            STATS.count('modexp.calls', len(missing))
+            if vectorizable(n, len(missing)):
+                table.update(zip(missing, map(chr, power_many(missing, exponent, n))))
+            else:
+                table.update({code: chr(power(code) if power else pow(code, exponent, n)) for code in missing})
+            self.__entries += len(missing)
+            self.__evict()
+
+        return text.translate(table)
+
+    def clear(self):
+        """
+        Descarta todas as tabelas.
+
+        :return: None
+        """
+        self.__tables.clear()
+        self.__entries = 0
+
+    def __evict(self):
+        """
+        Descarta as tabelas usadas há mais tempo até que o total de símbolos caiba em 'max_entries'. A tabela mais
+        recente nunca é descartada.
+
+        :return: None
+        """
+        while self.__entries > self.max_entries and len(self.__tables) > 1:
+            _, table = self.__tables.popitem(last=False)
+            self.__entries -= len(table)
+
+
+TRANSLATION_TABLES = TranslationTableCache()
@@ -0,0 +1,125 @@
+import itertools
+import json
+import os
+import socket
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, Optional
+
+from attr import define, field
+
+from src.server.protocol import DEFAULT_HOST, DEFAULT_SOCKET, LINE_LIMIT
+
+
+@define
+class DaemonClient:
+    """
+    Classe que envia requisições ao servidor local de criptografia (ver Daemon).
+
+    A conexão é aberta na primeira requisição e reaproveitada pelas seguintes, de modo que o custo de cada requisição
+    é apenas a ida e a volta pelo socket.
+
+    Atributos:
+        socket_path (Optional[Path]): o caminho do socket Unix. Ignorado se 'port' for informado.
+        port (Optional[int]): a porta TCP do localhost.
+        token (Optional[str]): o token de acesso do servidor, enviado em cada requisição.
+        __connection (Optional[socket.socket]): a conexão aberta.
+        __stream (Optional[BinaryIO]): o arquivo de leitura e escrita associado à conexão.
+        __ids (Iterator[int]): o gerador dos identificadores das requisições.
+
+    Métodos:
+        request(operation: str, key: Path, content: str, mode: str = 'char') -> str: Envia uma requisição e aguarda o resultado.
+        request_many(operation: str, key: Path, contents: Iterable[str], mode: str = 'char') -> List[str]: Envia várias requisições de uma vez.
+        close() -> None: Fecha a conexão.
+    """
+    socket_path: Optional[Path] = DEFAULT_SOCKET
+    port: Optional[int] = None
+    token: Optional[str] = None
+    __connection: Optional[socket.socket] = field(init=False, default=None)
+    __stream: Optional[BinaryIO] = field(init=False, default=None)
+    __ids: Iterator[int] = field(init=False, factory=itertools.count)
+
+    def request(self, operation: str, key: Path, content: str, mode: str = 'char') -> str:
+        """
+        Envia uma requisição e aguarda o resultado.
+
+        :param operation: 'encrypt' ou 'decrypt'.
+        :param key: o caminho do arquivo de chave. Ele é enviado como caminho absoluto.
+        :param content: o texto a ser transformado. No modo 'block', a descriptografia espera o texto em hexadecimal.
+        :param mode: 'char' ou 'block'.
+        :return: o texto transformado.
+        :raises ValueError: se o servidor responder com um erro.
+        """
+        return self.request_many(operation, key, (content,), mode)[0]
+
+    def request_many(self, operation: str, key: Path, contents: Iterable[str], mode: str = 'char') -> List[str]:
+        """
+        Envia várias requisições sem esperar as respostas e as coleta em seguida, de modo que o servidor possa agrupá-las
+        em um único lote.
+
+        :param operation: 'encrypt' ou 'decrypt'.
+        :param key: o caminho do arquivo de chave. Ele é enviado como caminho absoluto.
+        :param contents: os textos a serem transformados.
+        :param mode: 'char' ou 'block'.
+        :return: os textos transformados, na ordem de 'contents'.
+        :raises ValueError: se o servidor responder com um erro a alguma das requisições.
+        """
+        stream = self.__connect()
+        key_path = str(Path(key).resolve())
+        ids = []
+        for content in contents:
+            request_id = next(self.__ids)
+            ids.append(request_id)
+            request = {'id': request_id, 'op': operation, 'key': key_path, 'mode': mode, 'content': content}
+            if self.token is not None:
+                request['token'] = self.token
+            stream.write(json.dumps(request).encode() + b'\n')
+        stream.flush()
+
+        responses = {}
+        while len(responses) < len(ids):
+            line = stream.readline(LINE_LIMIT)
+            if not line:
+                raise ConnectionError("O servidor encerrou a conexão.")
+            response = json.loads(line)
+            responses[response['id']] = response
+
+        # Os erros só são levantados depois que todas as respostas foram lidas, para não deixar a conexão dessincronizada.
+        for request_id in ids:
+            if not responses[request_id]['ok']:
+                raise ValueError(responses[request_id]['error'])
+        return [responses[request_id]['result'] for request_id in ids]
+
+    def close(self):
+        """
+        Fecha a conexão, se estiver aberta.
+
+        :return: None
+        """
+        if self.__connection is not None:
+            self.__stream.close()
+            self.__connection.close()
+            self.__connection = self.__stream = None
+
+    def __connect(self) -> BinaryIO:
+        """
+        Abre a conexão, se ainda não estiver aberta. Um socket Unix só é usado se pertencer ao usuário atual.
+
+        :return: o arquivo de leitura e escrita associado à conexão.
+        :raises OSError: se o servidor não estiver acessível ou se o socket pertencer a outro usuário.
+        """
+        if self.__connection is None:
+            if self.port is not None:
+                connection = socket.create_connection((DEFAULT_HOST, self.port))
+                connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            else:
+                # Um socket de outro usuário pode ser um servidor falso, que receberia os textos e os caminhos das chaves.
+                if os.stat(self.socket_path).st_uid != os.getuid():
+                    raise PermissionError(f"O socket {self.socket_path} pertence a outro usuário.")
+                connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    connection.connect(str(self.socket_path))
+                except OSError:
+                    connection.close()
+                    raise
+            self.__connection, self.__stream = connection, connection.makefile('rwb')
+        return self.__stream
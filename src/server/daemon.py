@@ -0,0 +1,383 @@
+import asyncio
+import hmac
+import json
+import os
+import signal
+import stat
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from attr import define, field
+
+from src.cryptography.key import KEY_LOADER
+from src.server.protocol import (DEFAULT_HOST, DEFAULT_MAX_BATCH, DEFAULT_SOCKET, LINE_LIMIT, MODES, OPERATIONS,
+                                 PRIVATE_SOCKET_DIR)
+from src.util.stats import STATS
+
+# Mensagens devolvidas aos clientes. Elas não repetem o texto das exceções, que pode revelar caminhos ou o conteúdo de
+# arquivos do servidor.
+KEY_ERROR = "Não foi possível carregar a chave."
+UNKNOWN_KEY_ERROR = "Chave não registrada no servidor."
+TOKEN_ERROR = "Token de acesso inválido."
+BATCH_ERROR = "Falha ao processar o lote."
+ITEM_ERROR = "Falha ao processar a requisição."
+# Campos de texto obrigatórios de uma requisição ('mode' é opcional, com o padrão 'char').
+REQUEST_FIELDS = ('op', 'key', 'content')
+# Permissões dos arquivos criados enquanto o socket Unix é aberto: leitura e escrita apenas para o dono.
+SOCKET_UMASK = 0o177
+
+# (operação, caminho da chave, modo, conteúdo)
+Item = Tuple[str, str, str, str]
+
+
+def _load_key(key_path: str):
+    """
+    Carrega uma chave pelo KEY_LOADER do processo.
+
+    :param key_path: o caminho absoluto do arquivo de chave.
+    :return: a chave carregada (RSAKey).
+    :raises ValueError: com uma mensagem genérica, se o arquivo não puder ser lido ou não for uma chave válida.
+    """
+    try:
+        return KEY_LOADER.load(Path(key_path))
+    except (ValueError, OSError):
+        raise ValueError(KEY_ERROR) from None
+
+
+def _key_paths(paths: Iterable[Path]) -> FrozenSet[str]:
+    """
+    :param paths: os arquivos de chave.
+    :return: os caminhos absolutos dos arquivos, no formato enviado pelo DaemonClient.
+    """
+    return frozenset(str(Path(path).resolve()) for path in paths)
+
+
+def process_item(operation: str, key_path: str, mode: str, content: str) -> str:
+    """
+    Executa uma operação de criptografia sobre um texto, com a chave memorizada pelo KEY_LOADER do processo.
+
+    :param operation: 'encrypt' ou 'decrypt'.
+    :param key_path: o caminho absoluto do arquivo de chave.
+    :param mode: 'char' ou 'block'. No modo 'block', o texto cifrado é representado em hexadecimal.
+    :param content: o texto a ser transformado.
+    :return: o texto transformado.
+    :raises ValueError: se a operação ou o modo forem desconhecidos, se a chave não puder ser carregada ou se o conteúdo
+        não corresponder à chave.
+    """
+    if operation not in OPERATIONS or mode not in MODES:
+        raise ValueError(f"Operação ou modo desconhecido: {operation}, {mode}")
+    if mode == 'block':
+        return process_blocks(operation, key_path, [content])[0]
+    return _load_key(key_path).translate(content)
+
+
+def process_blocks(operation: str, key_path: str, contents: List[str]) -> List[str]:
+    """
+    Executa uma operação no modo em blocos sobre vários textos, com a PreparedKey da chave, de modo que todos os blocos
+    passam por uma única chamada.
+
+    :param operation: 'encrypt' ou 'decrypt'.
+    :param key_path: o caminho absoluto do arquivo de chave.
+    :param contents: os textos a serem transformados. O texto cifrado é representado em hexadecimal.
+    :return: os textos transformados, na mesma ordem.
+    :raises ValueError: se a chave não puder ser carregada ou se algum conteúdo não corresponder à chave.
+    """
+    prepared = _load_key(key_path).prepared()
+    if operation == 'encrypt':
+        return [ciphertext.hex() for ciphertext in prepared.encrypt_many(content.encode() for content in contents)]
+    return [message.decode() for message in prepared.decrypt_many(bytes.fromhex(content) for content in contents)]
+
+
+def process_batch(items: List[Item]) -> List[Tuple[bool, str]]:
+    """
+    Executa um lote de operações. Um erro em um item não interrompe os demais.
+
+    Os itens do modo em blocos com a mesma operação e a mesma chave são executados juntos (ver process_blocks). Se o
+    grupo falhar, os seus itens são refeitos um a um, para que apenas os itens inválidos recebam o erro.
+
+    :param items: as operações, como tuplas (operação, caminho da chave, modo, conteúdo).
+    :return: para cada item, a tupla (sucesso, resultado ou mensagem de erro), na mesma ordem.
+    """
+    results: List[Optional[Tuple[bool, str]]] = [None] * len(items)
+    groups: Dict[Tuple[str, str], List[int]] = {}
+    for index, (operation, key_path, mode, _) in enumerate(items):
+        if mode == 'block' and operation in OPERATIONS:
+            groups.setdefault((operation, key_path), []).append(index)
+
+    for (operation, key_path), indices in groups.items():
+        if len(indices) < 2:
+            continue
+        try:
+            transformed = process_blocks(operation, key_path, [items[index][3] for index in indices])
+        except Exception:
+            continue
+        for index, result in zip(indices, transformed):
+            results[index] = (True, result)
+
+    for index, item in enumerate(items):
+        if results[index] is not None:
+            continue
+        try:
+            results[index] = (True, process_item(*item))
+        except (ValueError, OverflowError, OSError) as error:
+            results[index] = (False, str(error))
+        except Exception:
+            # Um erro inesperado fica restrito à requisição que o causou, sem afetar as demais do lote.
+            results[index] = (False, ITEM_ERROR)
+    return results
+
+
+@define
+class Daemon:
+    """
+    Classe que implementa o servidor local de criptografia.
+
+    O servidor escuta em um socket Unix ou em uma porta TCP do localhost e recebe uma requisição JSON por linha:
+    {"id": ..., "op": "encrypt" | "decrypt", "key": caminho, "mode": "char" | "block", "content": texto, "token": ...}.
+    A resposta, também uma linha JSON, repete o "id" e traz "ok" e "result" ou "error". Cada conexão pode enviar várias
+    requisições sem esperar as respostas, que chegam na ordem em que ficam prontas.
+
+    Apenas as chaves registradas na inicialização ('keys') são usadas; qualquer outro caminho é recusado sem que o
+    arquivo seja aberto. O socket Unix é criado com permissão apenas para o dono, e um caminho já existente só é
+    substituído se for um socket. A porta TCP, acessível a todos os
+    usuários da máquina, exige um token compartilhado, enviado em cada requisição e comparado em tempo constante.
+
+    As requisições de todas as conexões entram em uma fila. A cada volta do laço de eventos, tudo o que chegou é
+    agrupado em um lote de até 'max_batch' itens e despachado ao pool de processos, que mantém as chaves já lidas em
+    memória. Com 'jobs' igual a 0, os lotes são executados no próprio processo do servidor, o que evita a comunicação
+    entre processos e dá a menor latência para textos curtos.
+
+    Atributos:
+        socket_path (Optional[Path]): o caminho do socket Unix. Ignorado se 'port' for informado.
+        port (Optional[int]): a porta TCP do localhost. Exige 'token'.
+        jobs (Optional[int]): o número de processos do pool. O padrão é o número de núcleos; 0 dispensa o pool.
+        max_batch (int): o número máximo de requisições por lote.
+        keys (FrozenSet[str]): os caminhos absolutos das chaves que o servidor aceita.
+        token (Optional[str]): o token que as requisições devem trazer, ou None para não exigi-lo (apenas no socket
+            Unix).
+        __queue (Optional[asyncio.Queue]): a fila de requisições pendentes.
+        __bound (bool): se o socket Unix foi criado por este servidor, que então o remove ao final.
+
+    Métodos:
+        run() -> None: Inicia o servidor e atende requisições até ser interrompido (Ctrl+C ou SIGTERM).
+    """
+    socket_path: Optional[Path] = DEFAULT_SOCKET
+    port: Optional[int] = None
+    jobs: Optional[int] = None
+    max_batch: int = DEFAULT_MAX_BATCH
+    keys: FrozenSet[str] = field(factory=frozenset, converter=_key_paths)
+    token: Optional[str] = None
+    __queue: Optional[asyncio.Queue] = field(init=False, default=None)
+    __bound: bool = field(init=False, default=False)
+
+    def __attrs_post_init__(self):
+        """
+        Verifica se a porta TCP está protegida por um token.
+
+        :return: None
+        :raises ValueError: se 'port' for informado sem 'token'.
+        """
+        if self.port is not None and not self.token:
+            raise ValueError("O servidor TCP exige um token de acesso.")
+
+    def run(self):
+        """
+        Inicia o servidor e atende requisições até ser interrompido (Ctrl+C ou SIGTERM). O socket Unix é removido ao
+        final.
+
+        :return: None
+        :raises ValueError: se o caminho do socket já existir e não for um socket, ou se o diretório padrão do socket
+            não for privado.
+        :raises OSError: se o socket não puder ser criado.
+        """
+        try:
+            asyncio.run(self.__serve())
+        finally:
+            if self.__bound:
+                self.socket_path.unlink(missing_ok=True)
+                self.__bound = False
+
+    async def __serve(self):
+        """
+        Abre o socket, o pool de processos e a tarefa que forma os lotes.
+
+        :return: None
+        """
+        self.__queue = asyncio.Queue()
+        jobs = (os.cpu_count() or 1) if self.jobs is None else self.jobs
+        executor = ProcessPoolExecutor(max_workers=jobs) if jobs else None
+        batcher = asyncio.create_task(self.__batch_loop(executor, max(jobs, 1) * 2))
+
+        if self.port is not None:
+            server = await asyncio.start_server(self.__handle, DEFAULT_HOST, self.port, limit=LINE_LIMIT)
+        else:
+            self.__prepare_socket()
+            # O socket já nasce com permissão apenas para o dono: um chmod depois do bind deixaria uma janela em que
+            # outros usuários poderiam se conectar.
+            umask = os.umask(SOCKET_UMASK)
+            try:
+                server = await asyncio.start_unix_server(self.__handle, str(self.socket_path), limit=LINE_LIMIT)
+            finally:
+                os.umask(umask)
+            self.__bound = True
+
+        stopped = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+        try:
+            async with server:
+                await stopped.wait()
+        finally:
+            batcher.cancel()
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    def __prepare_socket(self):
+        """
+        Prepara o caminho do socket Unix: cria o diretório privado padrão, se necessário, e remove um socket antigo.
+        Qualquer outro arquivo no caminho é preservado, e o servidor não é iniciado.
+
+        :return: None
+        :raises ValueError: se o diretório padrão pertencer a outro usuário ou puder ser acessado por outros usuários,
+            ou se o caminho existir e não for um socket.
+        """
+        directory = self.socket_path.parent
+        if directory == PRIVATE_SOCKET_DIR:
+            directory.mkdir(mode=0o700, exist_ok=True)
+            status = os.lstat(directory)
+            if not stat.S_ISDIR(status.st_mode) or status.st_uid != os.getuid() or status.st_mode & 0o077:
+                raise ValueError(f"O diretório {directory} não é privado do usuário atual.")
+        try:
+            status = os.lstat(self.socket_path)
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(status.st_mode):
+            raise ValueError(f"{self.socket_path} já existe e não é um socket.")
+        self.socket_path.unlink()
+
+    async def __handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Atende uma conexão: cada linha recebida vira uma tarefa, e cada resposta é escrita assim que fica pronta.
+
+        :param reader: o fluxo de leitura da conexão.
+        :param writer: o fluxo de escrita da conexão.
+        :return: None
+        """
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self.__respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def __respond(self, line: bytes, writer: asyncio.StreamWriter):
+        """
+        Interpreta uma requisição, aguarda o resultado do lote em que ela entrou e escreve a resposta. As requisições
+        sem o token ou com uma chave não registrada são respondidas com um erro sem entrar em um lote.
+
+        :param line: a requisição, uma linha JSON.
+        :param writer: o fluxo de escrita da conexão.
+        :return: None
+        """
+        response: Dict[str, Any] = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a requisição deve ser um objeto JSON")
+            response['id'] = request.get('id')
+            item = self.__parse(request)
+            if not self.__authorized(request.get('token')):
+                ok, result = False, TOKEN_ERROR
+            elif item[1] not in self.keys:
+                ok, result = False, UNKNOWN_KEY_ERROR
+            else:
+                future = asyncio.get_running_loop().create_future()
+                await self.__queue.put((item, future))
+                ok, result = await future
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            ok, result = False, f"Requisição inválida: {error}"
+
+        response.update({'ok': True, 'result': result} if ok else {'ok': False, 'error': result})
+        writer.write(json.dumps(response).encode() + b'\n')
+        await writer.drain()
+
+    @staticmethod
+    def __parse(request: Dict[str, Any]) -> Item:
+        """
+        Valida os campos de uma requisição, de modo que apenas itens bem formados entrem em um lote.
+
+        :param request: a requisição decodificada.
+        :return: o item (operação, caminho da chave, modo, conteúdo).
+        :raises ValueError: se faltar o "id" ou algum campo obrigatório, ou se algum campo não for um texto.
+        """
+        if 'id' not in request:
+            raise ValueError("campo 'id' ausente")
+        for name in REQUEST_FIELDS:
+            if name not in request:
+                raise ValueError(f"campo '{name}' ausente")
+        item = (request['op'], request['key'], request.get('mode', 'char'), request['content'])
+        for name, value in zip(('op', 'key', 'mode', 'content'), item):
+            if not isinstance(value, str):
+                raise ValueError(f"o campo '{name}' deve ser um texto")
+        return item
+
+    def __authorized(self, token: Any) -> bool:
+        """
+        Verifica o token de uma requisição, em tempo constante.
+
+        :param token: o token recebido.
+        :return: True se o servidor não exigir token ou se o token recebido for o configurado.
+        """
+        if self.token is None:
+            return True
+        return isinstance(token, str) and hmac.compare_digest(token.encode(), self.token.encode())
+
+    async def __batch_loop(self, executor: Optional[Executor], in_flight: int):
+        """
+        Forma os lotes: aguarda a primeira requisição, cede a vez ao laço de eventos uma única vez para que as leituras
+        já disponíveis entrem na fila e despacha tudo o que estiver pendente, até 'max_batch' itens.
+
+        :param executor: o pool de processos, ou None para executar os lotes no próprio processo.
+        :param in_flight: o número máximo de lotes em execução ao mesmo tempo.
+        :return: None
+        """
+        slots = asyncio.Semaphore(in_flight)
+        while True:
+            pending = [await self.__queue.get()]
+            await asyncio.sleep(0)
+            while len(pending) < self.max_batch and not self.__queue.empty():
+                pending.append(self.__queue.get_nowait())
+
+            await slots.acquire()
+            task = asyncio.create_task(self.__dispatch(executor, pending))
+            task.add_done_callback(lambda _: slots.release())
+
+    @staticmethod
+    async def __dispatch(executor: Optional[Executor], pending: List[Tuple[Item, asyncio.Future]]):
+        """
+        Executa um lote e entrega cada resultado à requisição correspondente.
+
+        :param executor: o pool de processos, ou None para executar o lote no próprio processo.
+        :param pending: os itens do lote e os futuros que aguardam os seus resultados.
+        :return: None
+        """
+        STATS.count('daemon.batches')
+        STATS.count('daemon.requests', len(pending))
+        items = [item for item, _ in pending]
+        try:
+            if executor is None:
+                results = process_batch(items)
+            else:
+                results = await asyncio.get_running_loop().run_in_executor(executor, process_batch, items)
+        except Exception:
+            results = [(False, BATCH_ERROR)] * len(items)
+
+        for (_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,16 @@
+import os
+import tempfile
+from pathlib import Path
+
+# O socket padrão fica em XDG_RUNTIME_DIR, que já é privado do usuário, ou, sem ele, em um diretório por usuário no
+# diretório temporário, que o servidor cria com permissão apenas para o dono. Um nome fixo diretamente no diretório
+# temporário, que todos podem escrever, poderia ser ocupado antes por outro usuário.
+RUNTIME_DIR = os.environ.get('XDG_RUNTIME_DIR')
+PRIVATE_SOCKET_DIR = None if RUNTIME_DIR else Path(tempfile.gettempdir()) / f'cryptography-{os.getuid()}'
+DEFAULT_SOCKET = Path(RUNTIME_DIR or PRIVATE_SOCKET_DIR) / 'cryptography.sock'
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_MAX_BATCH = 256
+OPERATIONS = ('encrypt', 'decrypt')
+MODES = ('char', 'block')
+# Tamanho máximo de uma linha do protocolo (uma requisição ou resposta em JSON).
+LINE_LIMIT = 16 << 20
@@ -0,0 +1,214 @@
+import operator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from math import gcd
+from typing import List, Optional, Sequence, Tuple
+
+from attr import define, field
+
+from src.util.stats import STATS
+
+# Divisores com até este número de bits usam a divisão nativa, que é quadrática, mas mais rápida nesse tamanho.
+DIVISION_LIMIT = 1 << 14
+# Número de módulos por árvore. Apenas uma árvore fica em memória de cada vez.
+DEFAULT_CHUNK_SIZE = 4096
+
+
+def remainder(a: int, b: int) -> int:
+    """
+    Calcula a mod b pela divisão recursiva de Burnikel e Ziegler, cujo custo é o da multiplicação de Karatsuba vezes um
+    fator logarítmico. A divisão nativa do CPython é quadrática e domina o custo da árvore de restos para números com
+    centenas de milhares de bits.
+
+    :param a: o dividendo, não negativo.
+    :param b: o divisor, positivo.
+    :return: a mod b.
+    """
+    n = b.bit_length()
+    if n <= DIVISION_LIMIT:
+        return a % b
+
+    # O dividendo é percorrido em dígitos de n bits, do mais significativo para o menos.
+    mask = (1 << n) - 1
+    rest = 0
+    for shift in range(a.bit_length() // n * n, -1, -n):
+        _, rest = _divide_2n_by_n(rest << n | (a >> shift) & mask, b, n)
+    return rest
+
+
+def _divide_2n_by_n(a: int, b: int, n: int) -> Tuple[int, int]:
+    """
+    Divide um número de até 2n bits por um de n bits.
+
+    :param a: o dividendo, menor que b · 2^n.
+    :param b: o divisor, com n bits.
+    :param n: o número de bits do divisor.
+    :return: a tupla (quociente, resto).
+    """
+    if n <= DIVISION_LIMIT:
+        return divmod(a, b)
+    pad = n & 1
+    if pad:
+        a, b, n = a << 1, b << 1, n + 1
+    half = n >> 1
+    mask = (1 << half) - 1
+    b1, b2 = b >> half, b & mask
+    q1, rest = _divide_3_by_2(a >> n, a >> half & mask, b, b1, b2, half)
+    q2, rest = _divide_3_by_2(rest, a & mask, b, b1, b2, half)
+    return q1 << half | q2, rest >> pad
+
+
+def _divide_3_by_2(a12: int, a3: int, b: int, b1: int, b2: int, n: int) -> Tuple[int, int]:
+    """
+    Divide um número de três metades de n bits (a12 · 2^n + a3) por um de duas metades (b = b1 · 2^n + b2).
+
+    :param a12: as duas metades mais significativas do dividendo.
+    :param a3: a metade menos significativa do dividendo.
+    :param b: o divisor.
+    :param b1: a metade mais significativa do divisor.
+    :param b2: a metade menos significativa do divisor.
+    :param n: o número de bits de cada metade.
+    :return: a tupla (quociente, resto).
+    """
+    if a12 >> n == b1:
+        q, rest = (1 << n) - 1, a12 - (b1 << n) + b1
+    else:
+        q, rest = _divide_2n_by_n(a12, b1, n)
+    rest = (rest << n | a3) - q * b2
+    while rest < 0:
+        q -= 1
+        rest += b
+    return q, rest
+
+
+def _reduce_square(value: int, modulus: int) -> int:
+    """
+    Reduz um valor módulo o quadrado de um nó da árvore de produtos.
+
+    :param value: o resto do nó pai.
+    :param modulus: o nó.
+    :return: value mod modulus².
+    """
+    return remainder(value, modulus * modulus)
+
+
+def _leaf_gcd(value: int, modulus: int) -> int:
+    """
+    Calcula o fator que um módulo compartilha com os demais a partir do seu resto na árvore.
+
+    :param value: o produto de todos os módulos, reduzido módulo modulus².
+    :param modulus: o módulo.
+    :return: mdc(modulus, produto dos demais módulos).
+    """
+    return gcd(modulus, value // modulus)
+
+
+@define
+class BatchGCD:
+    """
+    Classe que implementa o mdc em lote de Bernstein.
+
+    Para cada módulo n_i, calcula mdc(n_i, P / n_i), em que P é o produto de todos os módulos, sem calcular os mdc de
+    todos os pares. Os módulos são multiplicados dois a dois em uma árvore de produtos; P é então reduzido módulo o
+    quadrado de cada nó, da raiz até as folhas (a árvore de restos), e cada folha dá P mod n_i², de onde sai o mdc. O
+    custo é quase linear no total de bits dos módulos.
+
+    Para limitar a memória, os módulos são divididos em grupos de 'chunk_size': primeiro são calculados o produto de
+    cada grupo e P; depois, a árvore de cada grupo é refeita e a árvore de restos parte de P mod (produto do grupo)².
+    Apenas uma árvore fica em memória de cada vez.
+
+    Os níveis das árvores são independentes nó a nó e, com 'jobs' maior que 1, são distribuídos por um pool de
+    processos.
+
+    Atributos:
+        jobs (int): o número de processos. Com 1, tudo roda no próprio processo.
+        chunk_size (int): o número máximo de módulos por árvore.
+
+    Métodos:
+        run(moduli: Sequence[int]) -> List[int]: Calcula, para cada módulo, o fator que ele compartilha com os demais.
+    """
+    jobs: int = 1
+    chunk_size: int = field(default=DEFAULT_CHUNK_SIZE)
+
+    @chunk_size.validator
+    def _check_chunk_size(self, attribute, value):
+        if value < 1:
+            raise ValueError(f"O tamanho dos grupos deve ser positivo, recebido {value}.")
+
+    def run(self, moduli: Sequence[int]) -> List[int]:
+        """
+        Calcula, para cada módulo, o fator que ele compartilha com os demais.
+
+        :param moduli: os módulos, distintos e maiores que 1.
+        :return: para cada módulo n_i, mdc(n_i, produto dos demais), na mesma ordem. 1 indica que o módulo não
+            compartilha fatores; n_i indica que todos os seus fatores aparecem em outros módulos.
+        """
+        if len(moduli) < 2:
+            return [1] * len(moduli)
+        STATS.count('audit.moduli', len(moduli))
+
+        executor = ProcessPoolExecutor(max_workers=self.jobs) if self.jobs > 1 else None
+        try:
+            chunks = [moduli[i:i + self.chunk_size] for i in range(0, len(moduli), self.chunk_size)]
+            with STATS.phase('audit.product_tree'):
+                # A árvore do primeiro grupo é mantida, pois é a única quando há um só grupo.
+                tree = self.__product_tree(chunks[0], executor)
+                products = [tree[-1][0]] + [self.__product_tree(chunk, executor)[-1][0] for chunk in chunks[1:]]
+                total = self.__product_tree(products, executor)[-1][0]
+
+            factors: List[int] = []
+            for index, chunk in enumerate(chunks):
+                if index > 0:
+                    with STATS.phase('audit.product_tree'):
+                        tree = self.__product_tree(chunk, executor)
+                with STATS.phase('audit.remainder_tree'):
+                    factors += self.__remainder_tree(tree, remainder(total, tree[-1][0] ** 2), executor)
+            return factors
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def __product_tree(self, values: Sequence[int], executor: Optional[Executor]) -> List[List[int]]:
+        """
+        Monta a árvore de produtos, das folhas até a raiz.
+
+        :param values: as folhas.
+        :param executor: o pool que multiplica os nós de cada nível, ou None.
+        :return: os níveis da árvore; o primeiro são as folhas e o último, [produto de todas as folhas].
+        """
+        tree = [list(values)]
+        while len(tree[-1]) > 1:
+            level = tree[-1]
+            products = self.__map(executor, operator.mul, level[0::2], level[1::2])
+            if len(level) % 2:
+                products.append(level[-1])
+            tree.append(products)
+        return tree
+
+    def __remainder_tree(self, tree: List[List[int]], root: int, executor: Optional[Executor]) -> List[int]:
+        """
+        Desce a árvore de restos e calcula o mdc de cada folha.
+
+        :param tree: a árvore de produtos.
+        :param root: o resto da raiz, isto é, P mod (raiz)².
+        :param executor: o pool que reduz os nós de cada nível, ou None.
+        :return: para cada folha n_i, mdc(n_i, P / n_i).
+        """
+        remainders = [root]
+        for level in reversed(tree[:-1]):
+            parents = [remainders[i >> 1] for i in range(len(level))]
+            remainders = self.__map(executor, _reduce_square, parents, level)
+        return self.__map(executor, _leaf_gcd, remainders, tree[0])
+
+    def __map(self, executor: Optional[Executor], function, *iterables: Sequence[int]) -> List[int]:
+        """
+        Aplica uma função a cada nó de um nível, no próprio processo ou no pool.
+
+        :param executor: o pool, ou None.
+        :param function: a função, que precisa ser serializável.
+        :param iterables: os argumentos, nó a nó.
+        :return: os resultados, na ordem dos nós.
+        """
+        if executor is None or len(iterables[0]) < 2:
+            return list(map(function, *iterables))
+        chunksize = max(1, len(iterables[0]) // (4 * self.jobs))
+        return list(executor.map(function, *iterables, chunksize=chunksize))
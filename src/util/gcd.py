@@ -1,13 +1,17 @@
-from typing import List, Optional
+from typing import List, Tuple
 
 from attr import define, field
 
+from src.util.stats import STATS
+
 
 @define
 class ExtendedEuclideanAlgorithmStep:
     """
     Representa uma etapa no algoritmo euclidiano estendido.
 
+    A classe usa __slots__ (padrão de attrs.define), de modo que cada etapa registrada não carrega um __dict__.
+
     Atributos:
         quociente (int): o quociente obtido na etapa.
         restante (int): O restante obtido na etapa.
@@ -29,10 +33,13 @@ class ExtendedEuclideanAlgorithm:
     bem como os coeficientes s e t tais que a * s + b * t = gcd(a, b).
 
     Atributos:
-        __steps (List[ExtendedEuclideanAlgorithmStep]): lista de etapas executadas durante o algoritmo.
+        __steps (List[ExtendedEuclideanAlgorithmStep]): lista de etapas executadas durante o algoritmo. Sem o rastreamento,
+            contém apenas a etapa final.
 
     Métodos:
-        execute(a: int, b: int) -> ExtendedEuclideanAlgorithm: método estático que executa o algoritmo euclidiano estendido.
+        gcd(a: int, b: int) -> Tuple[int, int, int]: método estático que calcula (mdc, s, t) sem criar nenhum objeto.
+        execute(a: int, b: int, trace: bool = False) -> ExtendedEuclideanAlgorithm: método estático que executa o algoritmo euclidiano estendido.
+        batch_modular_inverse(values: List[int], modulus: int) -> List[int]: método estático que calcula vários inversos modulares com uma única inversão.
         are_coprime() -> bool: Verifica se os dois números (a e b) dados ao algoritmo são coprimos.
         modular_inverse(a: int, b: int) -> int: Calcula o inverso modular de um módulo b.
     """
@@ -50,10 +57,62 @@ class ExtendedEuclideanAlgorithm:
         return self.__steps
 
     @staticmethod
-    def execute(a: int, b: int) -> 'ExtendedEuclideanAlgorithm':
+    def gcd(a: int, b: int) -> Tuple[int, int, int]:
         """
+        Calcula o máximo divisor comum de 'a' e 'b' e os coeficientes de Bézout, sem registrar as etapas.
+
         :param a: Um inteiro que representa o valor de 'a' no algoritmo euclidiano estendido.
         :param b: Um número inteiro que representa o valor de 'b' no algoritmo euclidiano estendido.
+        :return: a tupla (mdc, s, t) tal que a * s + b * t = mdc.
+        """
+        if STATS.enabled:
+            return ExtendedEuclideanAlgorithm.__counted_gcd(a, b)
+
+        old_r, r = a, b
+        old_s, s = 1, 0
+        old_t, t = 0, 1
+
+        while r != 0:
+            quotient = old_r // r
+            old_r, r = r, old_r - quotient * r
+            old_s, s = s, old_s - quotient * s
+            old_t, t = t, old_t - quotient * t
+
+        return old_r, old_s, old_t
+
+    @staticmethod
+    def __counted_gcd(a: int, b: int) -> Tuple[int, int, int]:
+        """
+        Mesmo cálculo de 'gcd', contando as iterações. É usado apenas com as estatísticas habilitadas, de modo que o laço
+        de 'gcd' não paga pelo contador.
+
+        :param a: Um inteiro que representa o valor de 'a' no algoritmo euclidiano estendido.
+        :param b: Um número inteiro que representa o valor de 'b' no algoritmo euclidiano estendido.
+        :return: a tupla (mdc, s, t) tal que a * s + b * t = mdc.
+        """
+        old_r, r = a, b
+        old_s, s = 1, 0
+        old_t, t = 0, 1
+        iterations = 0
+
+        while r != 0:
+            quotient = old_r // r
+            old_r, r = r, old_r - quotient * r
+            old_s, s = s, old_s - quotient * s
+            old_t, t = t, old_t - quotient * t
+            iterations += 1
+
+        STATS.count('gcd.calls')
+        STATS.count('gcd.iterations', iterations)
+        return old_r, old_s, old_t
+
+    @staticmethod
+    def execute(a: int, b: int, trace: bool = False) -> 'ExtendedEuclideanAlgorithm':
+        """
+        :param a: Um inteiro que representa o valor de 'a' no algoritmo euclidiano estendido.
+        :param b: Um número inteiro que representa o valor de 'b' no algoritmo euclidiano estendido.
+        :param trace: se True, registra todas as etapas intermediárias. Caso contrário, apenas a etapa final é
+            registrada, sem criar um objeto por iteração.
         :return: Uma instância da classe 'ExtendedEuclideanAlgorithm'.
 
         Este método executa o algoritmo euclidiano estendido para encontrar o máximo divisor comum (MDC) de 'a' e 'b',
@@ -84,9 +143,16 @@ class ExtendedEuclideanAlgorithm:
         Observação: presume-se que a classe 'ExtendedEuclideanAlgorithmStep' seja definida em outro lugar e represente uma única etapa no
         algoritmo euclidiano estendido, com atributos para 'quociente', 'resto', 's' e 't'.
 
+        Sem o rastreamento, o passo 7 é omitido e o cálculo é delegado a 'gcd', de modo que apenas a etapa final é criada.
+
         Exemplo de uso:
             resultado = ExtendedEuclideanAlgorithm.execute(24, 18)
+            resultado = ExtendedEuclideanAlgorithm.execute(24, 18, trace=True)
         """
+        if not trace:
+            remainder, s, t = ExtendedEuclideanAlgorithm.gcd(a, b)
+            return ExtendedEuclideanAlgorithm([ExtendedEuclideanAlgorithmStep(0, remainder, s, t)])
+
         steps: List[ExtendedEuclideanAlgorithmStep] = []
 
         old_r, r = a, b
@@ -105,6 +171,8 @@ class ExtendedEuclideanAlgorithm:
             old_s, s = s, old_s - quotient * s
             old_t, t = t, old_t - quotient * t
 
+        STATS.count('gcd.calls')
+        STATS.count('gcd.iterations', len(steps))
         steps.append(ExtendedEuclideanAlgorithmStep(
             quotient=0,
             remainder=old_r,
@@ -135,4 +203,39 @@ class ExtendedEuclideanAlgorithm:
         last_step = self.steps[-1]
         if last_step.remainder != 1:
             raise ValueError(f"{a} and {b} are not coprime, so the modular inverse does not exist.")
-        return last_step.s % b
\ No newline at end of file
+        return last_step.s % b
+
+    @staticmethod
+    def batch_modular_inverse(values: List[int], modulus: int) -> List[int]:
+        """
+        Calcula o inverso modular de vários valores com o truque de Montgomery: uma única inversão e 3(k - 1)
+        multiplicações para k valores.
+
+        Os produtos acumulados v0, v0·v1, ..., v0·...·vk-1 são calculados, apenas o último é invertido e os inversos
+        individuais são recuperados percorrendo os produtos de trás para frente.
+
+        :param values: os valores cujos inversos modulares devem ser calculados.
+        :param modulus: O módulo.
+        :return: a lista com o inverso modular de cada valor, na mesma ordem.
+        :raises ValueError: Se algum valor não for coprimo com o módulo.
+        """
+        if not values:
+            return []
+
+        prefix: List[int] = []
+        accumulated = 1
+        for value in values:
+            accumulated = accumulated * value % modulus
+            prefix.append(accumulated)
+
+        remainder, s, _ = ExtendedEuclideanAlgorithm.gcd(accumulated, modulus)
+        if remainder != 1:
+            raise ValueError(f"Some value is not coprime with {modulus}, so the modular inverse does not exist.")
+        inverse = s % modulus
+
+        inverses = [0] * len(values)
+        for i in range(len(values) - 1, 0, -1):
+            inverses[i] = inverse * prefix[i - 1] % modulus
+            inverse = inverse * values[i] % modulus
+        inverses[0] = inverse
+        return inverses
@@ -0,0 +1,453 @@
+import array
+import hashlib
+import operator
+import os
+import random
+import struct
+import sys
+from itertools import compress, islice
+from math import gcd, isqrt, prod
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from attr import define, field
+
+from src.util.stats import STATS
+
+SIEVE_LIMIT = 8192
+# Tabelas de primos de intervalos: número máximo de termos da progressão, tamanho de cada segmento do crivo e limite dos
+# primos usados no crivo. Acima desse limite, os sobreviventes do crivo são confirmados pelo teste de Miller-Rabin.
+MAX_TABLE_TERMS = 1 << 24
+SEGMENT_SIZE = 1 << 18
+BASE_PRIME_LIMIT = 1 << 20
+# Sorteios por bit de 'stop' em intervalos sem tabela. A densidade de primos perto de N é cerca de 1/ln N ≈ 1/(0,69·bits),
+# então o limite só é atingido, em um intervalo com primos, com probabilidade desprezível (menor que e^-100).
+RANGE_ATTEMPTS_PER_BIT = 100
+TABLE_MAGIC = b'RSAP'
+TABLE_VERSION = 2
+# Número de índices da tabela, gravado após a progressão no cabeçalho (8 bytes, little-endian).
+TABLE_COUNT_FORMAT = '<Q'
+PRIME_CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'cryptography' / 'primes'
+WHEEL_PRIMES = (2, 3, 5, 7)
+DEFAULT_ROUNDS = 40
+# (tamanho mínimo em bits, rodadas): rodadas suficientes para erro < 2^-100 em candidatos aleatórios (FIPS 186-4, C.3)
+ROUNDS_BY_BITS = ((1536, 4), (1024, 5), (512, 8), (256, 15))
+# Fonte padrão dos candidatos e das bases de Miller-Rabin: a entropia do sistema operacional. O Mersenne Twister do
+# módulo random é previsível a partir das suas saídas, o que revelaria os primos das chaves.
+SYSTEM_RANDOM = random.SystemRandom()
+
+
+def _sieve(limit: int) -> Tuple[int, ...]:
+    """
+    Crivo de Eratóstenes simples.
+
+    :param limit: o limite superior (exclusivo) do crivo.
+    :return: Uma tupla com todos os números primos menores que 'limit'.
+    """
+    is_prime = bytearray([1]) * limit
+    is_prime[0:2] = b'\x00\x00'
+    for i in range(2, isqrt(limit - 1) + 1):
+        if is_prime[i]:
+            is_prime[i * i::i] = bytes(len(range(i * i, limit, i)))
+    return tuple(i for i in range(limit) if is_prime[i])
+
+
+SMALL_PRIMES = _sieve(SIEVE_LIMIT)
+SMALL_PRIMES_SET = frozenset(SMALL_PRIMES)
+SMALL_PRIMES_PRODUCT = prod(SMALL_PRIMES)
+WHEEL_MODULUS = prod(WHEEL_PRIMES)
+WHEEL_RESIDUES = tuple(r for r in range(WHEEL_MODULUS) if gcd(r, WHEEL_MODULUS) == 1)
+
+
+@define
+class PrimeGenerator:
+    """
+    Classe que gera e testa números primos.
+
+    Os candidatos são alinhados a uma roda de resíduos módulo 2·3·5·7, filtrados pelo crivo de primos pequenos
+    (um único mdc com o produto desses primos) e, por fim, submetidos ao teste probabilístico de Miller-Rabin.
+
+    Atributos:
+        rounds (Optional[int]): o número de rodadas do teste de Miller-Rabin. A probabilidade de um composto passar é no
+            máximo 4^-rounds. Se None, o número de rodadas é escolhido pelo tamanho do candidato (ver ROUNDS_BY_BITS).
+        rng (Optional[random.Random]): o gerador de números aleatórios. Se None, é usado SYSTEM_RANDOM. Um gerador com
+            semente só deve ser informado quando a reprodutibilidade importa mais que o sigilo, como nos benchmarks.
+
+    Propriedades:
+        source (random.Random): o gerador efetivamente usado.
+
+    Métodos:
+        rounds_for(n: int) -> int: Retorna o número de rodadas de Miller-Rabin usado para testar n.
+        is_prime(n: int) -> bool: Verifica se um número é (provavelmente) primo.
+        random_prime(bits: int) -> int: Gera um número primo aleatório com exatamente 'bits' bits.
+        random_prime_in_range(start: int, stop: int, step: int = 1) -> int: Escolhe um número primo aleatório dentro de um intervalo.
+    """
+    rounds: Optional[int] = field(default=None)
+    rng: Optional[random.Random] = field(default=None)
+
+    @rounds.validator
+    def _check_rounds(self, attribute, value):
+        if value is not None and value < 1:
+            raise ValueError(f"O número de rodadas deve ser positivo, recebido {value}.")
+
+    @property
+    def source(self) -> random.Random:
+        """
+        Retorna o gerador de números aleatórios usado. O SYSTEM_RANDOM padrão não é guardado no objeto, pois ele não pode
+        ser serializado para os processos de um pool.
+
+        :return: 'rng', se informado, ou SYSTEM_RANDOM.
+        """
+        return SYSTEM_RANDOM if self.rng is None else self.rng
+
+    def rounds_for(self, n: int) -> int:
+        """
+        Retorna o número de rodadas de Miller-Rabin usado para testar n.
+
+        :param n: o candidato a ser testado.
+        :return: 'rounds', se configurado, ou o valor da tabela ROUNDS_BY_BITS para o tamanho de n.
+        """
+        if self.rounds is not None:
+            return self.rounds
+        bits = n.bit_length()
+        for min_bits, rounds in ROUNDS_BY_BITS:
+            if bits >= min_bits:
+                return rounds
+        return DEFAULT_ROUNDS
+
+    def is_prime(self, n: int) -> bool:
+        """
+        Verifica se um número é primo.
+
+        Números menores que o limite do crivo são consultados diretamente na tabela de primos pequenos. Os demais passam
+        pelo filtro do crivo e pelo teste de Miller-Rabin.
+
+        :param n: O número a ser verificado.
+        :return: True se o número for (provavelmente) primo, False caso contrário.
+        """
+        STATS.count('primality.tests')
+        if n < SIEVE_LIMIT:
+            return n in SMALL_PRIMES_SET
+        if gcd(n, SMALL_PRIMES_PRODUCT) != 1:
+            STATS.count('primality.sieve_rejections')
+            return False
+        return self.__miller_rabin(n)
+
+    def __miller_rabin(self, n: int) -> bool:
+        """
+        Executa o teste de Miller-Rabin com bases aleatórias, em 'rounds_for(n)' rodadas.
+
+        :param n: um número ímpar maior que o limite do crivo.
+        :return: False se alguma base testemunhar que n é composto, True caso contrário.
+        """
+        d, s = n - 1, 0
+        while d % 2 == 0:
+            d //= 2
+            s += 1
+
+        source = self.source
+        for _ in range(self.rounds_for(n)):
+            STATS.count('primality.miller_rabin_rounds')
+            x = pow(source.randrange(2, n - 1), d, n)
+            if x == 1 or x == n - 1:
+                continue
+            for _ in range(s - 1):
+                x = pow(x, 2, n)
+                if x == n - 1:
+                    break
+            else:
+                return False
+        return True
+
+    def random_prime(self, bits: int) -> int:
+        """
+        Gera um número primo aleatório com exatamente 'bits' bits.
+
+        Os dois bits mais significativos são sempre ligados, de modo que o produto de dois primos de 'bits' bits tenha
+        exatamente 2·bits bits.
+
+        :param bits: o tamanho, em bits, do primo gerado. Deve ser no mínimo 2.
+        :return: Um número primo de exatamente 'bits' bits.
+        """
+        if bits < 2:
+            raise ValueError(f"Não existem primos com {bits} bits.")
+        if 1 << bits <= SIEVE_LIMIT:
+            candidates: List[int] = [p for p in SMALL_PRIMES if p >> (bits - 2) == 0b11]
+            return self.source.choice(candidates)
+
+        source = self.source
+        top = 0b11 << (bits - 2)
+        while True:
+            STATS.count('keygen.candidates')
+            candidate = source.getrandbits(bits) | top
+            candidate += source.choice(WHEEL_RESIDUES) - candidate % WHEEL_MODULUS
+            if candidate >> (bits - 2) != 0b11:
+                continue
+            if self.is_prime(candidate):
+                return candidate
+
+    def random_prime_in_range(self, start: int, stop: int, step: int = 1) -> int:
+        """
+        Escolhe um número primo aleatório do intervalo informado.
+
+        Se o intervalo couber em uma tabela de primos (ver PrimeTableCache), a escolha é uniforme e feita em O(1). Caso
+        contrário, números aleatórios do intervalo são sorteados até que um deles seja primo, em no máximo
+        RANGE_ATTEMPTS_PER_BIT sorteios por bit de 'stop'. Se mdc(start, step) > 1, todos os termos são múltiplos desse
+        mdc, e o único primo possível é o próprio mdc, que é verificado diretamente.
+
+        :param start: início do intervalo.
+        :param stop: fim do intervalo (exclusivo).
+        :param step: passo do intervalo.
+        :return: Um número primo pertencente a range(start, stop, step).
+        :raises ValueError: se o passo for zero, se o intervalo não contiver primos ou se nenhum primo for sorteado
+            dentro do limite de tentativas.
+        """
+        table = PRIME_TABLES.get(start, stop, step, self)
+        if table is not None:
+            if not table:
+                raise ValueError(f"Não há números primos em range({start}, {stop}, {step}).")
+            return table.choice(self.source)
+
+        divisor = gcd(start, step)
+        if divisor > 1:
+            if divisor in range(start, stop, step) and self.is_prime(divisor):
+                return divisor
+            raise ValueError(f"Não há números primos em range({start}, {stop}, {step}).")
+
+        attempts = RANGE_ATTEMPTS_PER_BIT * max(abs(start), abs(stop)).bit_length()
+        for _ in range(attempts):
+            STATS.count('keygen.candidates')
+            n = self.source.randrange(start, stop, step)
+            if self.is_prime(n):
+                return n
+        raise ValueError(f"Nenhum número primo encontrado em range({start}, {stop}, {step}) após {attempts} tentativas.")
+
+
+@define
+class PrimeTable:
+    """
+    Classe que guarda os números primos de uma progressão aritmética.
+
+    Os primos são guardados como índices na progressão, o que mantém a tabela compacta (4 bytes por primo) mesmo para
+    números grandes: o primo de índice i na tabela é start + offsets[i] · step.
+
+    Atributos:
+        start (int): o primeiro termo da progressão, já em ordem crescente.
+        step (int): a razão da progressão, positiva.
+        offsets (array.array): os índices dos termos primos, em ordem crescente.
+
+    Métodos:
+        choice(rng: Optional[random.Random] = None) -> int: Escolhe um primo da tabela com probabilidade uniforme.
+    """
+    start: int
+    step: int
+    offsets: array.array
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> int:
+        return self.start + self.offsets[index] * self.step
+
+    def choice(self, rng: Optional[random.Random] = None) -> int:
+        """
+        Escolhe um primo da tabela com probabilidade uniforme, em O(1).
+
+        :param rng: o gerador de números aleatórios. O padrão é SYSTEM_RANDOM.
+        :return: um número primo.
+        :raises IndexError: se a tabela estiver vazia.
+        """
+        return self[(SYSTEM_RANDOM if rng is None else rng).randrange(len(self.offsets))]
+
+
+@define
+class PrimeTableCache:
+    """
+    Classe que monta as tabelas de primos de intervalos e as memoiza, em memória e em disco.
+
+    A tabela de range(start, stop, step) é montada por um crivo segmentado sobre os índices da progressão: para cada
+    primo p do crivo, os termos divisíveis por p formam outra progressão de índices, de razão p, que é riscada por
+    fatiamento. Os intervalos com mais de MAX_TABLE_TERMS termos não têm tabela, e a geração volta a sortear candidatos.
+
+    Em disco, cada tabela fica em um arquivo cujo nome é o SHA-256 do intervalo: TABLE_MAGIC, um byte de versão, a
+    progressão ('início:fim:passo' e uma quebra de linha), o número de índices e os índices de um array('I'),
+    little-endian. Falhas ao gravar o arquivo são ignoradas, pois ele é apenas um atalho; um arquivo de outra versão ou
+    progressão, truncado ou com índices fora da progressão é descartado, e a tabela é montada de novo.
+
+    Atributos:
+        directory (Optional[Path]): o diretório das tabelas em disco, ou None para usar apenas a memória.
+        __tables (Dict[Tuple[int, int, int], Optional[PrimeTable]]): as tabelas já obtidas, por intervalo.
+
+    Métodos:
+        get(start: int, stop: int, step: int = 1, generator: Optional[PrimeGenerator] = None) -> Optional[PrimeTable]: Retorna a tabela de primos de um intervalo.
+        clear() -> None: Descarta as tabelas memorizadas (os arquivos em disco são mantidos).
+    """
+    directory: Optional[Path] = PRIME_CACHE_DIR
+    __tables: Dict[Tuple[int, int, int], Optional[PrimeTable]] = field(init=False, factory=dict)
+
+    def get(self, start: int, stop: int, step: int = 1,
+            generator: Optional[PrimeGenerator] = None) -> Optional[PrimeTable]:
+        """
+        Retorna a tabela dos primos de range(start, stop, step), montando-a se ela não estiver em memória nem em disco.
+
+        :param start: início do intervalo.
+        :param stop: fim do intervalo (exclusivo).
+        :param step: passo do intervalo. Pode ser negativo, como em range.
+        :param generator: o gerador usado para confirmar os sobreviventes do crivo quando os termos passam de
+            BASE_PRIME_LIMIT². O padrão é PrimeGenerator().
+        :return: a tabela, ou None se o intervalo tiver mais de MAX_TABLE_TERMS termos.
+        :raises ValueError: se o passo for zero.
+        """
+        if step == 0:
+            raise ValueError("O passo do intervalo não pode ser zero.")
+        key = (start, stop, step)
+        if key in self.__tables:
+            return self.__tables[key]
+
+        terms = range(start, stop, step)
+        if step < 0:
+            terms = terms[::-1]
+        # Os termos menores que 2 nunca são primos.
+        terms = terms[len(range(terms.start, 2, terms.step)):]
+        # len() não aceita intervalos com mais de sys.maxsize termos; a fatia testa o tamanho sem esse limite.
+        if terms[MAX_TABLE_TERMS:]:
+            table = None
+        else:
+            table = self.__read(terms)
+            if table is None:
+                with STATS.phase('primes.sieve'):
+                    table = PrimeTable(terms.start, terms.step, self.__sieve(terms, generator or PrimeGenerator()))
+                self.__write(terms, table)
+        self.__tables[key] = table
+        return table
+
+    def clear(self):
+        """
+        Descarta as tabelas memorizadas. Os arquivos em disco são mantidos.
+
+        :return: None
+        """
+        self.__tables.clear()
+
+    @staticmethod
+    def __sieve(terms: range, generator: PrimeGenerator) -> array.array:
+        """
+        Crivo segmentado sobre os índices de uma progressão crescente de termos maiores ou iguais a 2.
+
+        :param terms: a progressão.
+        :param generator: o gerador usado para confirmar os sobreviventes quando o crivo não chega à raiz do último
+            termo.
+        :return: os índices dos termos primos, em ordem crescente.
+        """
+        offsets = array.array('I')
+        if not terms:
+            return offsets
+
+        first, step, count = terms.start, terms.step, len(terms)
+        root = isqrt(terms[-1])
+        limit = min(root, BASE_PRIME_LIMIT)
+        base = SMALL_PRIMES if limit < SIEVE_LIMIT else _sieve(limit + 1)
+
+        # Para cada primo p do crivo: o primeiro índice riscado e a distância entre os índices riscados.
+        strikes: List[Tuple[int, int]] = []
+        for p in base:
+            if p > limit:
+                break
+            if step % p == 0:
+                # Todos os termos são congruentes a 'first' módulo p.
+                if first % p == 0:
+                    strikes.append((1 if first == p else 0, 1))
+                continue
+            index = -first * pow(step, -1, p) % p
+            # O próprio p não deve ser riscado.
+            strikes.append((index + p if first + index * step == p else index, p))
+
+        for low in range(0, count, SEGMENT_SIZE):
+            high = min(low + SEGMENT_SIZE, count)
+            segment = bytearray([1]) * (high - low)
+            for index, stride in strikes:
+                if index < low:
+                    index += (low - index + stride - 1) // stride * stride
+                if index < high:
+                    segment[index - low::stride] = bytes(len(range(index - low, high - low, stride)))
+            survivors = compress(range(low, high), segment)
+            if limit < root:
+                survivors = (i for i in survivors if generator.is_prime(first + i * step))
+            offsets.extend(survivors)
+        return offsets
+
+    def __path(self, terms: range) -> Path:
+        """
+        :param terms: a progressão, já normalizada.
+        :return: o caminho do arquivo da tabela da progressão.
+        """
+        name = hashlib.sha256(f"{terms.start}:{terms.stop}:{terms.step}".encode()).hexdigest()
+        return self.directory / f"{name}.bin"
+
+    @staticmethod
+    def __header(terms: range) -> bytes:
+        """
+        :param terms: a progressão, já normalizada.
+        :return: o início do cabeçalho do arquivo da tabela da progressão, até o número de índices.
+        """
+        return TABLE_MAGIC + bytes([TABLE_VERSION]) + f"{terms.start}:{terms.stop}:{terms.step}\n".encode()
+
+    def __read(self, terms: range) -> Optional[PrimeTable]:
+        """
+        Lê a tabela da progressão do disco.
+
+        :param terms: a progressão, já normalizada.
+        :return: a tabela, ou None se ela não estiver em disco ou o arquivo for inválido: de outra versão ou de outra
+            progressão, com um tamanho que não corresponde ao número de índices, ou com índices que não são
+            estritamente crescentes e menores que o número de termos.
+        """
+        if self.directory is None:
+            return None
+        try:
+            data = self.__path(terms).read_bytes()
+        except OSError:
+            return None
+        header = PrimeTableCache.__header(terms)
+        body = len(header) + struct.calcsize(TABLE_COUNT_FORMAT)
+        offsets = array.array('I')
+        if data[:len(header)] != header or len(data) < body:
+            return None
+        count, = struct.unpack_from(TABLE_COUNT_FORMAT, data, len(header))
+        if len(data) - body != count * offsets.itemsize:
+            return None
+
+        offsets.frombytes(data[body:])
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+        if offsets and (offsets[-1] >= len(terms) or not all(map(operator.lt, offsets, islice(offsets, 1, None)))):
+            return None
+        STATS.count('primes.table_loads')
+        return PrimeTable(terms.start, terms.step, offsets)
+
+    def __write(self, terms: range, table: PrimeTable):
+        """
+        Grava a tabela da progressão em disco, por meio de um arquivo temporário, de modo que processos concorrentes
+        nunca leiam um arquivo incompleto.
+
+        :param terms: a progressão, já normalizada.
+        :param table: a tabela.
+        :return: None
+        """
+        if self.directory is None:
+            return
+        offsets = table.offsets
+        if sys.byteorder == 'big':
+            offsets = array.array('I', offsets)
+            offsets.byteswap()
+        path = self.__path(terms)
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temporary.write_bytes(PrimeTableCache.__header(terms) + struct.pack(TABLE_COUNT_FORMAT, len(offsets))
+                                  + offsets.tobytes())
+            os.replace(temporary, path)
+        except OSError:
+            temporary.unlink(missing_ok=True)
+
+
+PRIME_TABLES = PrimeTableCache()
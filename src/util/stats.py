@@ -0,0 +1,110 @@
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Dict, Iterator
+
+from attr import define, field
+
+STATS_FORMATS = ('text', 'json')
+
+
+@define
+class Stats:
+    """
+    Classe que coleta contadores e tempos dos trechos críticos.
+
+    Enquanto desabilitada, cada chamada se resume a um teste de 'enabled', de modo que a instrumentação pode ficar nos
+    caminhos críticos. Os contadores são incrementados uma vez por operação (por exemplo, por candidato a primo ou por
+    chamada do algoritmo euclidiano), nunca a cada iteração dos laços aritméticos. Processos de um pool têm a sua própria
+    instância, cujos valores não são somados aos do processo principal.
+
+    Atributos:
+        enabled (bool): se a coleta está habilitada.
+        __counters (Counter): os contadores, por nome.
+        __timings (Counter): o tempo acumulado de cada fase, em segundos, por nome.
+
+    Métodos:
+        count(name: str, amount: int = 1) -> None: Incrementa um contador.
+        phase(name: str) -> ContextManager: Mede o tempo de um bloco e o acumula na fase informada.
+        as_dict() -> Dict[str, Any]: Retorna os contadores e os tempos.
+        report(stats_format: str = 'text') -> str: Formata os contadores e os tempos.
+        reset() -> None: Zera os contadores e os tempos.
+    """
+    enabled: bool = False
+    __counters: Counter = field(init=False, factory=Counter)
+    __timings: Counter = field(init=False, factory=Counter)
+
+    def count(self, name: str, amount: int = 1):
+        """
+        Incrementa um contador, se a coleta estiver habilitada.
+
+        :param name: o nome do contador, por exemplo, 'gcd.iterations'.
+        :param amount: o valor a ser somado.
+        :return: None
+        """
+        if self.enabled:
+            self.__counters[name] += amount
+
+    def phase(self, name: str) -> ContextManager:
+        """
+        Mede o tempo de um bloco e o acumula na fase informada, se a coleta estiver habilitada.
+
+        Exemplo de uso:
+            with STATS.phase('keygen'):
+                ...
+
+        :param name: o nome da fase.
+        :return: um gerenciador de contexto.
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self.__timer(name)
+
+    @contextmanager
+    def __timer(self, name: str) -> Iterator[None]:
+        """
+        Gerenciador de contexto que acumula o tempo decorrido na fase informada.
+
+        :param name: o nome da fase.
+        :return: None
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.__timings[name] += time.perf_counter() - started
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Retorna os contadores e os tempos.
+
+        :return: um dicionário com as chaves 'counters' e 'timings' (em segundos).
+        """
+        return {'counters': dict(sorted(self.__counters.items())), 'timings': dict(sorted(self.__timings.items()))}
+
+    def report(self, stats_format: str = 'text') -> str:
+        """
+        Formata os contadores e os tempos.
+
+        :param stats_format: 'text', uma linha por valor, ou 'json'.
+        :return: o relatório.
+        """
+        data = self.as_dict()
+        if stats_format == 'json':
+            return json.dumps(data)
+        lines = [f"{name}: {value}" for name, value in data['counters'].items()]
+        lines += [f"{name}: {value * 1000:.3f} ms" for name, value in data['timings'].items()]
+        return '\n'.join(lines)
+
+    def reset(self):
+        """
+        Zera os contadores e os tempos.
+
+        :return: None
+        """
+        self.__counters.clear()
+        self.__timings.clear()
+
+
+STATS = Stats()
@@ -0,0 +1,141 @@
+import struct
+import time
+from itertools import islice
+from typing import IO, AnyStr, Callable, Iterable, Iterator, List, TypeVar
+
+from attr import define, field
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+# Prefixo de cada mensagem no enquadramento por tamanho: o tamanho da mensagem em 4 bytes, big-endian.
+LENGTH_PREFIX = struct.Struct('>I')
+# Número de mensagens processadas juntas pelo comando batch.
+DEFAULT_GROUP_SIZE = 256
+
+T = TypeVar('T')
+
+
+def read_chunks(source: IO[AnyStr], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[AnyStr]:
+    """
+    Lê um arquivo em pedaços de tamanho fixo, sem carregá-lo inteiro na memória.
+
+    :param source: o arquivo aberto, em modo texto ou binário.
+    :param chunk_size: o tamanho de cada pedaço (bytes no modo binário, caracteres no modo texto).
+    :return: um gerador dos pedaços lidos, até o fim do arquivo.
+    """
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_lines(source: IO[bytes]) -> Iterator[bytes]:
+    """
+    Lê as mensagens de um arquivo binário com uma mensagem por linha.
+
+    :param source: o arquivo aberto em modo binário.
+    :return: um gerador das mensagens, sem a quebra de linha final (b'\\n' ou b'\\r\\n').
+    """
+    for line in source:
+        if line.endswith(b'\n'):
+            line = line[:-2] if line.endswith(b'\r\n') else line[:-1]
+        yield line
+
+
+def read_length_prefixed(source: IO[bytes]) -> Iterator[bytes]:
+    """
+    Lê as mensagens de um arquivo binário em que cada mensagem é precedida pelo seu tamanho (ver LENGTH_PREFIX).
+
+    :param source: o arquivo aberto em modo binário.
+    :return: um gerador das mensagens.
+    :raises ValueError: se o arquivo terminar no meio de uma mensagem.
+    """
+    while True:
+        prefix = source.read(LENGTH_PREFIX.size)
+        if not prefix:
+            return
+        if len(prefix) < LENGTH_PREFIX.size:
+            raise ValueError("Prefixo de tamanho truncado.")
+        (size,) = LENGTH_PREFIX.unpack(prefix)
+        message = source.read(size)
+        if len(message) < size:
+            raise ValueError(f"Mensagem truncada: esperados {size} bytes, lidos {len(message)}.")
+        yield message
+
+
+def read_groups(items: Iterable[T], size: int = DEFAULT_GROUP_SIZE) -> Iterator[List[T]]:
+    """
+    Agrupa uma sequência em listas de até 'size' itens, sem ler a sequência inteira.
+
+    :param items: os itens, por exemplo, as mensagens de read_lines.
+    :param size: o número máximo de itens por grupo.
+    :return: um gerador dos grupos, na ordem dos itens. Só o último pode ter menos de 'size' itens.
+    """
+    iterator = iter(items)
+    while True:
+        group = list(islice(iterator, size))
+        if not group:
+            return
+        yield group
+
+
+def write_length_prefixed(sink: IO[bytes], message: bytes):
+    """
+    Escreve uma mensagem precedida pelo seu tamanho (ver LENGTH_PREFIX).
+
+    :param sink: o arquivo aberto em modo binário.
+    :param message: a mensagem.
+    :return: None
+    """
+    sink.write(LENGTH_PREFIX.pack(len(message)))
+    sink.write(message)
+
+
+@define
+class ThroughputMeter:
+    """
+    Classe que mede a vazão de um fluxo de dados e a reporta periodicamente.
+
+    Atributos:
+        report (Callable[[str], None]): função que recebe a linha de progresso, por exemplo, click.echo para stderr.
+        interval (float): o intervalo mínimo, em segundos, entre dois relatórios.
+        __processed (int): a quantidade de dados processada até o momento.
+        __started (float): o instante em que a medição começou.
+        __reported (float): o instante do último relatório.
+
+    Métodos:
+        track(chunks: Iterable[AnyStr]) -> Iterator[AnyStr]: Repassa os pedaços, contabilizando o tamanho de cada um.
+        summary() -> str: Retorna a linha de progresso com o total processado e a vazão média.
+    """
+    report: Callable[[str], None]
+    interval: float = 0.5
+    __processed: int = field(init=False, default=0)
+    __started: float = field(init=False, factory=time.perf_counter)
+    __reported: float = field(init=False, default=0.0)
+
+    def track(self, chunks: Iterable[AnyStr]) -> Iterator[AnyStr]:
+        """
+        Repassa os pedaços sem modificá-los, contabilizando o tamanho de cada um e reportando o progresso a cada
+        'interval' segundos. Ao fim do fluxo, um último relatório é sempre emitido.
+
+        :param chunks: os pedaços a serem medidos.
+        :return: um gerador dos mesmos pedaços.
+        """
+        for chunk in chunks:
+            self.__processed += len(chunk)
+            now = time.perf_counter()
+            if now - self.__reported >= self.interval:
+                self.__reported = now
+                self.report(self.summary())
+            yield chunk
+        self.report(self.summary())
+
+    def summary(self) -> str:
+        """
+        Retorna a linha de progresso com o total processado e a vazão média.
+
+        :return: uma linha como '12.00 MiB processados (48.00 MiB/s)'.
+        """
+        elapsed = max(time.perf_counter() - self.__started, 1e-9)
+        mebibytes = self.__processed / (1 << 20)
+        return f"{mebibytes:.2f} MiB processados ({mebibytes / elapsed:.2f} MiB/s)"
@@ -0,0 +1,100 @@
+import importlib.util
+from functools import lru_cache
+from typing import List, Sequence
+
+# Módulos abaixo deste limite têm n² < 2^64, de modo que os produtos da exponenciação cabem em uint64.
+VECTOR_MODULUS_LIMIT = 1 << 32
+# Abaixo deste número de valores, o custo fixo de montar os arrays supera o das chamadas a pow.
+VECTOR_MIN_ITEMS = 64
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """
+    Importa o NumPy sob demanda. Ele é opcional, e importá-lo no topo do módulo atrasaria todos os comandos.
+
+    :return: o módulo numpy, ou None se ele não estiver instalado.
+    """
+    if importlib.util.find_spec('numpy') is None:
+        return None
+    import numpy
+    return numpy
+
+
+def vectorizable(n: int, items: int) -> bool:
+    """
+    Verifica se a exponenciação de 'items' valores módulo n deve usar o caminho vetorizado.
+
+    :param n: o módulo.
+    :param items: o número de valores.
+    :return: True se n² couber em 64 bits, se houver valores suficientes e se o NumPy estiver instalado.
+    """
+    return n < VECTOR_MODULUS_LIMIT and items >= VECTOR_MIN_ITEMS and _numpy() is not None
+
+
+def power_array(values, exponent: int, n: int):
+    """
+    Eleva cada elemento de um array a 'exponent' módulo n, por quadrados e multiplicações sucessivos aplicados ao array
+    inteiro de uma vez. O número de operações depende apenas do tamanho do expoente, não do número de valores.
+
+    :param values: um numpy.ndarray de uint64.
+    :param exponent: o expoente, não negativo.
+    :param n: o módulo, menor que VECTOR_MODULUS_LIMIT.
+    :return: um numpy.ndarray de uint64 com values^exponent mod n.
+    """
+    numpy = _numpy()
+    modulus = numpy.uint64(n)
+    base = values % modulus
+    result = numpy.full_like(base, 1 % n)
+    while exponent:
+        if exponent & 1:
+            numpy.multiply(result, base, out=result)
+            numpy.remainder(result, modulus, out=result)
+        exponent >>= 1
+        if exponent:
+            numpy.multiply(base, base, out=base)
+            numpy.remainder(base, modulus, out=base)
+    return result
+
+
+def power_many(values: Sequence[int], exponent: int, n: int) -> List[int]:
+    """
+    Versão vetorizada de [pow(value, exponent, n) for value in values].
+
+    :param values: os valores, não negativos e menores que 2^64.
+    :param exponent: o expoente, não negativo.
+    :param n: o módulo, menor que VECTOR_MODULUS_LIMIT.
+    :return: os resultados, na ordem dos valores.
+    """
+    numpy = _numpy()
+    return power_array(numpy.array(values, dtype=numpy.uint64), exponent, n).tolist()
+
+
+def power_blocks(data: bytes, input_size: int, output_size: int, exponent: int, n: int) -> bytes:
+    """
+    Versão vetorizada do modo em blocos: interpreta cada bloco de 'input_size' bytes como um inteiro big-endian, eleva-o
+    a 'exponent' módulo n e escreve o resultado com 'output_size' bytes.
+
+    :param data: os blocos de entrada, concatenados (bytes ou memoryview).
+    :param input_size: o tamanho de cada bloco de entrada, no máximo 8 bytes.
+    :param output_size: o tamanho de cada bloco de saída.
+    :param exponent: o expoente.
+    :param n: o módulo, menor que VECTOR_MODULUS_LIMIT.
+    :return: os blocos de saída, concatenados.
+    :raises OverflowError: se algum resultado não couber em 'output_size' bytes.
+    """
+    numpy = _numpy()
+    blocks = numpy.frombuffer(data, dtype=numpy.uint8).reshape(-1, input_size).astype(numpy.uint64)
+    values = numpy.zeros(len(blocks), dtype=numpy.uint64)
+    for column in range(input_size):
+        values <<= numpy.uint64(8)
+        values |= blocks[:, column]
+
+    results = power_array(values, exponent, n)
+    if output_size < 8 and (results >> numpy.uint64(8 * output_size)).any():
+        raise OverflowError("int too big to convert")
+
+    output = numpy.empty((len(results), output_size), dtype=numpy.uint8)
+    for column in range(output_size):
+        output[:, output_size - 1 - column] = results >> numpy.uint64(8 * column)
+    return output.tobytes()
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+from src.cryptography.audit import LEGACY_ROLE, KeyAudit
+
+
+def test_reused_modulus_is_reported():
+    """
+    Dois pares com o mesmo módulo devem ser relatados, mesmo sem fatores compartilhados com outros módulos.
+    """
+    keys = [(Path('pub_0'), 2773, 'public'), (Path('priv_0'), 2773, 'private'),
+            (Path('pub_1'), 3233, 'public'), (Path('priv_1'), 3233, 'private'),
+            (Path('pub_2'), 2773, 'public'), (Path('priv_2'), 2773, 'private')]
+    auditor = KeyAudit()
+    findings = auditor.audit(keys)
+    assert (auditor.keys, auditor.moduli) == (6, 2)
+    assert len(findings) == 1
+    assert findings[0].reused and findings[0].n == 2773 and not findings[0].factored
+    assert findings[0].paths == (Path('pub_0'), Path('priv_0'), Path('pub_2'), Path('priv_2'))
+
+
+def test_single_pair_is_not_reused():
+    """
+    As chaves pública e privada de um mesmo par, inclusive no formato legado e com o mesmo arquivo informado duas
+    vezes, não são um módulo repetido.
+    """
+    keys = [(Path('pub_0'), 2773, 'public'), (Path('priv_0'), 2773, 'private'), (Path('pub_0'), 2773, 'public'),
+            (Path('legacy_pub'), 3233, LEGACY_ROLE), (Path('legacy_priv'), 3233, LEGACY_ROLE)]
+    assert KeyAudit().audit(keys) == []
+
+
+def test_shared_factor_is_reported():
+    """
+    Módulos que compartilham um primo devem ser relatados com o fator e os parceiros.
+    """
+    keys = [(Path('a'), 47 * 59, 'public'), (Path('b'), 47 * 61, 'public'), (Path('c'), 53 * 67, 'public')]
+    findings = KeyAudit().audit(keys)
+    assert [(finding.paths, finding.factor, finding.partners) for finding in findings] == [
+        ((Path('a'),), 47, (Path('b'),)), ((Path('b'),), 47, (Path('a'),))]
+    assert not any(finding.reused for finding in findings)
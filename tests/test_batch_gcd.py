@@ -0,0 +1,86 @@
+import random
+from math import gcd, prod
+
+import pytest
+
+from src.util.batch_gcd import DIVISION_LIMIT, BatchGCD, remainder
+from src.util.prime import PrimeGenerator
+
+# Tamanhos de divisor em torno de DIVISION_LIMIT, com número de bits ímpar e par, e os seus múltiplos (a recursão de
+# _divide_2n_by_n alinha os divisores de tamanho ímpar acrescentando um bit).
+DIVISOR_BITS = sorted({DIVISION_LIMIT + delta for delta in range(-2, 4)}
+                      | {2 * DIVISION_LIMIT + delta for delta in (-1, 0, 1)}
+                      | {4 * DIVISION_LIMIT + 3})
+
+
+@pytest.mark.parametrize('bits', DIVISOR_BITS)
+def test_remainder_matches_modulo(bits):
+    """
+    O resto de Burnikel e Ziegler deve coincidir com o operador % para divisores aleatórios e extremos (todos os bits
+    ligados, apenas o bit mais significativo ligado), com dividendos de vários tamanhos.
+    """
+    rng = random.Random(bits)
+    divisors = [rng.getrandbits(bits) | 1 << (bits - 1), (1 << bits) - 1, 1 << (bits - 1)]
+    for b in divisors:
+        dividends = [0, 1, b - 1, b, b + 1, b * b - 1, b * b, (b << bits) - 1, b << (3 * bits + 5)]
+        dividends += [rng.getrandbits(size) for size in (bits // 2, bits, 2 * bits - 1, 2 * bits, 5 * bits + 3)]
+        for a in dividends:
+            assert remainder(a, b) == a % b
+
+
+def _naive(moduli):
+    """
+    :param moduli: os módulos.
+    :return: para cada módulo n_i, mdc(n_i, P // n_i), calculado diretamente.
+    """
+    total = prod(moduli)
+    return [gcd(n, total // n) for n in moduli]
+
+
+@pytest.fixture(scope='module')
+def moduli():
+    """
+    Módulos RSA de 128 bits, alguns com fatores compartilhados: um primo repetido entre dois módulos e um módulo cujos
+    dois fatores aparecem em outros módulos.
+    """
+    generator = PrimeGenerator(rng=random.Random(17))
+    primes = [generator.random_prime(64) for _ in range(40)]
+    values = [primes[2 * i] * primes[2 * i + 1] for i in range(20)]
+    values += [primes[0] * primes[3], primes[5] * primes[7], primes[10] * primes[39]]
+    return values
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1000])
+def test_batch_gcd_matches_naive(moduli, chunk_size):
+    """
+    O mdc em lote deve coincidir com o cálculo direto, com grupos de um módulo, grupos que não dividem o total de
+    módulos e um único grupo maior que a lista.
+    """
+    expected = _naive(moduli)
+    assert any(factor != 1 for factor in expected)
+    assert BatchGCD(chunk_size=chunk_size).run(moduli) == expected
+
+
+def test_batch_gcd_with_process_pool(moduli):
+    """
+    O resultado com o pool de processos deve ser o mesmo do cálculo no próprio processo.
+    """
+    assert BatchGCD(jobs=2, chunk_size=7).run(moduli) == _naive(moduli)
+
+
+def test_batch_gcd_large_moduli():
+    """
+    Com módulos acima de DIVISION_LIMIT bits, a árvore de restos passa pela divisão recursiva.
+    """
+    rng = random.Random(3)
+    moduli = [rng.getrandbits(DIVISION_LIMIT // 2) | 1 for _ in range(9)]
+    moduli[4] = moduli[1] * 3
+    assert BatchGCD(chunk_size=4).run(moduli) == _naive(moduli)
+
+
+def test_batch_gcd_rejects_empty_chunks():
+    """
+    O tamanho dos grupos deve ser positivo.
+    """
+    with pytest.raises(ValueError):
+        BatchGCD(chunk_size=0)
@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from src.util.prime import BASE_PRIME_LIMIT, SYSTEM_RANDOM, TABLE_VERSION, PrimeGenerator, PrimeTableCache
+
+GENERATOR = PrimeGenerator()
+SQUARE = BASE_PRIME_LIMIT ** 2
+# O quadrado do primeiro primo acima de BASE_PRIME_LIMIT: o menor composto que o crivo não risca.
+PSEUDO = next(n for n in range(BASE_PRIME_LIMIT + 1, 2 * BASE_PRIME_LIMIT) if GENERATOR.is_prime(n)) ** 2
+
+
+def _expected(start, stop, step):
+    """
+    :return: os primos de range(start, stop, step), testados um a um, em ordem crescente.
+    """
+    return sorted(n for n in range(start, stop, step) if GENERATOR.is_prime(n))
+
+
+@pytest.mark.parametrize('start, stop, step', [
+    # Passos negativos.
+    (1000, -50, -3),
+    (10 ** 6 + 999, 10 ** 6, -7),
+    (9973, 1, -1),
+    # Passos divisíveis por primos do crivo: termos coprimos com o passo e termos múltiplos de um primo (o próprio
+    # primo, quando é um termo, não deve ser riscado).
+    (5, 5000, 6),
+    (7, 30000, 30),
+    (1, 10 ** 6, 2 * 3 * 5 * 7 * 11),
+    (2, 1000, 2),
+    (3, 3000, 3),
+    (4999 * 3, 3, -4999),
+    (0, 10000, 997),
+    # Intervalos que atravessam BASE_PRIME_LIMIT²: o crivo para no limite e os sobreviventes passam por Miller-Rabin.
+    (SQUARE - 3000, SQUARE + 3000, 1),
+    (SQUARE + 2999, SQUARE - 3001, -2),
+    (SQUARE - 30 * 500 + 1, SQUARE + 30 * 500, 30),
+    (PSEUDO - 30030 * 1000, PSEUDO + 30030 * 100, 30030),
+])
+def test_sieve_matches_is_prime(start, stop, step):
+    """
+    A tabela do crivo segmentado deve conter exatamente os termos primos da progressão.
+    """
+    table = PrimeTableCache(None).get(start, stop, step)
+    assert table is not None
+    assert [table[i] for i in range(len(table))] == _expected(start, stop, step)
+
+
+def test_prime_table_round_trip(tmp_path):
+    """
+    Uma tabela lida do disco deve ser igual à montada pelo crivo.
+    """
+    built = PrimeTableCache(tmp_path).get(10 ** 6 + 999, 10 ** 6, -7)
+    loaded = PrimeTableCache(tmp_path).get(10 ** 6 + 999, 10 ** 6, -7)
+    assert list(loaded.offsets) == list(built.offsets) and (loaded.start, loaded.step) == (built.start, built.step)
+
+
+@pytest.mark.parametrize('corrupt', [
+    # Truncado no meio de um índice e em um índice inteiro.
+    lambda data: data[:-1],
+    lambda data: data[:-4],
+    # Versão anterior e cabeçalho de outra progressão.
+    lambda data: data.replace(bytes([TABLE_VERSION]), bytes([TABLE_VERSION - 1]), 1),
+    lambda data: data.replace(b'-7', b'-1', 1),
+    # Índices fora da progressão e fora de ordem.
+    lambda data: data[:-4] + (2 ** 32 - 1).to_bytes(4, 'little'),
+    lambda data: data[:-8] + data[-4:] + data[-8:-4],
+])
+def test_prime_table_cache_rejects_invalid_files(tmp_path, corrupt):
+    """
+    Um arquivo de tabela inválido deve ser descartado e a tabela, montada e gravada de novo.
+    """
+    built = PrimeTableCache(tmp_path).get(10 ** 6 + 999, 10 ** 6, -7)
+    path, = tmp_path.glob('*.bin')
+    path.write_bytes(corrupt(path.read_bytes()))
+    rebuilt = PrimeTableCache(tmp_path).get(10 ** 6 + 999, 10 ** 6, -7)
+    assert list(rebuilt.offsets) == list(built.offsets)
+    assert list(PrimeTableCache(tmp_path).get(10 ** 6 + 999, 10 ** 6, -7).offsets) == list(built.offsets)
+
+
+def test_random_prime_in_range_without_table():
+    """
+    Sem tabela, um intervalo cujos termos são todos múltiplos de mdc(start, step) > 1 não deve ser sorteado: o único
+    primo possível é o próprio mdc.
+    """
+    generator = PrimeGenerator(rng=random.Random(16))
+    with pytest.raises(ValueError):
+        generator.random_prime_in_range(10 ** 18, 10 ** 18 + 5 * 10 ** 8, 2)
+    assert generator.random_prime_in_range(7, 10 ** 30, 7) == 7
+    prime = generator.random_prime_in_range(10 ** 18 + 1, 10 ** 30, 2)
+    assert prime % 2 == 1 and generator.is_prime(prime)
+
+
+def test_random_source():
+    """
+    Por padrão, os primos vêm da entropia do sistema; um gerador com semente, informado explicitamente, torna a geração
+    reprodutível.
+    """
+    assert PrimeGenerator().source is SYSTEM_RANDOM
+    first, second = (PrimeGenerator(rng=random.Random(2)).random_prime(256) for _ in range(2))
+    assert first == second and first.bit_length() == 256